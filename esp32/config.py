@@ -11,6 +11,10 @@ WIFI_PASSWORD = "TU_PASSWORD_AQUI"  # ← CAMBIAR
 SERVER_PORT = 8080
 DEVICE_ID = "esp32_wally_001"
 
+# Discovery Configuration (anuncios UDP para el PC)
+DISCOVERY_PORT = 8081       # puerto UDP de descubrimiento
+ANNOUNCE_INTERVAL = 10      # segundos entre anuncios broadcast
+
 # Sensor Pin Configuration
 SENSOR_PINS = {
     'temperature': 34,  # Pin ADC para sensor temperatura
@@ -252,6 +252,14 @@ class SensorServer:
         self.sensor_pins = SENSOR_PINS
         self.calibration = SENSOR_CALIBRATION
         
+        # NUEVO: Responder de descubrimiento UDP
+        from config import DEVICE_ID, DISCOVERY_PORT, ANNOUNCE_INTERVAL
+        self.device_name = DEVICE_ID
+        self.discovery_port = DISCOVERY_PORT
+        self.announce_interval = ANNOUNCE_INTERVAL
+        self.udp_socket = None
+        self.last_announce = 0
+        
         # Inicializar sensores genéricos (compatibilidad)
         self.init_sensors()
         
@@ -563,6 +571,60 @@ class SensorServer:
         )
         return response
     
+    # ========== DESCUBRIMIENTO EN LA RED ==========
+    
+    def discovery_info(self):
+        """Datos que se anuncian al PC por UDP"""
+        return {
+            'wally': 1,
+            'device_id': 'esp32_wally_vernier',
+            'device_name': self.device_name,
+            'ip': self.ip,
+            'port': self.port,
+            'vernier_integration': True
+        }
+    
+    def start_discovery(self):
+        """Abrir socket UDP no bloqueante para sondas y anuncios"""
+        try:
+            self.udp_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.udp_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            try:
+                self.udp_socket.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+            except (AttributeError, OSError):
+                pass  # Algunos ports de MicroPython no exponen SO_BROADCAST
+            self.udp_socket.bind(('', self.discovery_port))
+            self.udp_socket.setblocking(False)
+            print(f"📣 Descubrimiento UDP en puerto {self.discovery_port}")
+        except Exception as e:
+            print(f"⚠️ Descubrimiento UDP no disponible: {e}")
+            self.udp_socket = None
+    
+    def handle_discovery(self):
+        """Responder sondas WALLY_DISCOVER y anunciarse periódicamente"""
+        if not self.udp_socket:
+            return
+        
+        # Responder sondas pendientes (no bloquea)
+        try:
+            data, addr = self.udp_socket.recvfrom(64)
+            if data.strip() == b"WALLY_DISCOVER":
+                self.udp_socket.sendto(ujson.dumps(self.discovery_info()).encode('utf-8'), addr)
+        except OSError:
+            pass
+        
+        # Anuncio broadcast periódico
+        now = time.time()
+        if now - self.last_announce >= self.announce_interval:
+            self.last_announce = now
+            try:
+                info = self.discovery_info()
+                info['announce'] = True
+                self.udp_socket.sendto(ujson.dumps(info).encode('utf-8'),
+                                       ('255.255.255.255', self.discovery_port))
+            except OSError:
+                pass
+    
     def http_error(self, code, message):
         """Error HTTP (sin cambios)"""
         response = (
@@ -593,7 +655,11 @@ class SensorServer:
             print(f"   GET http://{self.ip}:{self.port}/vernier/status")
             print(f"   GET http://{self.ip}:{self.port}/vernier/active")
             
+            self.start_discovery()
+            
             while self.running:
+                self.handle_discovery()
+                
                 try:
                     self.socket.settimeout(1.0)
                     conn, addr = self.socket.accept()
@@ -621,4 +687,6 @@ class SensorServer:
         finally:
             if self.socket:
                 self.socket.close()
+            if self.udp_socket:
+                self.udp_socket.close()
             print("🛑 Servidor detenido")
\ No newline at end of file
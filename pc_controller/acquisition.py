@@ -0,0 +1,191 @@
+"""
+Núcleo de adquisición para Wally
+Conexión, bucle de lectura y reconexión sin dependencias de UI (Tk ni matplotlib)
+"""
+import threading
+import time
+import config
+from discovery import discover_devices
+
+# Estados de conexión informados a on_status
+STATUS_DISCONNECTED = "disconnected"
+STATUS_CONNECTED = "connected"
+STATUS_RECONNECTING = "reconnecting"
+STATUS_LOST = "lost"
+
+class AcquisitionEngine:
+    """Lee la placa en un thread propio y guarda cada lectura en el DataManager
+    
+    No sabe nada de la interfaz: avisa por callbacks que corren en el thread
+    de adquisición (on_record(lectura), on_status(estado) al cambiar y
+    on_lost() al abandonar la reconexión). La UI los pasa a su thread con
+    root.after; el daemon los usa directamente.
+    """
+    
+    def __init__(self, data_manager, esp32_client, device_registry,
+                 on_record=None, on_status=None, on_lost=None):
+        self.data_manager = data_manager
+        self.esp32_client = esp32_client
+        self.device_registry = device_registry
+        self.on_record = on_record
+        self.on_status = on_status
+        self.on_lost = on_lost
+        
+        self.is_running = False
+        self.connection_status = STATUS_DISCONNECTED
+        self.target_device = (config.ESP32_IP, config.ESP32_PORT)
+        self.current_data = {}
+        self.max_consecutive_errors = 5
+        
+        self.thread = None
+        self.stop_event = threading.Event()
+        self.started_at = None
+    
+    def get_target_device(self):
+        """Placa a usar: config.ESP32_IP o la mejor del registro de descubrimiento"""
+        if config.ESP32_IP:
+            return config.ESP32_IP, config.ESP32_PORT
+        
+        device = self.device_registry.get_best_device()
+        if device:
+            return device['ip'], device['port']
+        return None
+    
+    def connect(self, target=None):
+        """Resolver la placa (descubriéndola si hace falta) y conectar; bloquea"""
+        if target is None:
+            target = self.get_target_device()
+        if target is None:
+            discover_devices(registry=self.device_registry)
+            target = self.get_target_device()
+            if target is None:
+                return False
+        
+        self.target_device = target
+        if not self.esp32_client.connect(*target):
+            return False
+        
+        # Avisar si el intervalo configurado supera lo que la placa sostiene
+        device = self.device_registry.get_device(*target)
+        if device and device.get('poll_rate_hz'):
+            requested_rate = 1 / config.SAMPLE_INTERVAL
+            if requested_rate > device['poll_rate_hz']:
+                print(f"⚠️ SAMPLE_INTERVAL pide {requested_rate:.1f} Hz pero la placa "
+                      f"sostiene ~{device['poll_rate_hz']:.1f} Hz")
+        return True
+    
+    def start(self):
+        """Iniciar el thread de adquisición (la placa ya debe estar conectada)"""
+        if self.is_running:
+            return False
+        
+        self.is_running = True
+        self.connection_status = STATUS_CONNECTED
+        self.started_at = time.time()
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run, name="acquisition", daemon=True)
+        self.thread.start()
+        return True
+    
+    def stop(self, timeout=2):
+        """Detener la adquisición y esperar al thread"""
+        if not self.is_running:
+            return
+        
+        self.is_running = False
+        self.stop_event.set()
+        if self.thread and self.thread.is_alive() and self.thread is not threading.current_thread():
+            self.thread.join(timeout=timeout)
+        self.thread = None
+        self.connection_status = STATUS_DISCONNECTED
+    
+    def _run(self):
+        """Bucle principal de adquisición de datos (ejecuta en thread separado)"""
+        consecutive_errors = 0
+        
+        while self.is_running and not self.stop_event.is_set():
+            try:
+                # Conexión caída: reintentar con backoff sin perder la sesión
+                if not self.esp32_client.is_connected:
+                    if not self.wait_for_reconnect():
+                        break
+                    continue
+                
+                # Obtener datos del ESP32 (registro plano, decodificado una vez)
+                data = self.esp32_client.get_sensor_record()
+                
+                if data:
+                    # Datos recibidos correctamente
+                    consecutive_errors = 0
+                    self.current_data = data
+                    
+                    # Guardar en buffer (y en el log de sesión)
+                    self.data_manager.add_reading(data)
+                    
+                    if self.on_record is not None:
+                        self.on_record(data)
+                    
+                    # Log cada 10 lecturas
+                    if self.data_manager.get_reading_count() % 10 == 0:
+                        sensor_count = data.sensor_count
+                        print(f"📊 Datos: {self.data_manager.get_reading_count()} | Sensores activos: {sensor_count}")
+                
+                elif not self.esp32_client.is_connected:
+                    # El cliente entró en backoff: avisar y reintentar en la próxima vuelta
+                    self.set_connection_status(STATUS_RECONNECTING)
+                    continue
+                
+                # Esperar antes de la siguiente lectura
+                self.stop_event.wait(config.SAMPLE_INTERVAL)
+            
+            except Exception as e:
+                consecutive_errors += 1
+                print(f"❌ Error en bucle de adquisición: {e}")
+                
+                if consecutive_errors >= self.max_consecutive_errors:
+                    self.connection_lost()
+                    break
+                
+                self.stop_event.wait(1)  # Esperar 1 segundo antes de reintentar
+    
+    def wait_for_reconnect(self):
+        """Esperar/reintentar reconexión. Devuelve False si hay que abandonar"""
+        self.set_connection_status(STATUS_RECONNECTING)
+        
+        if self.esp32_client.try_reconnect():
+            # Reanudar: la sesión y el buffer se conservan intactos
+            self.set_connection_status(STATUS_CONNECTED)
+            print("▶️ Adquisición reanudada")
+            return True
+        
+        give_up = config.RECONNECT_GIVE_UP
+        if give_up is not None and self.esp32_client.get_disconnected_duration() >= give_up:
+            self.connection_lost()
+            return False
+        
+        self.stop_event.wait(max(0.05, self.esp32_client.time_until_reconnect()))
+        return True
+    
+    def connection_lost(self):
+        """Abandonar: el thread termina y el dueño decide (la UI avisa, el daemon sale)"""
+        self.set_connection_status(STATUS_LOST)
+        if self.on_lost is not None:
+            self.on_lost()
+    
+    def set_connection_status(self, status):
+        """Informar el estado de conexión solo cuando cambia"""
+        if status == self.connection_status:
+            return
+        
+        self.connection_status = status
+        if self.on_status is not None:
+            self.on_status(status)
+    
+    def get_stats(self):
+        """Estadísticas del DataManager más estado de la conexión"""
+        stats = self.data_manager.get_stats()
+        stats['connection_status'] = self.connection_status
+        ip, port = self.target_device
+        stats['device'] = f"{ip}:{port}" if ip else None
+        stats['uptime_seconds'] = time.time() - self.started_at if self.started_at else 0
+        return stats
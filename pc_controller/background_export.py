@@ -0,0 +1,75 @@
+"""
+Exportación en segundo plano para Wally
+Exporta una foto fija de la sesión en un hilo propio, con avance y cancelación
+"""
+import threading
+import time
+import config
+
+class ExportJob:
+    """Exportación de la sesión en un hilo dedicado
+    
+    La foto de la sesión se toma en start(), así que las lecturas que
+    llegan durante la exportación no la alteran. El avance y el resultado
+    se publican en el CommandQueue para que los callbacks corran en el
+    thread de Tkinter.
+    """
+    
+    def __init__(self, data_manager, command_queue, filename, t0=None, t1=None,
+                 on_progress=None, on_done=None):
+        self.data_manager = data_manager
+        self.command_queue = command_queue
+        self.filename = filename
+        self.t0 = t0
+        self.t1 = t1
+        self.on_progress = on_progress
+        self.on_done = on_done
+        
+        self.cancel_event = threading.Event()
+        self.thread = None
+        self.snapshot = None
+        self.rows_total = 0
+        self.rows_done = 0
+        self.last_progress = 0
+        self.started_at = None
+        self.elapsed = None
+    
+    def start(self):
+        """Tomar la foto de la sesión y lanzar el hilo exportador"""
+        self.snapshot = self.data_manager.snapshot(self.t0, self.t1)
+        self.rows_total = len(self.snapshot)
+        self.started_at = time.monotonic()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+    
+    def cancel(self):
+        """Pedir la cancelación (se aplica entre bloques)"""
+        self.cancel_event.set()
+    
+    def is_running(self):
+        return self.thread is not None and self.thread.is_alive()
+    
+    def wait(self, timeout=None):
+        if self.thread is not None:
+            self.thread.join(timeout)
+    
+    def _progress(self, done, total):
+        """Avance desde el hilo exportador, limitado a EXPORT_PROGRESS_INTERVAL"""
+        self.rows_done = done
+        now = time.monotonic()
+        if self.on_progress and now - self.last_progress >= config.EXPORT_PROGRESS_INTERVAL:
+            self.last_progress = now
+            self.command_queue.post(self.on_progress, done, total)
+    
+    def _run(self):
+        try:
+            success = self.data_manager.export(
+                self.filename, snapshot=self.snapshot,
+                progress=self._progress, cancel=self.cancel_event)
+        except Exception as e:
+            print(f"❌ Error en exportación en segundo plano: {e}")
+            success = False
+        
+        self.elapsed = time.monotonic() - self.started_at
+        if self.on_done:
+            self.command_queue.post(self.on_done, success, self)
@@ -0,0 +1,105 @@
+"""
+Calibración de canales para Wally
+Tabla versionada cuentas ADC → valor de ingeniería, aplicada de forma perezosa
+"""
+import os
+import time
+import numpy as np
+import config
+from utils import load_config, save_config
+
+# Cuenta reservada para "sin dato" en columnas uint16 (el ADC llega a 4095)
+RAW_MISSING = 0xFFFF
+
+VOLTS_PER_COUNT = config.ADC_REFERENCE_VOLTAGE / config.ADC_MAX_COUNT
+
+class Calibration:
+    """valor = voltaje * slope + offset, con voltaje = cuentas * Vref / máx ADC
+    
+    Mismo convenio que SENSOR_CALIBRATION en el firmware del ESP32.
+    """
+    __slots__ = ('slope', 'offset', 'version', 'created', 'note', 'scale')
+    
+    def __init__(self, slope, offset, version=1, created=None, note=None):
+        self.slope = float(slope)
+        self.offset = float(offset)
+        self.version = version
+        self.created = created or time.time()
+        self.note = note
+        self.scale = self.slope * VOLTS_PER_COUNT  # valor por cuenta
+    
+    def value(self, raw):
+        """Valor de una cuenta suelta"""
+        return raw * self.scale + self.offset
+    
+    def apply(self, counts):
+        """Cuentas uint16 → valores float64 (NaN donde falta el dato), vectorizado"""
+        values = counts * self.scale + self.offset
+        values[counts == RAW_MISSING] = np.nan
+        return values
+    
+    def to_dict(self):
+        return {'slope': self.slope, 'offset': self.offset, 'version': self.version,
+                'created': self.created, 'note': self.note}
+
+def counts_to_voltages(counts):
+    """Cuentas → voltios redondeados a mV, como los envía el ESP32"""
+    voltages = np.round(counts * VOLTS_PER_COUNT, 3)
+    voltages[counts == RAW_MISSING] = np.nan
+    return voltages
+
+def counts_to_raws(counts):
+    """Cuentas → float con NaN para 'sin dato' (formato de las columnas raw)"""
+    raws = counts.astype(np.float64)
+    raws[counts == RAW_MISSING] = np.nan
+    return raws
+
+class CalibrationTable:
+    """Historial de calibraciones por canal, persistido en JSON
+    
+    Cada cambio añade una versión nueva; la vigente es la última. Los
+    valores de los canales guardados en cuentas se calculan con ella al
+    leer, así que recalibrar no reescribe datos.
+    """
+    
+    def __init__(self, filename=None):
+        self.filename = filename or config.CALIBRATION_FILE
+        self.history = {}
+        self.load()
+    
+    def load(self):
+        """Cargar tabla (o inicializarla desde config.CHANNEL_CALIBRATION)"""
+        data = load_config(self.filename) if os.path.exists(self.filename) else None
+        if data:
+            self.history = {
+                channel: [Calibration(**entry) for entry in versions]
+                for channel, versions in data.items()
+            }
+        else:
+            self.history = {
+                channel: [Calibration(slope, offset, note="config")]
+                for channel, (slope, offset) in config.CHANNEL_CALIBRATION.items()
+            }
+        return self.history
+    
+    def save(self):
+        os.makedirs(os.path.dirname(self.filename) or ".", exist_ok=True)
+        return save_config(self.to_dict(), self.filename)
+    
+    def current(self, channel):
+        """Calibración vigente de un canal (o None si no tiene)"""
+        versions = self.history.get(channel)
+        return versions[-1] if versions else None
+    
+    def versions(self, channel):
+        return list(self.history.get(channel, ()))
+    
+    def set(self, channel, slope, offset, note=None):
+        """Registrar una nueva versión de calibración"""
+        versions = self.history.setdefault(channel, [])
+        calibration = Calibration(slope, offset, version=len(versions) + 1, note=note)
+        versions.append(calibration)
+        return calibration
+    
+    def to_dict(self):
+        return {channel: [c.to_dict() for c in versions] for channel, versions in self.history.items()}
@@ -0,0 +1,102 @@
+"""
+Registro de canales para Wally
+Nombre de canal del dispositivo → ID entero + metadatos (etiqueta, unidad, rango, color, origen)
+"""
+import threading
+import config
+
+# Prefijos de nombre que usa el firmware según el origen del canal
+SOURCE_PREFIXES = (('generic_', 'generic'), ('vernier_', 'vernier'), ('current_', 'vernier_active'))
+
+class ChannelInfo:
+    """Metadatos de un canal registrado"""
+    __slots__ = ('id', 'name', 'kind', 'label', 'unit', 'range', 'color', 'source')
+    
+    def __init__(self, channel_id, name, kind, label, unit, range, color, source):
+        self.id = channel_id
+        self.name = name
+        self.kind = kind    # Clave de config.SENSOR_LABELS, o None si no tiene tarjeta fija
+        self.label = label
+        self.unit = unit
+        self.range = range
+        self.color = color
+        self.source = source
+
+class ChannelRegistry:
+    """Canales vistos en esta ejecución, con IDs enteros estables (orden de registro)
+    
+    Los IDs se asignan una vez por canal y se guardan en cada ChannelLayout,
+    así que las rutas calientes indexan listas en vez de buscar por nombre.
+    """
+    
+    def __init__(self):
+        self.channels = []  # ID → ChannelInfo
+        self.ids = {}       # nombre → ID
+        self.lock = threading.Lock()
+    
+    def __len__(self):
+        return len(self.channels)
+    
+    def __iter__(self):
+        return iter(list(self.channels))
+    
+    def register(self, name, unit=None):
+        """ID de un canal (lo registra con metadatos derivados si es nuevo)"""
+        channel_id = self.ids.get(name)
+        if channel_id is not None:
+            return channel_id
+        
+        with self.lock:
+            channel_id = self.ids.get(name)
+            if channel_id is None:
+                channel_id = len(self.channels)
+                self.channels.append(self._describe(channel_id, name, unit))
+                self.ids[name] = channel_id
+        return channel_id
+    
+    def ids_for(self, names):
+        """Tupla de IDs para una secuencia de canales"""
+        return tuple(self.register(name) for name in names)
+    
+    def info(self, channel_id):
+        return self.channels[channel_id]
+    
+    def get(self, name):
+        """ChannelInfo por nombre (None si no está registrado)"""
+        channel_id = self.ids.get(name)
+        return None if channel_id is None else self.channels[channel_id]
+    
+    def observe_units(self, ids, units):
+        """Completar la unidad de canales sin tipo con la que reporta el dispositivo"""
+        for channel_id, unit in zip(ids, units):
+            info = self.channels[channel_id]
+            if info.unit is None and unit:
+                info.unit = unit
+    
+    def _describe(self, channel_id, name, unit):
+        """Metadatos iniciales: desde config si el canal tiene tipo, automáticos si no"""
+        source = 'device'
+        for prefix, prefix_source in SOURCE_PREFIXES:
+            if name.startswith(prefix):
+                source = prefix_source
+                break
+        
+        kind = config.CHANNEL_KINDS.get(name)
+        if kind is None and name in config.SENSOR_LABELS:
+            kind = name
+        
+        if kind is not None:
+            label = config.SENSOR_LABELS[kind]
+            if source == 'vernier':
+                label += " (Vernier)"
+            return ChannelInfo(channel_id, name, kind, label,
+                               config.SENSOR_UNITS.get(kind, unit),
+                               config.SENSOR_RANGES.get(kind),
+                               config.CHART_COLORS.get(kind), source)
+        
+        palette = config.CHANNEL_PALETTE
+        return ChannelInfo(channel_id, name, None, name.replace('_', ' ').capitalize(), unit,
+                           None, palette[channel_id % len(palette)], source)
+
+# Registro compartido por decodificador, almacenamiento y UI
+registry = ChannelRegistry()
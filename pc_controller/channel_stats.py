@@ -0,0 +1,225 @@
+"""
+Estadísticas incrementales por canal para Wally
+Welford, min/max, EWMA y ventana deslizante con deques monótonos: O(1) por lectura
+"""
+import math
+import threading
+from collections import deque
+import config
+from sensor_record import STATUS_ACTIVE
+
+class RunningStats:
+    """Estadísticas acumuladas de toda la sesión (algoritmo de Welford)"""
+    __slots__ = ('count', 'mean', 'm2', 'min', 'max', 'last', 'last_time',
+                 'ewma', 'rate', 'alpha')
+    
+    def __init__(self, alpha=None):
+        self.alpha = alpha or config.STATS_EWMA_ALPHA
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.last = None
+        self.last_time = None
+        self.ewma = None
+        self.rate = None  # Variación por segundo entre las dos últimas lecturas
+    
+    def update(self, timestamp, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        
+        if self.last_time is not None and timestamp > self.last_time:
+            self.rate = (value - self.last) / (timestamp - self.last_time)
+        self.last = value
+        self.last_time = timestamp
+        
+        self.ewma = value if self.ewma is None else self.ewma + self.alpha * (value - self.ewma)
+    
+    def apply_linear(self, a, b):
+        """Reexpresar las estadísticas para x' = a*x + b (recalibración) sin releer datos"""
+        if not self.count:
+            return
+        self.mean = a * self.mean + b
+        self.m2 *= a * a
+        self.min, self.max = a * self.min + b, a * self.max + b
+        if a < 0:
+            self.min, self.max = self.max, self.min
+        self.last = a * self.last + b
+        self.ewma = a * self.ewma + b
+        if self.rate is not None:
+            self.rate *= a
+    
+    @property
+    def variance(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+    
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+class SlidingWindowStats:
+    """Media/desviación/min/max de los últimos `window` segundos
+    
+    Min y max usan deques monótonos: cada muestra entra y sale una vez,
+    así el coste amortizado por lectura es O(1) sea cual sea la ventana.
+    """
+    __slots__ = ('window', 'samples', 'min_deque', 'max_deque', 'total', 'total_sq')
+    
+    def __init__(self, window=None):
+        self.window = window or config.STATS_WINDOW
+        self.samples = deque()    # (timestamp, valor)
+        self.min_deque = deque()  # valores crecientes
+        self.max_deque = deque()  # valores decrecientes
+        self.total = 0.0
+        self.total_sq = 0.0
+    
+    def update(self, timestamp, value):
+        self.samples.append((timestamp, value))
+        self.total += value
+        self.total_sq += value * value
+        
+        while self.min_deque and self.min_deque[-1] > value:
+            self.min_deque.pop()
+        self.min_deque.append(value)
+        while self.max_deque and self.max_deque[-1] < value:
+            self.max_deque.pop()
+        self.max_deque.append(value)
+        
+        self._expire(timestamp - self.window)
+    
+    def _expire(self, cutoff):
+        """Sacar las muestras más antiguas que el inicio de la ventana"""
+        samples = self.samples
+        while samples and samples[0][0] < cutoff:
+            _, value = samples.popleft()
+            self.total -= value
+            self.total_sq -= value * value
+            if self.min_deque[0] == value:
+                self.min_deque.popleft()
+            if self.max_deque[0] == value:
+                self.max_deque.popleft()
+        
+        if not samples:
+            # Evitar que se acumule error de redondeo en las sumas
+            self.total = self.total_sq = 0.0
+    
+    def apply_linear(self, a, b):
+        """Reexpresar la ventana para x' = a*x + b; O(muestras en ventana)"""
+        n = len(self.samples)
+        self.total_sq = a * a * self.total_sq + 2 * a * b * self.total + n * b * b
+        self.total = a * self.total + b * n
+        self.samples = deque((t, a * value + b) for t, value in self.samples)
+        min_deque = deque(a * value + b for value in self.min_deque)
+        max_deque = deque(a * value + b for value in self.max_deque)
+        # Con pendiente negativa el orden se invierte: el deque de mínimos pasa a ser de máximos
+        if a < 0:
+            min_deque, max_deque = max_deque, min_deque
+        self.min_deque, self.max_deque = min_deque, max_deque
+    
+    @property
+    def count(self):
+        return len(self.samples)
+    
+    @property
+    def mean(self):
+        return self.total / len(self.samples) if self.samples else None
+    
+    @property
+    def std(self):
+        n = len(self.samples)
+        if n < 2:
+            return 0.0
+        variance = (self.total_sq - self.total * self.total / n) / (n - 1)
+        return math.sqrt(max(variance, 0.0))
+    
+    @property
+    def min(self):
+        return self.min_deque[0] if self.min_deque else None
+    
+    @property
+    def max(self):
+        return self.max_deque[0] if self.max_deque else None
+
+class ChannelStats:
+    """Estadísticas de sesión + ventana deslizante de un canal"""
+    __slots__ = ('name', 'running', 'window')
+    
+    def __init__(self, name):
+        self.name = name
+        self.running = RunningStats()
+        self.window = SlidingWindowStats()
+    
+    def update(self, timestamp, value):
+        self.running.update(timestamp, value)
+        self.window.update(timestamp, value)
+    
+    def apply_linear(self, a, b):
+        self.running.apply_linear(a, b)
+        self.window.apply_linear(a, b)
+    
+    def summary(self):
+        running, window = self.running, self.window
+        return {
+            'count': running.count,
+            'mean': running.mean,
+            'std': running.std,
+            'min': running.min,
+            'max': running.max,
+            'last': running.last,
+            'ewma': running.ewma,
+            'rate': running.rate,
+            'window_seconds': window.window,
+            'window_count': window.count,
+            'window_mean': window.mean,
+            'window_std': window.std,
+            'window_min': window.min,
+            'window_max': window.max
+        }
+
+class StatsTracker:
+    """Estadísticas de todos los canales, actualizadas en cada lectura (thread-safe)"""
+    
+    def __init__(self):
+        self.channels = {}
+        self.layout_channels = {}  # ChannelLayout → [ChannelStats] en orden del layout
+        self.lock = threading.Lock()
+    
+    def update(self, record):
+        """Incorporar un SensorRecord: O(canales), independiente del historial"""
+        timestamp, values, status = record.timestamp, record.values, record.status
+        with self.lock:
+            stats = self.layout_channels.get(record.layout)
+            if stats is None:
+                stats = [self.channels.setdefault(name, ChannelStats(name)) for name in record.layout.names]
+                self.layout_channels[record.layout] = stats
+            
+            for i, channel in enumerate(stats):
+                value = values[i]
+                if status[i] == STATUS_ACTIVE and value == value:
+                    channel.update(timestamp, value)
+    
+    def summary(self):
+        """{canal: estadísticas} de los canales con al menos una lectura válida"""
+        with self.lock:
+            return {name: channel.summary() for name, channel in self.channels.items()
+                    if channel.running.count}
+    
+    def apply_linear(self, name, a, b):
+        """Transformar las estadísticas de un canal tras recalibrarlo"""
+        with self.lock:
+            channel = self.channels.get(name)
+            if channel is not None:
+                channel.apply_linear(a, b)
+    
+    def reset(self):
+        with self.lock:
+            self.channels.clear()
+            self.layout_channels.clear()
@@ -0,0 +1,251 @@
+"""
+Backends del gráfico en vivo para Wally
+Interfaz común: matplotlib (blit o render worker) o polilíneas nativas en un tk.Canvas
+"""
+import importlib
+import threading
+import time
+import tkinter as tk
+import numpy as np
+import config
+from startup import startup
+
+# Módulo que implementa cada backend (los que no figuran viven en este archivo)
+BACKEND_MODULES = {'matplotlib': 'mpl_chart'}
+
+def fit_limits(xlim, ylim, first, last, min_val, max_val):
+    """Límites (xlim, ylim) a aplicar, o None si los datos caben en los actuales
+    
+    X con holgura a la derecha: cambia cada ~25% de la ventana, no en cada
+    frame. Y se amplía si los datos se salen y se reduce si su rango ajustado
+    es menos de un cuarto del actual.
+    """
+    changed = False
+    x0, x1 = xlim
+    span = max(last - first, 1e-5)
+    if last > x1 or first < x0 or x1 - x0 > 2 * span:
+        xlim = (first, last + span * 0.25)
+        changed = True
+    
+    if min_val == min_val:
+        margin = (max_val - min_val) * 0.25 if max_val != min_val else 1
+        y0, y1 = ylim
+        if min_val < y0 or max_val > y1 or (y1 - y0) > 4 * (max_val - min_val + 2 * margin):
+            ylim = (min_val - margin, max_val + margin)
+            changed = True
+    
+    return (xlim, ylim) if changed else None
+
+def initial_ylim(sensor_key):
+    """Rango Y inicial de una serie, desde su rango nominal"""
+    sensor_range = config.SENSOR_RANGES.get(sensor_key, (0, 100))
+    return (sensor_range[0] * 0.9, sensor_range[1] * 1.1)
+
+class ChartBackend:
+    """Interfaz de un backend del gráfico en vivo
+    
+    El dashboard prepara cada frame (anillo + downsampling) y lo entrega con
+    render() como {serie: (x, y, primer t, último t, mín, máx)}, con x en
+    números de fecha de matplotlib; el backend solo lo dibuja. on_width(serie,
+    píxeles) avisa el ancho útil de cada panel para ajustar el downsampling.
+    """
+    
+    def __init__(self, root, series, on_width=None):
+        self.root = root
+        self.series = list(series)
+        self.on_width = on_width
+    
+    def build(self, parent):
+        """Crear los widgets del gráfico dentro de parent"""
+        raise NotImplementedError
+    
+    def render(self, frame):
+        """Dibujar un frame"""
+        raise NotImplementedError
+    
+    def get_stats(self):
+        """Métricas propias del backend (dict) o None"""
+        return None
+    
+    def close(self):
+        pass
+
+class CanvasPanel:
+    """Un panel del gráfico nativo: área de dibujo, límites e items del canvas"""
+    __slots__ = ('key', 'box', 'xlim', 'ylim', 'frame', 'title', 'grid', 'y_labels',
+                 'x_labels', 'lines', 'visible', 'color')
+    
+    def __init__(self, key):
+        self.key = key
+        self.box = (0, 0, 1, 1)  # Área de datos en píxeles (x0, y0, x1, y1)
+        self.xlim = (0.0, 1.0)
+        self.ylim = initial_ylim(key)
+        self.lines = []   # Items 'line' reutilizados (uno por tramo sin huecos)
+        self.visible = 0  # Cuántos de ellos están en uso
+        self.color = config.CHART_COLORS.get(key, "black")
+
+class TkCanvasChart(ChartBackend):
+    """Gráfico nativo: una polilínea por serie en un tk.Canvas, sin matplotlib
+    
+    Los puntos se escalan a píxeles con NumPy y se actualizan con
+    canvas.coords() sobre items reutilizados; los ejes (marco, grilla y
+    etiquetas) solo se reescriben cuando cambian los límites. Los huecos
+    (NaN) cortan la línea en tramos.
+    """
+    
+    MARGINS = (58, 26, 12, 26)  # izquierda, arriba, derecha, abajo (px) de cada panel
+    COLUMNS = 2
+    TICKS = 3
+    
+    def __init__(self, root, series, on_width=None):
+        super().__init__(root, series, on_width)
+        self.canvas = None
+        self.panels = [CanvasPanel(key) for key in self.series]
+        self.last_frame = None
+        self.render_ms = 0.0
+    
+    def build(self, parent):
+        self.canvas = tk.Canvas(parent, width=1000, height=800, background="white",
+                                highlightthickness=0)
+        self.canvas.pack(fill=tk.BOTH, expand=True)
+        
+        for panel in self.panels:
+            canvas = self.canvas
+            panel.frame = canvas.create_rectangle(0, 0, 0, 0, outline="#888888")
+            panel.title = canvas.create_text(0, 0, text=config.SENSOR_LABELS.get(panel.key, panel.key),
+                                             font=("Arial", 11, "bold"), anchor=tk.S)
+            panel.grid = [canvas.create_line(0, 0, 0, 0, fill="#E5E5E5") for _ in range(self.TICKS)]
+            panel.y_labels = [canvas.create_text(0, 0, text="", font=("Arial", 8), anchor=tk.E)
+                              for _ in range(self.TICKS)]
+            panel.x_labels = [canvas.create_text(0, 0, text="", font=("Arial", 8), anchor=tk.N)
+                              for _ in range(self.TICKS)]
+        
+        self.canvas.bind('<Configure>', self.on_resize)
+    
+    def on_resize(self, event):
+        """Repartir el canvas en paneles y recolocar todo"""
+        rows = -(-len(self.panels) // self.COLUMNS)
+        width = event.width / self.COLUMNS
+        height = event.height / max(rows, 1)
+        left, top, right, bottom = self.MARGINS
+        
+        for i, panel in enumerate(self.panels):
+            x = (i % self.COLUMNS) * width
+            y = (i // self.COLUMNS) * height
+            panel.box = (x + left, y + top, x + width - right, y + height - bottom)
+            x0, y0, x1, y1 = panel.box
+            self.canvas.coords(panel.frame, x0, y0, x1, y1)
+            self.canvas.coords(panel.title, (x0 + x1) / 2, y0 - 4)
+            self._draw_axes(panel)
+            if self.on_width is not None:
+                self.on_width(panel.key, int(x1 - x0))
+        
+        if self.last_frame is not None:
+            self.render(self.last_frame)
+    
+    def _draw_axes(self, panel):
+        """Grilla y etiquetas de los ejes según los límites del panel"""
+        x0, y0, x1, y1 = panel.box
+        canvas = self.canvas
+        for k in range(self.TICKS):
+            share = k / (self.TICKS - 1)
+            
+            y = y1 - share * (y1 - y0)
+            value = panel.ylim[0] + share * (panel.ylim[1] - panel.ylim[0])
+            canvas.coords(panel.grid[k], x0, y, x1, y)
+            canvas.coords(panel.y_labels[k], x0 - 4, y)
+            canvas.itemconfigure(panel.y_labels[k], text=f"{value:.4g}")
+            
+            # Números de fecha (días, hora local) → HH:MM:SS sin pasar por matplotlib
+            x = x0 + share * (x1 - x0)
+            day = panel.xlim[0] + share * (panel.xlim[1] - panel.xlim[0])
+            canvas.coords(panel.x_labels[k], x, y1 + 4)
+            canvas.itemconfigure(panel.x_labels[k], text=time.strftime(
+                "%H:%M:%S", time.gmtime(day * 86400)) if 0 < day < 1e6 else "")
+    
+    def _draw_line(self, panel, x, y):
+        """Escalar a píxeles y actualizar los tramos sin huecos con canvas.coords()"""
+        x0, y0, x1, y1 = panel.box
+        (a, b), (c, d) = panel.xlim, panel.ylim
+        px = x0 + (x - a) * ((x1 - x0) / (b - a))
+        py = y1 - (y - c) * ((y1 - y0) / (d - c))
+        
+        # Tramos [inicio, fin) de puntos válidos
+        valid = ~np.isnan(py)
+        if valid.all():
+            runs = [(0, len(py))]
+        else:
+            edges = np.flatnonzero(np.diff(np.concatenate(([0], valid.view(np.int8), [0]))))
+            runs = list(zip(edges[::2], edges[1::2]))
+        
+        points = np.empty((len(px), 2))
+        points[:, 0] = px
+        points[:, 1] = py
+        used = 0
+        for start, stop in runs:
+            if used == len(panel.lines):
+                panel.lines.append(self.canvas.create_line(0, 0, 0, 0, fill=panel.color, width=2))
+            item = panel.lines[used]
+            segment = points[start:stop]
+            if len(segment) == 1:
+                segment = np.repeat(segment, 2, axis=0)  # Un punto aislado: tramo de largo cero
+            self.canvas.coords(item, segment.ravel().tolist())
+            if used >= panel.visible:
+                self.canvas.itemconfigure(item, state=tk.NORMAL)
+            used += 1
+        
+        for item in panel.lines[used:panel.visible]:
+            self.canvas.itemconfigure(item, state=tk.HIDDEN)
+        panel.visible = used
+    
+    def render(self, frame):
+        if self.canvas is None:
+            return
+        started = time.perf_counter()
+        self.last_frame = frame
+        for panel in self.panels:
+            series = frame.get(panel.key)
+            if series is None:
+                continue
+            x, y, first, last, min_val, max_val = series
+            limits = fit_limits(panel.xlim, panel.ylim, first, last, min_val, max_val)
+            if limits is not None:
+                panel.xlim, panel.ylim = limits
+                self._draw_axes(panel)
+            self._draw_line(panel, x, y)
+        self.render_ms = (time.perf_counter() - started) * 1000
+    
+    def get_stats(self):
+        return {'backend': 'tkcanvas', 'render_ms': self.render_ms}
+
+def preload_chart_backend(name):
+    """Importar en segundo plano el módulo de un backend; devuelve un Event que se activa al terminar
+    
+    matplotlib tarda cerca de un segundo en importarse: así la ventana y los
+    controles se pintan mientras tanto.
+    """
+    ready = threading.Event()
+    module = BACKEND_MODULES.get(name)
+    if module is None:
+        ready.set()
+        return ready
+    
+    def load():
+        try:
+            with startup.phase(f"import {module} (segundo plano)"):
+                importlib.import_module(module)
+        except Exception as e:
+            print(f"❌ Error cargando backend de gráfico '{name}': {e}")
+        finally:
+            ready.set()
+    
+    threading.Thread(target=load, name="chart-preload", daemon=True).start()
+    return ready
+
+def create_chart_backend(name, root, series, on_width=None):
+    """Backend del gráfico en vivo por nombre ('matplotlib' o 'tkcanvas')"""
+    if name == 'tkcanvas':
+        return TkCanvasChart(root, series, on_width)
+    # matplotlib solo se importa si se usa (normalmente ya precargado)
+    from mpl_chart import MatplotlibChart
+    return MatplotlibChart(root, series, on_width)
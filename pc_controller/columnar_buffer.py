@@ -0,0 +1,442 @@
+"""
+Almacenamiento columnar para Wally
+Ring buffer NumPy: timestamps float64 + una columna de valores por canal
+"""
+import numpy as np
+from calibration import RAW_MISSING, counts_to_raws, counts_to_voltages
+from sensor_record import STATUS_MISSING, STATUS_NAMES
+
+NAN = float('nan')
+
+def counts_values(counts, calibration, fallback=None):
+    """Valores de un canal en cuentas; las filas sin raw toman el valor de la placa (fallback)"""
+    values = calibration.apply(counts) if calibration is not None else np.full(len(counts), NAN)
+    if fallback is not None:
+        missing = counts == RAW_MISSING
+        values[missing] = fallback[missing]
+    return values
+
+class CodeTable:
+    """Códigos enteros para strings repetidos (unidades, device_id)"""
+    __slots__ = ('names', 'codes', 'limit')
+    
+    def __init__(self, dtype):
+        self.names = []
+        self.codes = {}
+        self.limit = np.iinfo(dtype).max
+    
+    def code(self, name):
+        """Código de un string (lo registra si es nuevo)"""
+        code = self.codes.get(name)
+        if code is None:
+            if len(self.names) > self.limit:
+                return self.limit  # Tabla llena: se reutiliza el último código
+            code = len(self.names)
+            self.names.append(name)
+            self.codes[name] = code
+        return code
+
+class ChannelColumn:
+    """Columnas de un canal: valor, estado, unidad y (opcional) voltaje/raw
+    
+    Con raw_mode solo se guardan las cuentas ADC (uint16) y los valores se
+    calculan al leer con la calibración vigente: 4 bytes por muestra en vez de 22.
+    Si una lectura llega sin raw, su valor va a una columna float que solo se
+    reserva la primera vez que hace falta.
+    """
+    __slots__ = ('name', 'channel_id', 'capacity', 'values', 'status', 'unit_codes', 'units',
+                 'voltages', 'raws', 'counts')
+    
+    def __init__(self, name, capacity, raw_mode=False, channel_id=None):
+        self.name = name
+        self.channel_id = channel_id
+        self.capacity = capacity
+        self.status = np.zeros(capacity, dtype=np.uint8)
+        self.unit_codes = np.zeros(capacity, dtype=np.uint8)
+        self.units = CodeTable(np.uint8)
+        # Voltaje y raw solo se reservan si el canal los reporta
+        self.voltages = None
+        self.raws = None
+        if raw_mode:
+            self.values = None  # Valores de la placa en filas sin raw (perezosa)
+            self.counts = np.full(capacity, RAW_MISSING, dtype=np.uint16)
+        else:
+            self.values = np.full(capacity, NAN)
+            self.counts = None
+    
+    def value_column(self):
+        if self.values is None:
+            self.values = np.full(self.capacity, NAN)
+        return self.values
+    
+    def voltage_column(self):
+        if self.voltages is None:
+            self.voltages = np.full(self.capacity, NAN)
+        return self.voltages
+    
+    def raw_column(self):
+        # Cuentas ADC enteras: float32 es exacto y NaN marca huecos
+        if self.raws is None:
+            self.raws = np.full(self.capacity, NAN, dtype=np.float32)
+        return self.raws
+    
+    def nbytes(self):
+        total = self.status.nbytes + self.unit_codes.nbytes
+        for optional in (self.values, self.voltages, self.raws, self.counts):
+            if optional is not None:
+                total += optional.nbytes
+        return total
+
+class ChannelChunk:
+    """Columnas de un canal dentro de un ColumnChunk
+    
+    Si el canal se guarda en cuentas (counts), valores, voltajes y raw se
+    calculan de forma perezosa y vectorizada con la calibración del bloque.
+    """
+    __slots__ = ('name', '_values', 'status', 'unit_codes', 'units', '_voltages', '_raws',
+                 'counts', 'calibration', 'fallback')
+    
+    def __init__(self, name, values, status, unit_codes, units, voltages=None, raws=None,
+                 counts=None, calibration=None, fallback=None):
+        self.name = name
+        self._values = values
+        self.status = status
+        self.unit_codes = unit_codes
+        self.units = units  # Lista código → unidad
+        self._voltages = voltages
+        self._raws = raws
+        self.counts = counts
+        self.calibration = calibration
+        self.fallback = fallback  # Valores de la placa donde no hubo raw (o None)
+    
+    @property
+    def values(self):
+        if self._values is None and self.counts is not None:
+            self._values = counts_values(self.counts, self.calibration, self.fallback)
+        return self._values
+    
+    @property
+    def voltages(self):
+        if self._voltages is None and self.counts is not None:
+            self._voltages = counts_to_voltages(self.counts)
+        return self._voltages
+    
+    @property
+    def raws(self):
+        if self._raws is None and self.counts is not None:
+            self._raws = counts_to_raws(self.counts)
+        return self._raws
+    
+    def with_calibration(self, calibration):
+        """Mismo canal en cuentas con otra calibración (sin valores cacheados); sin cuentas, el mismo"""
+        if self.counts is None:
+            return self
+        return ChannelChunk(self.name, None, self.status, self.unit_codes, self.units,
+                            counts=self.counts, calibration=calibration, fallback=self.fallback)
+    
+    def slice(self, s):
+        """Sub-rango del canal como vistas (los valores perezosos no se materializan)"""
+        if self.counts is not None:
+            return ChannelChunk(self.name, None, self.status[s], self.unit_codes[s], self.units,
+                                counts=self.counts[s], calibration=self.calibration,
+                                fallback=self.fallback[s] if self.fallback is not None else None)
+        return ChannelChunk(self.name, self._values[s], self.status[s], self.unit_codes[s],
+                            self.units,
+                            self._voltages[s] if self._voltages is not None else None,
+                            self._raws[s] if self._raws is not None else None)
+
+class ColumnChunk:
+    """Bloque de filas en formato columnar (ventana del ring o segmento en disco)"""
+    __slots__ = ('timestamps', 'entry_ids', 'sensor_counts', 'memory_free',
+                 'device_codes', 'devices', 'channels')
+    
+    def __init__(self, timestamps, entry_ids, sensor_counts, memory_free,
+                 device_codes, devices, channels):
+        self.timestamps = timestamps
+        self.entry_ids = entry_ids
+        self.sensor_counts = sensor_counts
+        self.memory_free = memory_free
+        self.device_codes = device_codes
+        self.devices = devices    # Lista código → device_id
+        self.channels = channels  # Lista de ChannelChunk
+    
+    def __len__(self):
+        return len(self.timestamps)
+    
+    def slice(self, start, stop):
+        """Sub-bloque [start, stop) como vistas (sin copia)"""
+        s = slice(start, stop)
+        channels = [c.slice(s) for c in self.channels]
+        return ColumnChunk(self.timestamps[s], self.entry_ids[s], self.sensor_counts[s],
+                           self.memory_free[s], self.device_codes[s], self.devices, channels)
+    
+    def with_calibration(self, table):
+        """Bloque con los canales en cuentas ligados a la calibración vigente de la tabla"""
+        if table is None:
+            return self
+        channels = [c.with_calibration(table.current(c.name)) for c in self.channels]
+        return ColumnChunk(self.timestamps, self.entry_ids, self.sensor_counts, self.memory_free,
+                           self.device_codes, self.devices, channels)
+    
+    def time_range(self, t0=None, t1=None):
+        """Índices [start, stop) de las filas con t0 <= timestamp <= t1 (búsqueda binaria)"""
+        start = 0 if t0 is None else int(np.searchsorted(self.timestamps, t0, 'left'))
+        stop = len(self) if t1 is None else int(np.searchsorted(self.timestamps, t1, 'right'))
+        return start, max(start, stop)
+    
+    def iter_entries(self):
+        """Filas en formato plano para exportar
+        
+        Genera (timestamp, device_id, entry_id, sensor_count, memory_free,
+        [(canal, value, unit, voltage, raw, status), ...]); los NaN salen como None.
+        """
+        # Convertir cada columna a listas Python una sola vez por bloque
+        timestamps = self.timestamps.tolist()
+        entry_ids = self.entry_ids.tolist()
+        sensor_counts = self.sensor_counts.tolist()
+        memory_free = self.memory_free.tolist()
+        device_codes = self.device_codes.tolist()
+        channel_data = [
+            (channel.name,
+             channel.values.tolist(),
+             channel.status.tolist(),
+             channel.unit_codes.tolist(),
+             channel.units,
+             channel.voltages.tolist() if channel.voltages is not None else None,
+             channel.raws.tolist() if channel.raws is not None else None)
+            for channel in self.channels
+        ]
+        
+        for k in range(len(timestamps)):
+            readings = []
+            for name, values, status, unit_codes, unit_names, voltages, raws in channel_data:
+                if status[k] == STATUS_MISSING:
+                    continue
+                value = values[k]
+                voltage = voltages[k] if voltages is not None else NAN
+                raw = raws[k] if raws is not None else NAN
+                readings.append((
+                    name,
+                    None if value != value else value,
+                    unit_names[unit_codes[k]] if unit_names else None,
+                    None if voltage != voltage else voltage,
+                    None if raw != raw else int(raw),
+                    STATUS_NAMES[status[k]]
+                ))
+            
+            yield (timestamps[k], self.devices[device_codes[k]], entry_ids[k],
+                   sensor_counts[k], memory_free[k], readings)
+
+class ColumnarRingBuffer:
+    """Ring buffer columnar de capacidad fija con append O(1)
+    
+    Los índices lógicos van de 0 (muestra más antigua) a len()-1. Las
+    ventanas que no cruzan el final del array físico se devuelven como
+    vistas NumPy sin copia.
+    """
+    
+    def __init__(self, capacity, calibration=None):
+        self.capacity = capacity
+        self.calibration = calibration  # CalibrationTable: canales calibrados van en cuentas
+        self.timestamps = np.empty(capacity, dtype=np.float64)
+        self.entry_ids = np.empty(capacity, dtype=np.int64)
+        self.sensor_counts = np.zeros(capacity, dtype=np.int16)
+        self.memory_free = np.zeros(capacity, dtype=np.int32)
+        self.device_codes = np.zeros(capacity, dtype=np.uint16)
+        self.devices = CodeTable(np.uint16)
+        
+        self.columns = {}         # nombre → ChannelColumn (orden de aparición)
+        self.columns_by_id = []   # ID del ChannelRegistry → ChannelColumn (o None)
+        self.layout_columns = {}  # ChannelLayout → (columnas presentes, ausentes)
+        
+        self.head = 0   # Próxima posición física de escritura
+        self.size = 0
+        self.total = 0  # Muestras añadidas desde el último clear()
+    
+    def __len__(self):
+        return self.size
+    
+    def _layout_columns(self, layout):
+        """Columnas en el orden del layout + columnas ausentes (cacheado)"""
+        cached = self.layout_columns.get(layout)
+        if cached is None:
+            by_id = self.columns_by_id
+            for channel_id, name in zip(layout.ids, layout.names):
+                if channel_id >= len(by_id):
+                    by_id.extend([None] * (channel_id + 1 - len(by_id)))
+                if by_id[channel_id] is None:
+                    raw_mode = self.calibration is not None and self.calibration.current(name) is not None
+                    column = ChannelColumn(name, self.capacity, raw_mode, channel_id)
+                    self.columns[name] = by_id[channel_id] = column
+                    # Un canal nuevo cambia las columnas ausentes de todos los layouts
+                    self.layout_columns.clear()
+            
+            ids = set(layout.ids)
+            present = [by_id[channel_id] for channel_id in layout.ids]
+            absent = [column for column in self.columns.values() if column.channel_id not in ids]
+            cached = (present, absent)
+            self.layout_columns[layout] = cached
+        return cached
+    
+    def append(self, record, entry_id):
+        """Agregar un SensorRecord en O(1)"""
+        i = self.head
+        self.timestamps[i] = record.timestamp
+        self.entry_ids[i] = entry_id
+        self.sensor_counts[i] = record.sensor_count or 0
+        self.memory_free[i] = record.memory_free or 0
+        self.device_codes[i] = self.devices.code(record.device_id)
+        
+        present, absent = self._layout_columns(record.layout)
+        values, status, units = record.values, record.status, record.units
+        voltages, raws = record.voltages, record.raws
+        
+        for j, column in enumerate(present):
+            column.status[i] = status[j]
+            column.unit_codes[i] = column.units.code(units[j])
+            
+            if column.counts is not None:
+                raw = raws[j]
+                if 0 <= raw < RAW_MISSING:
+                    column.counts[i] = raw
+                    if column.values is not None:
+                        column.values[i] = NAN
+                else:
+                    # Sin raw: se conserva el valor que informó la placa
+                    column.counts[i] = RAW_MISSING
+                    value = values[j]
+                    if value == value or column.values is not None:
+                        column.value_column()[i] = value
+                continue
+            
+            column.values[i] = values[j]
+            voltage = voltages[j]
+            if voltage == voltage:
+                column.voltage_column()[i] = voltage
+            elif column.voltages is not None:
+                column.voltages[i] = NAN
+            
+            raw = raws[j]
+            if raw == raw:
+                column.raw_column()[i] = raw
+            elif column.raws is not None:
+                column.raws[i] = NAN
+        
+        for column in absent:
+            column.status[i] = STATUS_MISSING
+            if column.values is not None:
+                column.values[i] = NAN
+            if column.counts is not None:
+                column.counts[i] = RAW_MISSING
+                continue
+            if column.voltages is not None:
+                column.voltages[i] = NAN
+            if column.raws is not None:
+                column.raws[i] = NAN
+        
+        self.head = (i + 1) % self.capacity
+        if self.size < self.capacity:
+            self.size += 1
+        self.total += 1
+    
+    def segments(self, start=0, stop=None):
+        """Slices físicos (1 o 2) que cubren el rango lógico [start, stop)"""
+        stop = self.size if stop is None else min(stop, self.size)
+        start = max(0, start)
+        if stop <= start:
+            return []
+        
+        first = (self.head - self.size + start) % self.capacity
+        length = stop - start
+        if first + length <= self.capacity:
+            return [slice(first, first + length)]
+        return [slice(first, self.capacity), slice(0, first + length - self.capacity)]
+    
+    def view(self, array, start=0, stop=None):
+        """Ventana de una columna: vista sin copia si es contigua"""
+        slices = self.segments(start, stop)
+        if not slices:
+            return array[:0]
+        if len(slices) == 1:
+            return array[slices[0]]
+        return np.concatenate([array[s] for s in slices])
+    
+    def window(self, start=0, stop=None, channels=None):
+        """Timestamps + valores de los canales pedidos en [start, stop)"""
+        names = self.columns.keys() if channels is None else channels
+        result = {'timestamp': self.view(self.timestamps, start, stop)}
+        for name in names:
+            column = self.columns.get(name)
+            if column is None:
+                continue
+            if column.counts is not None:
+                fallback = self.view(column.values, start, stop) if column.values is not None else None
+                result[name] = counts_values(self.view(column.counts, start, stop),
+                                             self.calibration.current(name), fallback)
+            else:
+                result[name] = self.view(column.values, start, stop)
+        return result
+    
+    def search(self, t, side='left'):
+        """Índice lógico de un timestamp (búsqueda binaria sobre las dos mitades del ring)"""
+        offset = 0
+        for s in self.segments():
+            part = self.timestamps[s]
+            if part[-1] > t or (side == 'left' and part[-1] == t):
+                return offset + int(np.searchsorted(part, t, side))
+            offset += len(part)
+        return offset
+    
+    def channel_names(self):
+        """Canales vistos, en orden de aparición"""
+        return list(self.columns)
+    
+    def chunk(self, start=0, stop=None, copy=False, channels=None):
+        """Filas [start, stop) como ColumnChunk (vistas si es contiguo, salvo copy=True)"""
+        def take(array):
+            window = self.view(array, start, stop)
+            return window.copy() if copy and window.base is not None else window
+        
+        names, chunks = channels, []
+        for column in self.columns.values():
+            if names is not None and column.name not in names:
+                continue
+            if column.counts is not None:
+                chunks.append(ChannelChunk(
+                    column.name, None, take(column.status), take(column.unit_codes),
+                    list(column.units.names), counts=take(column.counts),
+                    calibration=self.calibration.current(column.name),
+                    fallback=take(column.values) if column.values is not None else None
+                ))
+                continue
+            chunks.append(ChannelChunk(
+                column.name,
+                take(column.values),
+                take(column.status),
+                take(column.unit_codes),
+                list(column.units.names),
+                take(column.voltages) if column.voltages is not None else None,
+                take(column.raws) if column.raws is not None else None
+            ))
+        
+        return ColumnChunk(take(self.timestamps), take(self.entry_ids), take(self.sensor_counts),
+                           take(self.memory_free), take(self.device_codes),
+                           list(self.devices.names), chunks)
+    
+    def iter_entries(self, start=0, stop=None):
+        """Filas en formato plano (ver ColumnChunk.iter_entries)"""
+        for s in self.segments(start, stop):
+            logical = (s.start - (self.head - self.size)) % self.capacity
+            yield from self.chunk(logical, logical + (s.stop - s.start)).iter_entries()
+    
+    def nbytes(self):
+        """Memoria ocupada por las columnas"""
+        total = (self.timestamps.nbytes + self.entry_ids.nbytes + self.sensor_counts.nbytes
+                 + self.memory_free.nbytes + self.device_codes.nbytes)
+        return total + sum(column.nbytes() for column in self.columns.values())
+    
+    def clear(self):
+        """Vaciar el buffer (mantiene columnas reservadas)"""
+        self.head = 0
+        self.size = 0
+        self.total = 0
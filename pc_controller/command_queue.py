@@ -0,0 +1,80 @@
+"""
+Canal de comandos en segundo plano para Wally
+Ejecuta las llamadas de red al ESP32 fuera del thread de Tkinter
+"""
+import queue
+import threading
+
+class CommandQueue:
+    """Worker de comandos con cola de resultados thread-safe hacia la UI"""
+    
+    def __init__(self):
+        self.pending = queue.Queue()
+        self.results = queue.Queue()
+        
+        # Trabajos con nombre que aún no terminaron (para no duplicarlos)
+        self.in_flight = set()
+        self.lock = threading.Lock()
+        
+        self.worker = threading.Thread(target=self._worker_loop, daemon=True)
+        self.worker.start()
+        
+        print("📨 Command Queue inicializada")
+    
+    def submit(self, func, *args, callback=None, name=None):
+        """Encolar trabajo; callback(result, error) se ejecuta luego en el thread UI
+        
+        Si se indica `name` y ya hay un trabajo igual en curso, se descarta.
+        """
+        if name is not None:
+            with self.lock:
+                if name in self.in_flight:
+                    return False
+                self.in_flight.add(name)
+        
+        self.pending.put((name, func, args, callback))
+        return True
+    
+    def post(self, callback, *args):
+        """Publicar un callback para el thread UI desde cualquier thread"""
+        self.results.put((callback, args))
+    
+    def _worker_loop(self):
+        """Bucle del worker: ejecuta trabajos en orden de llegada"""
+        while True:
+            item = self.pending.get()
+            if item is None:
+                break
+            
+            name, func, args, callback = item
+            result, error = None, None
+            
+            try:
+                result = func(*args)
+            except Exception as e:
+                error = e
+                print(f"❌ Error en comando {getattr(func, '__name__', func)}: {e}")
+            
+            if name is not None:
+                with self.lock:
+                    self.in_flight.discard(name)
+            
+            if callback is not None:
+                self.results.put((callback, (result, error)))
+    
+    def process_results(self, max_items=50):
+        """Ejecutar callbacks pendientes (llamar SOLO desde el thread UI)"""
+        for _ in range(max_items):
+            try:
+                callback, args = self.results.get_nowait()
+            except queue.Empty:
+                break
+            
+            try:
+                callback(*args)
+            except Exception as e:
+                print(f"❌ Error en callback UI: {e}")
+    
+    def shutdown(self):
+        """Detener el worker"""
+        self.pending.put(None)
@@ -9,23 +9,61 @@ WINDOW_TITLE = "🔬 Wally - Sistema de Adquisición de Datos"
 WINDOW_SIZE = "1400x900"
 
 # Configuración ESP32
-ESP32_IP = "192.168.1.100"  # ← CAMBIAR por la IP de tu ESP32
+ESP32_IP = "192.168.1.100"  # ← CAMBIAR por la IP de tu ESP32 (None = usar registro de descubrimiento)
 ESP32_PORT = 8080
 CONNECTION_TIMEOUT = 5  # segundos
 
 # Configuración de adquisición de datos
 SAMPLE_INTERVAL = 1.0   # segundos entre lecturas
-MAX_BUFFER_SIZE = 1000  # máximo de entradas en buffer
+MAX_BUFFER_SIZE = 100000  # máximo de entradas en buffer (columnar, ~1 MB por canal)
 AUTO_SAVE_INTERVAL = 300  # auto-guardar cada 5 minutos
 
 # Configuración de archivos
 DATA_DIRECTORY = "data/"
 DEFAULT_CSV_NAME = "wally_sensor_data.csv"
 LOG_FILE = "data/system.log"
+SESSION_DIRECTORY = "data/sessions/"  # logs de sesión (write-ahead)
+SESSION_FSYNC_INTERVAL = 1.0  # segundos entre fsync del log de sesión
+SESSION_BATCH_SIZE = 256      # lecturas máximas por escritura
+SEGMENT_SIZE = 10000          # filas por segmento comprimido en disco
+EXPORT_COMPRESSION = "zstd"   # Parquet/Feather: zstd, lz4, snappy (solo Parquet), none
+EXPORT_PROGRESS_INTERVAL = 0.25  # segundos entre avisos de avance al exportar
+
+# Estadísticas por canal
+STATS_EWMA_ALPHA = 0.1  # suavizado de la media móvil exponencial
+STATS_WINDOW = 60       # segundos de la ventana deslizante
+PYRAMID_BASE = 16       # muestras por bucket del nivel 0 de la pirámide de historial
+
+# Calibración (cuentas ADC → valor), mismo convenio que el firmware:
+# valor = voltaje * pendiente + offset, voltaje = raw * ADC_REFERENCE_VOLTAGE / ADC_MAX_COUNT
+# Opt-in: con STORE_RAW_COUNTS los canales de CHANNEL_CALIBRATION se guardan como cuentas uint16
+# y su valor se calcula con la calibración local, REEMPLAZANDO el que envía la placa
+# (las lecturas sin raw conservan el valor de la placa). El firmware promedia 3 lecturas pero
+# envía raw truncado (int(raw_avg)): el valor local puede quedar hasta 1 cuenta por debajo del
+# de la placa (3.3/4095 V ≈ 0.8 mV, ~0.08 °C en generic_temperature)
+STORE_RAW_COUNTS = False
+ADC_MAX_COUNT = 4095
+ADC_REFERENCE_VOLTAGE = 3.3
+CALIBRATION_FILE = "data/calibration.json"  # historial de versiones de calibración
+CHANNEL_CALIBRATION = {
+    'generic_temperature': (100.0, -50.0),  # (V - 0.5) * 100
+    'generic_ph': (-3.0, 14.5),             # 7 - (V - 2.5) * 3
+    'generic_motion': (3.0303, -5.0),       # (V - 1.65) / 0.33
+    'generic_pressure': (50.0, 0.0),        # V * 50
+    'vernier_temperatura': (100.0, -50.0),  # (V - 0.5) * 100
+    'vernier_fuerza': (50.0, -125.0)        # (V - 2.5) * 50
+}
 
 # UI Configuration
-CHART_UPDATE_INTERVAL = 1000  # ms
-MAX_CHART_POINTS = 100       # puntos máximos en gráfico
+CHART_UPDATE_INTERVAL = 50     # ms entre frames del render (20 FPS, independiente del muestreo)
+MAX_CHART_POINTS = 20000       # muestras que conserva el gráfico en vivo
+CHART_MAX_DRAWN_POINTS = 2000  # puntos dibujados por línea (≈ 2 por píxel; se ajusta al redimensionar)
+CHART_DOWNSAMPLING = 'lttb'    # 'lttb', 'minmax' (envolvente que conserva picos) o None
+CHART_MARKER_POINTS = 150      # marcadores 'o' solo con pocos puntos visibles
+CHART_BACKEND = 'matplotlib'   # 'matplotlib' o 'tkcanvas' (polilíneas nativas: arranque y frames livianos)
+CHART_RENDER_WORKER = False    # dibujar el gráfico con Agg en un thread aparte (equipos lentos)
+SENSOR_CARD_COLUMNS = 2        # columnas de tarjetas (una por canal del dispositivo)
+STARTUP_REPORT = True          # imprimir tiempos de arranque (imports, primer frame, gráfico listo)
 CHART_COLORS = {
     'temperature': '#FF4444',  # Rojo
     'ph': '#44FF44',          # Verde
@@ -56,7 +94,43 @@ SENSOR_RANGES = {
     'pressure': (0, 1000)      # kPa
 }
 
+# Registro de canales: nombre en el dispositivo → tipo de sensor del dashboard
+# (los canales sin tipo reciben etiqueta, unidad y color automáticos)
+CHANNEL_KINDS = {
+    'generic_temperature': 'temperature',
+    'generic_ph': 'ph',
+    'generic_motion': 'motion',
+    'generic_pressure': 'pressure',
+    'vernier_temperatura': 'temperature'
+}
+CHANNEL_PALETTE = ['#AA44FF', '#00AAAA', '#AA7744', '#FF44AA', '#888800', '#4488FF']
+
 # Networking
 HTTP_TIMEOUT = 3  # segundos
 RETRY_ATTEMPTS = 3
-RETRY_DELAY = 1   # segundos entre reintentos
\ No newline at end of file
+RETRY_DELAY = 1   # segundos entre reintentos
+
+# Reconexión automática (backoff exponencial con jitter)
+RECONNECT_BASE_DELAY = 0.5   # segundos, primer reintento
+RECONNECT_MAX_DELAY = 15     # segundos, tope del backoff
+RECONNECT_GIVE_UP = 600      # segundos sin conexión antes de detener (None = nunca)
+PING_TIMEOUT = 2             # segundos, sonda /ping de reconexión
+
+# Canal de comandos en segundo plano
+VERNIER_STATUS_TTL = 5       # segundos de validez del status Vernier cacheado
+COMMAND_POLL_INTERVAL = 100  # ms entre revisiones de resultados en la UI
+
+# Métricas de transporte (histogramas de latencia por endpoint)
+METRICS_WINDOW = 60          # segundos de historia en los percentiles
+METRICS_SLOTS = 6            # sub-ventanas que rotan dentro de METRICS_WINDOW
+METRICS_UI_INTERVAL = 2      # segundos entre refrescos del panel de latencia
+
+# Descubrimiento de placas en la LAN (discovery.py)
+DISCOVERY_PORT = 8081           # puerto UDP de anuncios (igual que esp32/config.py)
+DISCOVERY_SUBNET = None         # ej. "192.168.1.0/24"; None = subred local /24
+DISCOVERY_TIMEOUT = 0.5         # segundos por host al escanear
+DISCOVERY_WORKERS = 64          # conexiones simultáneas durante el escaneo
+DISCOVERY_LISTEN_TIME = 2.0     # segundos esperando respuestas UDP
+DISCOVERY_PINGS = 5             # pings para medir RTT
+DISCOVERY_POLL_TIME = 2.0       # segundos midiendo la tasa de sondeo sostenible
+DEVICE_REGISTRY_FILE = "data/devices.json"
@@ -0,0 +1,143 @@
+"""
+Wally Data Acquisition System - Daemon
+Adquisición y almacenamiento sin interfaz gráfica (no importa Tk ni matplotlib)
+    
+    python -m pc_controller.daemon --device 192.168.1.100:8080 --out /srv/wally
+"""
+import argparse
+import os
+import signal
+import sys
+import threading
+import time
+
+# Agregar directorio actual al path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import config
+from acquisition import AcquisitionEngine
+from data_manager import DataManager
+from discovery import DeviceRegistry
+from esp32_client import ESP32Client
+
+# Código de salida de cada forma de terminar
+EXIT_OK = 0
+EXIT_NO_DEVICE = 1
+EXIT_CONNECTION_LOST = 2
+EXIT_ERROR = 3
+
+STATUS_LABELS = {"connected": "🟢 conectado", "reconnecting": "🔄 reconectando",
+                 "lost": "🔴 conexión perdida", "disconnected": "🔴 detenido"}
+
+def parse_device(value):
+    """'IP' o 'IP:PUERTO' → (ip, puerto)"""
+    ip, _, port = value.partition(":")
+    try:
+        return ip, int(port) if port else config.ESP32_PORT
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"puerto inválido: {port}")
+
+def set_output_directory(directory):
+    """Datos y logs de sesión bajo otro directorio (calibración y registro de placas no se mueven)"""
+    config.DATA_DIRECTORY = directory
+    config.SESSION_DIRECTORY = os.path.join(directory, "sessions")
+    config.LOG_FILE = os.path.join(directory, "system.log")
+    os.makedirs(config.SESSION_DIRECTORY, exist_ok=True)
+
+def format_stats(stats, previous_count, elapsed):
+    """Una línea de estadísticas para stdout"""
+    new_readings = stats['total_readings'] - previous_count
+    rate = new_readings / elapsed if elapsed > 0 else 0
+    status = stats['connection_status']
+    return (f"📊 {time.strftime('%H:%M:%S')} | {STATUS_LABELS.get(status, status)}"
+            f" | lecturas {stats['total_readings']} (+{new_readings}, {rate:.2f} Hz)"
+            f" | buffer {stats['buffer_usage_percent']:.0f}%"
+            f" | en disco {stats['stored_readings']} ({stats['segments']} segmentos)")
+
+def format_latency(latency, endpoint="/sensors"):
+    """p50/p95 de la petición de lectura, o cadena vacía si aún no hay datos"""
+    total = latency.get(endpoint, {}).get('phases', {}).get('total')
+    if not total:
+        return ""
+    errors = latency[endpoint]['errors']
+    return f"   {endpoint} p50 {total['p50']:.0f} ms | p95 {total['p95']:.0f} ms | errores {errors}"
+
+def run(args):
+    """Conectar, adquirir hasta recibir una señal y cerrar la sesión; devuelve el código de salida"""
+    stop = threading.Event()
+    lost = threading.Event()
+    
+    def on_signal(signum, frame):
+        print(f"\n🛑 Señal {signal.Signals(signum).name}: deteniendo adquisición")
+        stop.set()
+    
+    # SIGHUP no existe en Windows
+    for name in ("SIGINT", "SIGTERM", "SIGHUP"):
+        if hasattr(signal, name):
+            signal.signal(getattr(signal, name), on_signal)
+    
+    data_manager = DataManager()
+    esp32_client = ESP32Client()
+    device_registry = DeviceRegistry()
+    
+    def on_lost():
+        lost.set()
+        stop.set()
+    
+    engine = AcquisitionEngine(data_manager, esp32_client, device_registry, on_lost=on_lost)
+    
+    if not engine.connect(args.device):
+        ip, port = engine.target_device
+        print(f"❌ No se pudo conectar a la placa {ip}:{port}" if ip else "❌ Ninguna placa en el registro de descubrimiento")
+        return EXIT_NO_DEVICE
+    
+    ip, port = engine.target_device
+    print(f"🚀 Wally DAQ daemon v{config.VERSION} - ESP32 {ip}:{port}")
+    print(f"💾 Directorio de datos: {config.DATA_DIRECTORY} | intervalo {config.SAMPLE_INTERVAL} s")
+    engine.start()
+    
+    # Estadísticas periódicas hasta recibir una señal (o perder la placa)
+    previous_count = 0
+    previous_time = time.monotonic()
+    while not stop.wait(args.stats_interval):
+        now = time.monotonic()
+        stats = engine.get_stats()
+        print(format_stats(stats, previous_count, now - previous_time), flush=True)
+        latency = format_latency(esp32_client.get_latency_stats())
+        if latency:
+            print(latency, flush=True)
+        previous_count = stats['total_readings']
+        previous_time = now
+    
+    # Cierre ordenado: thread de adquisición, log de sesión y segmentos
+    engine.stop()
+    data_manager.close_session()
+    
+    stats = engine.get_stats()
+    print(f"👋 Daemon detenido - {stats['total_readings']} lecturas en {stats['uptime_seconds']:.0f} s", flush=True)
+    return EXIT_CONNECTION_LOST if lost.is_set() else EXIT_OK
+
+def main(argv=None):
+    """CLI: python -m pc_controller.daemon [--device IP[:PUERTO]] [--out DIR] [--interval S]"""
+    parser = argparse.ArgumentParser(description="Adquisición Wally sin interfaz gráfica")
+    parser.add_argument("--device", type=parse_device,
+                        help="Placa IP[:PUERTO] (por defecto config.ESP32_IP o el registro de descubrimiento)")
+    parser.add_argument("--out", help=f"Directorio de datos y sesiones (por defecto {config.DATA_DIRECTORY})")
+    parser.add_argument("--interval", type=float, help=f"Segundos entre lecturas (por defecto {config.SAMPLE_INTERVAL})")
+    parser.add_argument("--stats-interval", type=float, default=10.0,
+                        help="Segundos entre líneas de estadísticas (por defecto 10)")
+    args = parser.parse_args(argv)
+    
+    if args.out:
+        set_output_directory(args.out)
+    if args.interval:
+        config.SAMPLE_INTERVAL = args.interval
+    
+    try:
+        return run(args)
+    except Exception as e:
+        print(f"❌ Error fatal en daemon: {e}")
+        return EXIT_ERROR
+
+if __name__ == "__main__":
+    sys.exit(main())
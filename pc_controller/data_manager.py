@@ -3,27 +3,262 @@ Data Manager para Wally - Gestión de datos y archivos
 """
 import csv
 import json
+import threading
 import time
 from datetime import datetime
-from collections import deque
 import os
+import numpy as np
 import config
+from calibration import CalibrationTable
+from channel_stats import StatsTracker
+from columnar_buffer import ColumnarRingBuffer
+from history_pyramid import HistoryPyramid
+from segment_store import SegmentStore
+from sensor_record import SensorDecoder, SensorRecord, STATUS_ACTIVE, STATUS_MISSING, STATUS_NAMES
+from session_log import (SessionLog, SessionReader, encode_line, find_unclosed_sessions,
+                         is_ndjson_file, mark_recovered, open_session_file,
+                         session_header)
+
+def _entry_dict(entry):
+    """Fila de iter_entries() → formato dict original de /sensors"""
+    timestamp, device_id, entry_id, sensor_count, memory_free, readings = entry
+    return {
+        'timestamp': timestamp,
+        'device_id': device_id,
+        'readings': {
+            name: {'value': value, 'unit': unit, 'voltage': voltage, 'raw': raw, 'status': status}
+            for name, value, unit, voltage, raw, status in readings
+        },
+        'sensor_count': sensor_count,
+        'memory_free': memory_free,
+        'entry_id': entry_id
+    }
+
+# Columnas de exportación (mismo formato largo que el CSV: una fila por sensor y lectura)
+EXPORT_COLUMNS = [
+    'timestamp', 'datetime', 'device_id', 'entry_id',
+    'sensor_type', 'value', 'unit', 'voltage', 'raw', 'status'
+]
+
+def _write_csv_rows(writer, entries):
+    """Escribir entradas planas (ColumnChunk.iter_entries) como filas CSV; devuelve cuántas"""
+    rows = 0
+    last_second, datetime_str = None, None
+    for timestamp, device_id, entry_id, _, _, readings in entries:
+        # Formatear la fecha solo cuando cambia el segundo
+        second = int(timestamp)
+        if second != last_second:
+            datetime_str = datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S')
+            last_second = second
+        
+        # Una fila por sensor
+        for sensor_type, value, unit, voltage, raw, status in readings:
+            writer.writerow({
+                'timestamp': timestamp,
+                'datetime': datetime_str,
+                'device_id': device_id,
+                'entry_id': entry_id,
+                'sensor_type': sensor_type,
+                'value': value,
+                'unit': unit,
+                'voltage': voltage,
+                'raw': raw,
+                'status': status
+            })
+            rows += 1
+    return rows
+
+def _recover_to_csv(reader, filename, batch_size=None):
+    """Pasar a CSV un log interrumpido por bloques de SEGMENT_SIZE lecturas; devuelve cuántas
+    
+    Solo un bloque vive en memoria: una sesión de varios días no se carga entera.
+    """
+    batch_size = batch_size or config.SEGMENT_SIZE
+    session, csvfile, writer = None, None, None
+    count = 0
+    try:
+        for data in reader:
+            if session is None:
+                os.makedirs(os.path.dirname(filename) or ".", exist_ok=True)
+                session = DataManager(capacity=batch_size, log_session=False)
+                csvfile = open(filename, 'w', newline='', encoding='utf-8')
+                writer = csv.DictWriter(csvfile, fieldnames=EXPORT_COLUMNS)
+                writer.writeheader()
+            
+            session.add_reading(data)
+            count += 1
+            if len(session.data_buffer) == batch_size:
+                _write_csv_rows(writer, session.data_buffer.iter_entries())
+                session.data_buffer.clear()
+        
+        if session is not None and len(session.data_buffer):
+            _write_csv_rows(writer, session.data_buffer.iter_entries())
+    finally:
+        if csvfile is not None:
+            csvfile.close()
+    return count
+
+_STATUS_LABELS = np.array([STATUS_NAMES[code] for code in sorted(STATUS_NAMES)], dtype=object)
+
+def _export_schema():
+    """Esquema Arrow tipado de las exportaciones columnares"""
+    import pyarrow as pa
+    return pa.schema([
+        ('timestamp', pa.float64()),
+        ('datetime', pa.timestamp('ms', tz='UTC')),
+        ('device_id', pa.string()),
+        ('entry_id', pa.int64()),
+        ('sensor_type', pa.string()),
+        ('value', pa.float64()),
+        ('unit', pa.string()),
+        ('voltage', pa.float64()),
+        ('raw', pa.int32()),
+        ('status', pa.string())
+    ])
+
+def _chunk_frame(chunk):
+    """ColumnChunk → DataFrame largo y tipado (vectorizado, sin recorrer filas)"""
+    import pandas as pd
+    
+    rows, channels = [], []
+    for channel in chunk.channels:
+        present = np.flatnonzero(channel.status != STATUS_MISSING)
+        if len(present):
+            rows.append(present)
+            channels.append(channel)
+    
+    if not rows:
+        return pd.DataFrame({column: [] for column in EXPORT_COLUMNS})
+    
+    def gather(get, dtype=None):
+        return np.concatenate([np.asarray(get(channel), dtype=dtype)[index]
+                               for channel, index in zip(channels, rows)])
+    
+    index = np.concatenate(rows)
+    empty = np.full(len(chunk), np.nan)
+    # Orden por lectura y, dentro de cada una, por canal (como el CSV)
+    order = np.argsort(index, kind='stable')
+    timestamps = chunk.timestamps[index][order]
+    
+    frame = pd.DataFrame({
+        'timestamp': timestamps,
+        'datetime': pd.to_datetime(timestamps, unit='s', utc=True),
+        'device_id': np.asarray(chunk.devices, dtype=object)[chunk.device_codes[index][order]],
+        'entry_id': chunk.entry_ids[index][order],
+        'sensor_type': gather(lambda c: np.full(len(chunk), c.name, dtype=object))[order],
+        'value': gather(lambda c: c.values)[order],
+        'unit': gather(lambda c: np.asarray(c.units, dtype=object)[c.unit_codes] if c.units
+                       else np.full(len(chunk), None, dtype=object))[order],
+        'voltage': gather(lambda c: c.voltages if c.voltages is not None else empty)[order],
+        'raw': pd.array(gather(lambda c: c.raws if c.raws is not None else empty, np.float64)[order],
+                        dtype='Int32'),
+        'status': _STATUS_LABELS[gather(lambda c: c.status)[order]]
+    })
+    return frame
+
+def _concat(parts, dtype):
+    """Unir arrays; sin copia si hay uno solo"""
+    if not parts:
+        return np.empty(0, dtype=dtype)
+    return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+def _active_values(channel):
+    """Valores de un canal con NaN donde no está activo (vista si todos lo están)"""
+    inactive = channel.status != STATUS_ACTIVE
+    if inactive.any():
+        return np.where(inactive, np.nan, channel.values)
+    return channel.values
+
+def _resample(data, step, t0=None):
+    """Promediar columnas en intervalos de `step` segundos (NaN si no hay datos)"""
+    timestamps = data['timestamp']
+    if len(timestamps) == 0:
+        return data
+    
+    base = timestamps[0] if t0 is None else t0
+    bins = ((timestamps - base) // step).astype(np.int64)
+    count = int(bins[-1]) + 1
+    
+    result = {'timestamp': base + np.arange(count) * step}
+    for name, values in data.items():
+        if name == 'timestamp':
+            continue
+        valid = ~np.isnan(values)
+        sums = np.bincount(bins[valid], weights=values[valid], minlength=count)
+        counts = np.bincount(bins[valid], minlength=count)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            result[name] = sums / counts
+    return result
+
+class ExportCancelled(Exception):
+    """La exportación se canceló antes de terminar"""
+
+class SessionSnapshot:
+    """Vista fija de la sesión: segmentos del índice, bloques pendientes y cola del ring
+    
+    Camino indexado común a consultas y exportaciones: el índice de
+    segmentos descarta archivos fuera de rango y dentro de cada bloque
+    el corte se hace por búsqueda binaria sobre los timestamps. Los
+    segmentos son inmutables y la cola del ring se copió al crear la
+    foto, así que las lecturas que lleguen después no la alteran.
+    """
+    
+    def __init__(self, store, segments, tail, t0=None, t1=None, channels=None):
+        self.store = store
+        self.segments = segments
+        self.tail = tail
+        self.t0 = t0
+        self.t1 = t1
+        self.channels = channels
+    
+    def __len__(self):
+        """Filas aproximadas (cota superior si el rango corta segmentos)"""
+        rows = len(self.tail)
+        if self.segments is not None:
+            entries, pending = self.segments
+            rows += sum(entry['rows'] for entry in entries) + sum(len(chunk) for chunk in pending)
+        return rows
+    
+    def iter_chunks(self):
+        """Bloques de la foto en orden temporal"""
+        chunks = self.store.iter_chunks(self.segments, self.channels) if self.store is not None else ()
+        for chunk in chunks:
+            first, last = chunk.time_range(self.t0, self.t1)
+            if last > first:
+                yield chunk.slice(first, last) if last - first < len(chunk) else chunk
+        if len(self.tail):
+            yield self.tail
 
 class DataManager:
     """Gestor de datos del sistema Wally"""
     
-    def __init__(self):
-        self.data_buffer = deque(maxlen=config.MAX_BUFFER_SIZE)
+    def __init__(self, capacity=None, log_session=True):
+        self.capacity = capacity or config.MAX_BUFFER_SIZE
+        # Canales calibrados se guardan en cuentas ADC; valores al leer
+        self.calibration = CalibrationTable() if config.STORE_RAW_COUNTS else None
+        self.layout_calibrations = {}  # ChannelLayout → [Calibration o None] por posición
+        self.data_buffer = ColumnarRingBuffer(self.capacity, self.calibration)
+        self.lock = threading.Lock()  # Adquisición escribe, UI/exportación leen
         self.start_time = None
         self.reading_count = 0
+        self.decoder = SensorDecoder()
+        self.channel_stats = StatsTracker()
+        self.history_pyramid = HistoryPyramid()  # min/max/media multi-resolución para zoom
+        self.log_session = log_session
+        self.session_log = None
+        
+        # Filas que salen del ring se guardan antes en segmentos de disco
+        self.segment_store = None
+        self.segment_size = min(config.SEGMENT_SIZE, self.capacity // 2)
+        self.spilled = 0  # Filas del ring ya entregadas al segment store
         
         # Crear directorio de datos si no existe
         os.makedirs(config.DATA_DIRECTORY, exist_ok=True)
         
-        print(f"📊 Data Manager inicializado - Buffer máximo: {config.MAX_BUFFER_SIZE}")
+        print(f"📊 Data Manager inicializado - Buffer máximo: {self.capacity}")
     
     def add_reading(self, data):
-        """Agregar nueva lectura al buffer"""
+        """Agregar nueva lectura al buffer (SensorRecord o dict de /sensors)"""
         if not data:
             return
         
@@ -31,33 +266,210 @@ class DataManager:
         if self.start_time is None:
             self.start_time = time.time()
         
-        # Preparar entrada para el buffer
-        entry = {
-            'timestamp': data.get('timestamp', time.time()),
-            'device_id': data.get('device_id', 'unknown'),
-            'readings': data.get('readings', {}),
-            'sensor_count': data.get('sensor_count', 0),
-            'memory_free': data.get('memory_free', 0),
-            'entry_id': self.reading_count
-        }
+        entry = self._decode(data)
+        if self.log_session and self.session_log is None:
+            self.start_session(entry.device_id)
+        
+        self._store(entry)
         
-        # Agregar al buffer
-        self.data_buffer.append(entry)
-        self.reading_count += 1
+        # Log de sesión: solo se encola, el hilo escritor va a disco
+        if self.session_log is not None:
+            self.session_log.append(entry)
         
         return True
     
-    def get_recent_data(self, limit=None):
-        """Obtener datos recientes del buffer"""
-        if limit is None:
-            return list(self.data_buffer)
+    def _decode(self, data):
+        """SensorRecord listo para guardar: entry_id asignado y calibración aplicada"""
+        if isinstance(data, SensorRecord):
+            entry = data
         else:
-            return list(self.data_buffer)[-limit:]
+            entry = self.decoder.from_dict(data)
+        entry.entry_id = self.reading_count
+        if self.calibration is not None:
+            self._calibrate(entry)
+        return entry
+    
+    def _store(self, entry):
+        """Agregar al buffer columnar y a estadísticas/pirámide (sin log de sesión)"""
+        # Agregar al buffer columnar (copia valores, no guarda el registro)
+        with self.lock:
+            self.data_buffer.append(entry, entry.entry_id)
+            self.reading_count += 1
+            self._spill_segment()
+        
+        # Estadísticas y pirámide de historial por canal en O(1), sin recorrer el buffer
+        self.channel_stats.update(entry)
+        self.history_pyramid.update(entry)
+    
+    def _calibrate(self, entry):
+        """Recalcular desde raw los valores de canales calibrados (solo con STORE_RAW_COUNTS)
+        
+        Reemplaza a propósito el valor de la placa: así estadísticas, UI y log
+        usan la misma calibración que los valores que se reconstruyen desde
+        las cuentas guardadas. Las lecturas sin raw conservan el de la placa.
+        """
+        calibrations = self.layout_calibrations.get(entry.layout)
+        if calibrations is None:
+            calibrations = [self.calibration.current(name) for name in entry.layout.names]
+            self.layout_calibrations[entry.layout] = calibrations
+        
+        values, raws = entry.values, entry.raws
+        for i, calibration in enumerate(calibrations):
+            raw = raws[i]
+            if calibration is not None and raw == raw:
+                values[i] = calibration.value(raw)
+    
+    def recalibrate(self, channel, slope, offset, note=None):
+        """Nueva versión de calibración de un canal, aplicada a toda la sesión
+        
+        Los valores de los canales en cuentas se calculan al leer, así que no
+        se reescribe nada: solo se ajustan las estadísticas (transformación lineal).
+        """
+        if self.calibration is None:
+            print("⚠️ Recalibración no disponible: STORE_RAW_COUNTS desactivado")
+            return None
+        
+        with self.lock:
+            previous = self.calibration.current(channel)
+            calibration = self.calibration.set(channel, slope, offset, note)
+            self.layout_calibrations.clear()
+            column = self.data_buffer.columns.get(channel)
+            stored_raw = column is None or column.counts is not None
+        
+        if previous is not None and previous.scale and stored_raw:
+            a = calibration.scale / previous.scale
+            b = calibration.offset - a * previous.offset
+            self.channel_stats.apply_linear(channel, a, b)
+            self.history_pyramid.apply_linear(channel, a, b)
+        elif not stored_raw:
+            print(f"⚠️ {channel} no se guarda en cuentas: la calibración aplica a lecturas nuevas")
+        
+        self.calibration.save()
+        print(f"🎯 {channel} recalibrado (v{calibration.version}): pendiente {slope}, offset {offset}")
+        return calibration
+    
+    def start_session(self, device_id=None):
+        """Abrir log de sesión y segment store para las próximas lecturas"""
+        self.session_log = SessionLog()
+        self.session_log.start({'device_id': device_id})
+        with self.lock:
+            self.segment_store = SegmentStore(self.session_log.session_id,
+                                              calibration=self.calibration)
+            self.spilled = self.data_buffer.total
+    
+    def _spill_segment(self):
+        """Copiar al segment store el bloque más antiguo aún no guardado (con lock)"""
+        if self.segment_store is None:
+            return
+        if self.data_buffer.total - self.spilled < self.segment_size:
+            return
+        
+        start = self._tail_start()
+        self.segment_store.add(self.data_buffer.chunk(start, start + self.segment_size, copy=True))
+        self.spilled += self.segment_size
+    
+    def _tail_start(self):
+        """Índice lógico en el ring de la primera fila no guardada en segmentos"""
+        size = len(self.data_buffer)
+        return max(0, size - (self.data_buffer.total - self.spilled))
+    
+    def snapshot(self, t0=None, t1=None, channels=None):
+        """Foto de la sesión en este instante (ver SessionSnapshot)"""
+        with self.lock:
+            store = self.segment_store
+            segments = store.snapshot(t0, t1) if store else None
+            start = self._tail_start()
+            if t0 is not None:
+                start = max(start, self.data_buffer.search(t0, 'left'))
+            stop = None if t1 is None else self.data_buffer.search(t1, 'right')
+            tail = self.data_buffer.chunk(start, stop, copy=True, channels=channels)
+        
+        return SessionSnapshot(store, segments, tail, t0, t1, channels)
+    
+    def iter_chunks(self, t0=None, t1=None, channels=None):
+        """Bloques columnares de la sesión (segmentos + ring) recortados a [t0, t1]"""
+        return self.snapshot(t0, t1, channels).iter_chunks()
+    
+    def iter_entries(self, t0=None, t1=None):
+        """Filas de la sesión en formato plano (ver ColumnChunk.iter_entries)"""
+        for chunk in self.iter_chunks(t0, t1):
+            yield from chunk.iter_entries()
+    
+    def query(self, t0=None, t1=None, channels=None, step=None, frame=False):
+        """Consultar un rango de tiempo de toda la sesión
+        
+        Devuelve {'timestamp': array, canal: array} con NaN donde el canal
+        falta o no está activo; si el rango cae en un solo bloque los arrays
+        son vistas. Con step (segundos) se promedia en intervalos regulares
+        y con frame=True se devuelve un DataFrame de pandas.
+        """
+        chunks = list(self.iter_chunks(t0, t1, channels))
+        
+        names = list(channels) if channels is not None else []
+        if channels is None:
+            for chunk in chunks:
+                names.extend(c.name for c in chunk.channels if c.name not in names)
+        
+        result = {'timestamp': _concat([chunk.timestamps for chunk in chunks], np.float64)}
+        for name in names:
+            parts = []
+            for chunk in chunks:
+                channel = next((c for c in chunk.channels if c.name == name), None)
+                parts.append(_active_values(channel) if channel is not None
+                             else np.full(len(chunk), np.nan))
+            result[name] = _concat(parts, np.float64)
+        
+        if step:
+            result = _resample(result, step, t0)
+        
+        if frame:
+            import pandas as pd
+            return pd.DataFrame(result)
+        return result
+    
+    def history(self, channel, t0=None, t1=None, max_points=None):
+        """Serie de un canal para dibujar [t0, t1] con ≤ max_points puntos
+        
+        Usa el nivel de la pirámide que corresponde al rango visible, así el
+        coste no depende de la duración de la sesión. Si el rango tiene pocas
+        muestras se devuelven las lecturas originales (min = max = media).
+        Devuelve {'timestamp', 'min', 'max', 'mean', 'bucket'} o None.
+        """
+        max_points = max_points or config.CHART_MAX_DRAWN_POINTS
+        view = self.history_pyramid.view(channel, t0, t1, max_points)
+        if view is None:
+            return None
+        
+        bucket, starts, ends, low, high, mean = view
+        if bucket == self.history_pyramid.base and len(starts) * bucket <= max_points:
+            data = self.query(t0, t1, [channel])
+            values = data.get(channel, np.empty(0))
+            return {'timestamp': data['timestamp'], 'min': values, 'max': values,
+                    'mean': values, 'bucket': 1}
+        
+        return {'timestamp': (starts + ends) / 2, 'min': low, 'max': high,
+                'mean': mean, 'bucket': bucket}
+    
+    def get_recent_data(self, limit=None):
+        """Obtener datos recientes del buffer (formato dict original)"""
+        with self.lock:
+            size = len(self.data_buffer)
+            start = 0 if limit is None else max(0, size - limit)
+            return [_entry_dict(entry) for entry in self.data_buffer.iter_entries(start, size)]
+    
+    def get_buffer_memory(self):
+        """Bytes reservados por el buffer columnar"""
+        with self.lock:
+            return self.data_buffer.nbytes()
     
     def get_reading_count(self):
         """Obtener número total de lecturas"""
         return self.reading_count
     
+    def get_channel_stats(self):
+        """Estadísticas incrementales por canal (sesión + ventana deslizante)"""
+        return self.channel_stats.summary()
+    
     def get_stats(self):
         """Obtener estadísticas del sistema"""
         current_time = time.time()
@@ -70,67 +482,207 @@ class DataManager:
             sample_rate = 0
         
         # Estadísticas del buffer
-        buffer_usage = len(self.data_buffer) / config.MAX_BUFFER_SIZE * 100
+        buffer_size = len(self.data_buffer)
+        buffer_usage = buffer_size / self.capacity * 100
+        
+        store = self.segment_store
+        stored_readings = store.get_row_count() if store else 0
         
         return {
             'total_readings': self.reading_count,
-            'buffer_size': len(self.data_buffer),
+            'buffer_size': buffer_size,
             'buffer_usage_percent': buffer_usage,
+            'stored_readings': stored_readings,
+            'segments': len(store.index) if store else 0,
             'duration_seconds': duration,
             'sample_rate': sample_rate,
             'start_time': self.start_time,
             'current_time': current_time
         }
     
-    def export_to_csv(self, filename):
-        """Exportar datos a archivo CSV"""
+    def _export_chunks(self, t0=None, t1=None, snapshot=None, progress=None, cancel=None):
+        """Bloques a exportar, con avance (filas hechas, total) y cancelación"""
+        snapshot = snapshot or self.snapshot(t0, t1)
+        total = len(snapshot)
+        done = 0
+        for chunk in snapshot.iter_chunks():
+            if cancel is not None and cancel.is_set():
+                raise ExportCancelled()
+            yield chunk
+            done += len(chunk)
+            if progress is not None:
+                progress(done, total)
+    
+    def _export_cancelled(self, filename):
+        """Borrar el archivo a medio escribir tras una cancelación"""
+        if os.path.exists(filename):
+            os.remove(filename)
+        print(f"⏹️ Exportación cancelada: {filename}")
+        return False
+    
+    def export_to_csv(self, filename, t0=None, t1=None, **options):
+        """Exportar datos a archivo CSV (toda la sesión o el rango [t0, t1])"""
         try:
             # Asegurar que el directorio existe
             os.makedirs(os.path.dirname(filename), exist_ok=True)
             
             with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
-                # Headers
-                fieldnames = [
-                    'timestamp', 'datetime', 'device_id', 'entry_id',
-                    'sensor_type', 'value', 'unit', 'voltage', 'raw', 'status'
-                ]
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+                writer = csv.DictWriter(csvfile, fieldnames=EXPORT_COLUMNS)
                 writer.writeheader()
                 
                 # Escribir datos
-                exported_rows = 0
-                for entry in self.data_buffer:
-                    timestamp = entry['timestamp']
-                    datetime_str = datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S')
-                    device_id = entry['device_id']
-                    entry_id = entry['entry_id']
-                    
-                    # Una fila por sensor
-                    for sensor_type, reading in entry['readings'].items():
-                        row = {
-                            'timestamp': timestamp,
-                            'datetime': datetime_str,
-                            'device_id': device_id,
-                            'entry_id': entry_id,
-                            'sensor_type': sensor_type,
-                            'value': reading.get('value'),
-                            'unit': reading.get('unit'),
-                            'voltage': reading.get('voltage'),
-                            'raw': reading.get('raw'),
-                            'status': reading.get('status')
-                        }
-                        writer.writerow(row)
-                        exported_rows += 1
+                entries = (entry for chunk in self._export_chunks(t0, t1, **options)
+                           for entry in chunk.iter_entries())
+                exported_rows = _write_csv_rows(writer, entries)
                 
             print(f"📁 CSV exportado: {filename} ({exported_rows} filas)")
             return True
             
+        except ExportCancelled:
+            return self._export_cancelled(filename)
         except Exception as e:
             print(f"❌ Error exportando CSV: {e}")
             return False
     
-    def export_to_json(self, filename):
-        """Exportar datos a archivo JSON"""
+    def export_to_parquet(self, filename, t0=None, t1=None, compression=None, **options):
+        """Exportar a Parquet tipado, bloque a bloque desde el almacén columnar"""
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            
+            os.makedirs(os.path.dirname(filename) or ".", exist_ok=True)
+            schema = _export_schema()
+            exported_rows = 0
+            
+            with pq.ParquetWriter(filename, schema,
+                                  compression=compression or config.EXPORT_COMPRESSION) as writer:
+                for chunk in self._export_chunks(t0, t1, **options):
+                    table = pa.Table.from_pandas(_chunk_frame(chunk), schema=schema, preserve_index=False)
+                    writer.write_table(table)
+                    exported_rows += table.num_rows
+            
+            print(f"📁 Parquet exportado: {filename} ({exported_rows} filas)")
+            return True
+            
+        except ExportCancelled:
+            return self._export_cancelled(filename)
+        except ImportError:
+            print("❌ Error exportando Parquet: instalar pyarrow (pip install pyarrow)")
+            return False
+        except Exception as e:
+            print(f"❌ Error exportando Parquet: {e}")
+            return False
+    
+    def export_to_feather(self, filename, t0=None, t1=None, compression=None, **options):
+        """Exportar a Feather v2 (Arrow IPC) tipado, bloque a bloque"""
+        try:
+            import pyarrow as pa
+            
+            os.makedirs(os.path.dirname(filename) or ".", exist_ok=True)
+            schema = _export_schema()
+            compression = compression or config.EXPORT_COMPRESSION
+            write_options = pa.ipc.IpcWriteOptions(
+                compression=None if compression == 'none' else compression)
+            exported_rows = 0
+            
+            with pa.OSFile(filename, 'wb') as sink, pa.ipc.new_file(sink, schema, options=write_options) as writer:
+                for chunk in self._export_chunks(t0, t1, **options):
+                    table = pa.Table.from_pandas(_chunk_frame(chunk), schema=schema, preserve_index=False)
+                    writer.write_table(table)
+                    exported_rows += table.num_rows
+            
+            print(f"📁 Feather exportado: {filename} ({exported_rows} filas)")
+            return True
+            
+        except ExportCancelled:
+            return self._export_cancelled(filename)
+        except ImportError:
+            print("❌ Error exportando Feather: instalar pyarrow (pip install pyarrow)")
+            return False
+        except Exception as e:
+            print(f"❌ Error exportando Feather: {e}")
+            return False
+    
+    def export_to_ndjson(self, filename, t0=None, t1=None, **options):
+        """Exportar la sesión como NDJSON en streaming (.gz / .xz comprimen)
+        
+        Mismo formato que el log de sesión: cabecera con metadatos y
+        estadísticas, una lectura por línea y línea de cierre. Se escribe
+        bloque a bloque, sin armar la sesión completa en memoria.
+        """
+        try:
+            os.makedirs(os.path.dirname(filename) or ".", exist_ok=True)
+            session_id = self.session_log.session_id if self.session_log else None
+            header = session_header(
+                session_id,
+                export_time=datetime.now().isoformat(),
+                start_time=self.start_time,
+                total_readings=self.reading_count,
+                stats=self.get_stats(),
+                channel_stats=self.get_channel_stats()
+            )
+            
+            exported_rows = 0
+            with open_session_file(filename, 'wb') as f:
+                f.write(encode_line(header))
+                for chunk in self._export_chunks(t0, t1, **options):
+                    f.write(b"".join(encode_line(_entry_dict(entry)) for entry in chunk.iter_entries()))
+                    exported_rows += len(chunk)
+                f.write(encode_line({'end_time': time.time(), 'readings': exported_rows}))
+            
+            print(f"📁 NDJSON exportado: {filename} ({exported_rows} lecturas)")
+            return True
+            
+        except ExportCancelled:
+            return self._export_cancelled(filename)
+        except Exception as e:
+            print(f"❌ Error exportando NDJSON: {e}")
+            return False
+    
+    def import_session(self, filename):
+        """Cargar un log o exportación NDJSON leyendo línea a línea
+        
+        Llena buffer, estadísticas y pirámide sin abrir un log de sesión (el
+        archivo no se vuelve a copiar a data/sessions/) ni tocar start_time.
+        Si no cabe en el ring, lo que sale de él va a segmentos de disco
+        (import_<sesión>) para seguir disponible en consultas y exportaciones.
+        Devuelve la cabecera del archivo (o None si falla).
+        """
+        try:
+            with SessionReader(filename) as reader:
+                session_id = (reader.header or {}).get('session_id') or os.path.basename(filename).split('.')[0]
+                count = 0
+                for data in reader:
+                    if self.segment_store is None and len(self.data_buffer) >= self.capacity - 1:
+                        with self.lock:
+                            self.segment_store = SegmentStore(f"import_{session_id}",
+                                                              calibration=self.calibration)
+                    self._store(self._decode(data))
+                    count += 1
+            
+            print(f"📂 Sesión importada: {filename} ({count} lecturas)")
+            return reader.header or {}
+            
+        except Exception as e:
+            print(f"❌ Error importando sesión: {e}")
+            return None
+    
+    def export(self, filename, t0=None, t1=None, **options):
+        """Exportar eligiendo el formato por la extensión del archivo"""
+        if is_ndjson_file(filename):
+            return self.export_to_ndjson(filename, t0, t1, **options)
+        
+        extension = os.path.splitext(filename)[1].lower()
+        exporters = {
+            '.parquet': self.export_to_parquet,
+            '.feather': self.export_to_feather,
+            '.arrow': self.export_to_feather,
+            '.json': self.export_to_json
+        }
+        return exporters.get(extension, self.export_to_csv)(filename, t0, t1, **options)
+    
+    def export_to_json(self, filename, t0=None, t1=None, **options):
+        """Exportar datos a archivo JSON (toda la sesión o el rango [t0, t1])"""
         try:
             data_export = {
                 'metadata': {
@@ -140,7 +692,8 @@ class DataManager:
                     'wally_version': config.VERSION
                 },
                 'stats': self.get_stats(),
-                'readings': list(self.data_buffer)
+                'readings': [_entry_dict(entry) for chunk in self._export_chunks(t0, t1, **options)
+                             for entry in chunk.iter_entries()]
             }
             
             with open(filename, 'w', encoding='utf-8') as jsonfile:
@@ -149,15 +702,57 @@ class DataManager:
             print(f"📁 JSON exportado: {filename}")
             return True
             
+        except ExportCancelled:
+            return self._export_cancelled(filename)
         except Exception as e:
             print(f"❌ Error exportando JSON: {e}")
             return False
     
     def clear_buffer(self):
-        """Limpiar buffer de datos"""
-        self.data_buffer.clear()
+        """Limpiar buffer de datos (la próxima lectura abre una sesión nueva)"""
+        self.close_session()
+        with self.lock:
+            self.data_buffer.clear()
+            self.segment_store = None
+            self.spilled = 0
+        self.channel_stats.reset()
+        self.history_pyramid.reset()
         print("🗑️ Buffer de datos limpiado")
     
+    def close_session(self):
+        """Cerrar el log de sesión (espera a que se escriba todo)"""
+        if self.session_log is not None:
+            self.session_log.close()
+            print(f"📝 Sesión cerrada: {self.session_log.filename} ({self.session_log.written} lecturas)")
+            self.session_log = None
+        
+        # Los segmentos ya escritos siguen disponibles para exportar
+        if self.segment_store is not None:
+            self.segment_store.close()
+    
+    def recover_sessions(self):
+        """Exportar a CSV los logs de sesiones interrumpidas; devuelve los archivos creados"""
+        recovered = []
+        active = self.session_log.filename if self.session_log else None
+        for filename in find_unclosed_sessions():
+            if filename == active:
+                continue
+            try:
+                with SessionReader(filename) as reader:
+                    session_id = (reader.header or {}).get('session_id') or os.path.basename(filename).split('.')[0]
+                    csv_filename = os.path.join(config.DATA_DIRECTORY, f"wally_recuperado_{session_id}.csv")
+                    count = _recover_to_csv(reader, csv_filename)
+                
+                if count:
+                    recovered.append(csv_filename)
+                mark_recovered(filename, count)
+                print(f"♻️ Sesión {session_id} recuperada: {count} lecturas")
+                
+            except Exception as e:
+                print(f"❌ Error recuperando {filename}: {e}")
+        
+        return recovered
+    
     def reset_stats(self):
         """Resetear estadísticas"""
         self.start_time = None
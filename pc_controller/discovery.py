@@ -0,0 +1,274 @@
+"""
+Descubrimiento de placas Wally en la red local
+Escaneo concurrente de subred + anuncios UDP, identificación vía /status
+y medición de RTT y tasa de sondeo sostenible por placa
+"""
+import argparse
+import ipaddress
+import json
+import os
+import select
+import socket
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+import config
+from utils import load_config, save_config
+
+DISCOVERY_PROBE = b"WALLY_DISCOVER"
+
+def is_wally_status(status):
+    """¿El JSON de /status corresponde a una placa Wally?"""
+    return (isinstance(status, dict) and 'device_id' in status
+            and bool(status.get('arduino_compatible') or status.get('vernier_integration')))
+
+def local_subnet():
+    """Subred /24 de la interfaz con ruta por defecto"""
+    try:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.connect(("10.255.255.255", 1))  # No envía paquetes
+        ip = sock.getsockname()[0]
+        sock.close()
+    except OSError:
+        ip = "127.0.0.1"
+    return str(ipaddress.ip_network(f"{ip}/24", strict=False))
+
+def check_port(host, port, timeout=None):
+    """Verificar si un puerto TCP acepta conexiones"""
+    try:
+        with socket.create_connection((host, port), timeout=timeout or config.DISCOVERY_TIMEOUT):
+            return True
+    except OSError:
+        return False
+
+def _session():
+    """Sesión HTTP como la del cliente (el ESP32 cierra cada conexión)"""
+    session = requests.Session()
+    session.headers['Connection'] = 'close'
+    return session
+
+def scan_subnet(subnet, port=None, timeout=None, workers=None):
+    """Escanear una subred en paralelo; devuelve [(ip, port)] con el puerto abierto"""
+    port = port or config.ESP32_PORT
+    hosts = [str(host) for host in ipaddress.ip_network(subnet, strict=False).hosts()]
+    
+    with ThreadPoolExecutor(max_workers=workers or config.DISCOVERY_WORKERS) as pool:
+        results = pool.map(lambda host: check_port(host, port, timeout), hosts)
+        return [(host, port) for host, is_open in zip(hosts, results) if is_open]
+
+def listen_announcements(duration=None, hosts=(), port=None):
+    """Sondear por broadcast UDP y recoger respuestas y anuncios de placas"""
+    duration = duration or config.DISCOVERY_LISTEN_TIME
+    port = port or config.DISCOVERY_PORT
+    found = {}
+    
+    sockets = []
+    probe = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    probe.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+    probe.bind(('', 0))
+    sockets.append(probe)
+    
+    # Escucha pasiva de anuncios periódicos (puede estar ocupado en local)
+    try:
+        passive = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        passive.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        passive.bind(('', port))
+        sockets.append(passive)
+    except OSError:
+        passive.close()
+    
+    for target in ('255.255.255.255',) + tuple(hosts):
+        try:
+            probe.sendto(DISCOVERY_PROBE, (target, port))
+        except OSError as e:
+            print(f"⚠️ No se pudo sondear {target}: {e}")
+    
+    deadline = time.monotonic() + duration
+    try:
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            
+            readable, _, _ = select.select(sockets, [], [], remaining)
+            for sock in readable:
+                data, addr = sock.recvfrom(1024)
+                try:
+                    info = json.loads(data)
+                except ValueError:
+                    continue  # Sondas de otros PCs u otro tráfico
+                if isinstance(info, dict) and info.get('wally'):
+                    # La dirección de origen es más fiable que la IP que se anuncia
+                    found[(addr[0], info.get('port', config.ESP32_PORT))] = info
+    finally:
+        for sock in sockets:
+            sock.close()
+    
+    return found
+
+def fingerprint(ip, port, timeout=None):
+    """Identificar una placa Wally vía /status; None si no lo es"""
+    try:
+        response = _session().get(f"http://{ip}:{port}/status",
+                                  timeout=timeout or config.HTTP_TIMEOUT)
+        if response.status_code != 200:
+            return None
+        status = response.json()
+    except (requests.exceptions.RequestException, ValueError):
+        return None
+    
+    if not is_wally_status(status):
+        return None
+    
+    return {
+        'ip': ip,
+        'port': port,
+        'device_id': status.get('device_id'),
+        'vernier_integration': bool(status.get('vernier_integration')),
+        'memory_free': status.get('memory_free')
+    }
+
+def measure_device(ip, port, pings=None, poll_time=None):
+    """Medir RTT de /ping y tasa máxima sostenible de /sensors"""
+    session = _session()
+    base_url = f"http://{ip}:{port}"
+    
+    rtts = []
+    for _ in range(pings or config.DISCOVERY_PINGS):
+        start = time.perf_counter()
+        try:
+            if session.get(f"{base_url}/ping", timeout=config.PING_TIMEOUT).status_code == 200:
+                rtts.append((time.perf_counter() - start) * 1000)
+        except requests.exceptions.RequestException:
+            pass
+    
+    # Sondeo back-to-back: cuántas lecturas completas por segundo aguanta la placa
+    polls, errors = 0, 0
+    start = time.perf_counter()
+    deadline = start + (poll_time or config.DISCOVERY_POLL_TIME)
+    while time.perf_counter() < deadline:
+        try:
+            response = session.get(f"{base_url}/sensors", timeout=config.HTTP_TIMEOUT)
+            response.content
+            if response.status_code == 200:
+                polls += 1
+            else:
+                errors += 1
+        except requests.exceptions.RequestException:
+            errors += 1
+    elapsed = time.perf_counter() - start
+    
+    return {
+        'rtt_ms': statistics.median(rtts) if rtts else None,
+        'rtt_max_ms': max(rtts) if rtts else None,
+        'ping_loss': 1 - len(rtts) / (pings or config.DISCOVERY_PINGS),
+        'poll_rate_hz': polls / elapsed if elapsed > 0 else 0.0,
+        'poll_errors': errors
+    }
+
+def discover_devices(subnet=None, hosts=(), listen=True, measure=True, registry=None):
+    """Descubrir placas (subred + UDP en paralelo), identificarlas y medirlas"""
+    subnet = subnet or config.DISCOVERY_SUBNET or local_subnet()
+    print(f"🔍 Buscando placas Wally en {subnet}" + (" + anuncios UDP" if listen else ""))
+    
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        scan = pool.submit(scan_subnet, subnet)
+        announced = pool.submit(listen_announcements, None, tuple(hosts)) if listen else None
+        candidates = set(scan.result())
+        if announced is not None:
+            candidates.update(announced.result())
+    candidates.update((host, config.ESP32_PORT) for host in hosts)
+    
+    with ThreadPoolExecutor(max_workers=config.DISCOVERY_WORKERS) as pool:
+        devices = [d for d in pool.map(lambda c: fingerprint(*c), sorted(candidates)) if d]
+    
+    if measure and devices:
+        print(f"⏱️ Midiendo RTT y tasa sostenible de {len(devices)} placa(s)...")
+        with ThreadPoolExecutor(max_workers=len(devices)) as pool:
+            for device, metrics in zip(devices, pool.map(lambda d: measure_device(d['ip'], d['port']), devices)):
+                device.update(metrics)
+    
+    if registry is None:
+        registry = DeviceRegistry()
+    for device in devices:
+        registry.update(device)
+    registry.save()
+    
+    print(f"✅ {len(devices)} placa(s) Wally encontradas")
+    return devices
+
+class DeviceRegistry:
+    """Registro persistente de placas descubiertas (JSON en data/)"""
+    
+    def __init__(self, filename=None):
+        self.filename = filename or config.DEVICE_REGISTRY_FILE
+        self.devices = {}
+        self.load()
+    
+    @staticmethod
+    def key(ip, port):
+        return f"{ip}:{port}"
+    
+    def load(self):
+        """Cargar registro desde disco (si existe)"""
+        if os.path.exists(self.filename):
+            self.devices = load_config(self.filename) or {}
+        return self.devices
+    
+    def save(self):
+        """Guardar registro en disco"""
+        os.makedirs(os.path.dirname(self.filename) or ".", exist_ok=True)
+        return save_config(self.devices, self.filename)
+    
+    def update(self, device):
+        """Agregar o actualizar una placa"""
+        key = self.key(device['ip'], device['port'])
+        entry = self.devices.setdefault(key, {})
+        entry.update(device)
+        entry['last_seen'] = time.time()
+        return entry
+    
+    def get_device(self, ip, port):
+        """Entrada de una placa concreta (o None)"""
+        return self.devices.get(self.key(ip, port))
+    
+    def get_devices(self):
+        """Placas ordenadas: vistas más recientemente y con menor RTT primero"""
+        return sorted(self.devices.values(),
+                      key=lambda d: (-round(d.get('last_seen', 0) / 60), d.get('rtt_ms') or float('inf')))
+    
+    def get_best_device(self):
+        """Placa sugerida para adquisición"""
+        devices = self.get_devices()
+        return devices[0] if devices else None
+
+def print_devices(devices):
+    """Tabla de placas descubiertas"""
+    print(f"{'IP':<16}{'Puerto':>7}  {'Device ID':<26}{'RTT ms':>8}{'Máx Hz':>8}")
+    for device in devices:
+        # Texto de cada celda antes de alinear: None no acepta formato de ancho
+        rtt = device.get('rtt_ms')
+        rate = device.get('poll_rate_hz')
+        rtt_text = '—' if rtt is None else f'{rtt:.1f}'
+        rate_text = '—' if rate is None else f'{rate:.1f}'
+        print(f"{device['ip']:<16}{device['port']:>7}  {device.get('device_id', '?'):<26}"
+              f"{rtt_text:>8}{rate_text:>8}")
+
+def main():
+    """CLI: python discovery.py [--subnet 192.168.1.0/24] [--host IP ...]"""
+    parser = argparse.ArgumentParser(description="Descubrir placas Wally en la red local")
+    parser.add_argument("--subnet", help="Subred a escanear (por defecto la local /24)")
+    parser.add_argument("--host", action="append", default=[], help="Host a sondear directamente")
+    parser.add_argument("--no-listen", action="store_true", help="No usar anuncios UDP")
+    parser.add_argument("--no-measure", action="store_true", help="No medir RTT ni tasa")
+    args = parser.parse_args()
+    
+    devices = discover_devices(args.subnet, args.host,
+                               listen=not args.no_listen, measure=not args.no_measure)
+    print_devices(devices)
+    print(f"💾 Registro: {config.DEVICE_REGISTRY_FILE}")
+
+if __name__ == "__main__":
+    main()
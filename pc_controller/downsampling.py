@@ -0,0 +1,151 @@
+"""
+Reducción de puntos para gráficos de Wally
+LTTB y envolvente min/max vectorizados en NumPy, con cache incremental por serie
+"""
+import numpy as np
+
+def _bucket_means(rows):
+    """Media por fila ignorando NaN (NaN si la fila no tiene datos), sin warnings"""
+    valid = ~np.isnan(rows)
+    counts = valid.sum(axis=1)
+    sums = np.where(valid, rows, 0.0).sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return sums / counts
+
+def lttb_buckets(x, y, bucket):
+    """Índice elegido dentro de cada bucket interior (Largest-Triangle-Three-Buckets)
+    
+    x e y cubren un número entero de buckets; el primero y el último solo
+    sirven de ancla. Variante vectorizada: el vértice A del triángulo es la
+    media del bucket anterior (no el punto elegido en él), así todos los
+    buckets se resuelven a la vez. Devuelve índices absolutos en x.
+    """
+    X = x.reshape(-1, bucket)
+    Y = y.reshape(-1, bucket)
+    mean_x = X.mean(axis=1)
+    mean_y = _bucket_means(Y)
+    
+    ax, ay = mean_x[:-2, None], mean_y[:-2, None]
+    cx, cy = mean_x[2:, None], mean_y[2:, None]
+    area = np.abs((ax - cx) * (Y[1:-1] - ay) - (ax - X[1:-1]) * (cy - ay))
+    area[np.isnan(area)] = -1.0  # Huecos: si todo el bucket es NaN se elige el primero
+    
+    rows = np.arange(1, len(X) - 1)
+    return rows * bucket + area.argmax(axis=1)
+
+def minmax_buckets(x, y, bucket):
+    """Índices del mínimo y el máximo de cada bucket, en orden (envolvente que conserva picos)"""
+    Y = y.reshape(-1, bucket)
+    low = np.where(np.isnan(Y), np.inf, Y).argmin(axis=1)
+    high = np.where(np.isnan(Y), -np.inf, Y).argmax(axis=1)
+    base = np.arange(len(Y)) * bucket
+    pairs = np.sort(np.stack([low, high], axis=1), axis=1) + base[:, None]
+    return pairs.ravel()
+
+def downsample(x, y, threshold, method='lttb'):
+    """Reducir una serie completa a unos `threshold` puntos (conserva el primero y el último)"""
+    n = len(x)
+    if threshold is None or n <= threshold or threshold < 3:
+        return x, y
+    
+    if method == 'minmax':
+        bucket = max(1, int(np.ceil(n / (threshold / 2))))
+        usable = (n // bucket) * bucket
+        index = minmax_buckets(x[:usable], y[:usable], bucket)
+    else:
+        bucket = max(1, int(np.ceil(n / threshold)))
+        usable = (n // bucket) * bucket
+        index = lttb_buckets(x[:usable], y[:usable], bucket) if usable // bucket >= 3 else np.empty(0, int)
+    
+    index = np.concatenate(([0], index, np.arange(usable, n) if usable < n else [n - 1]))
+    index = np.unique(index)
+    return x[index], y[index]
+
+class IncrementalDownsampler:
+    """Reducción de una ventana deslizante que crece por la derecha
+    
+    Los buckets se alinean con el índice absoluto de muestra (potencia de
+    dos de tamaño), así los ya calculados siguen siendo válidos cuando
+    llegan muestras nuevas o salen otras por la izquierda: en cada frame
+    solo se procesan los buckets recién completados. Los extremos que aún
+    no completan un bucket se dibujan sin reducir.
+    """
+    
+    def __init__(self, target, method='lttb'):
+        self.target = target
+        self.method = method
+        self.bucket = 0
+        self.first = 0      # Primer bucket (número absoluto) en cache
+        self.next = 0       # Próximo bucket a calcular
+        self.chunks = []    # [(primer bucket, últ. bucket + 1, x, y)]
+    
+    def reset(self, bucket=0):
+        self.bucket = bucket
+        self.first = self.next = 0
+        self.chunks = []
+    
+    def update(self, x, y, start=0):
+        """(x, y) a dibujar para la ventana x/y cuya primera muestra es la absoluta `start`"""
+        n = len(x)
+        if not self.target or not self.method or n <= 2 * self.target:
+            if self.bucket:
+                self.reset()
+            return x, y
+        
+        bucket = 1 << int(np.ceil(np.log2(n / self.target)))
+        if bucket != self.bucket:
+            self.reset(bucket)
+        
+        end = start + n
+        # Buckets finalizados [lo, hi): completos y sin tocar la primera ni la
+        # última muestra (se dibujan tal cual); LTTB además necesita los
+        # buckets vecinos completos como ancla
+        if self.method == 'lttb':
+            margin = 1
+            lo = -(-start // bucket) + 1
+            hi = end // bucket - 1
+        else:
+            margin = 0
+            lo = start // bucket + 1
+            hi = (end - 1) // bucket
+        if hi <= lo:
+            return x, y
+        
+        # Descartar lo que salió por la izquierda (recortando dentro de los bloques)
+        if self.next <= lo:
+            self.chunks = []
+            self.first = self.next = lo
+        elif self.first < lo:
+            per_bucket = 2 if self.method == 'minmax' else 1
+            chunks = []
+            for c0, c1, cx, cy in self.chunks:
+                if c1 <= lo:
+                    continue
+                if c0 < lo:
+                    cut = (lo - c0) * per_bucket
+                    c0, cx, cy = lo, cx[cut:], cy[cut:]
+                chunks.append((c0, c1, cx, cy))
+            self.chunks = chunks
+            self.first = lo
+        
+        if self.next < hi:
+            a = (self.next - margin) * bucket - start
+            b = (hi + margin) * bucket - start
+            xs, ys = x[a:b], y[a:b]
+            if self.method == 'minmax':
+                index = minmax_buckets(xs, ys, bucket)
+            else:
+                index = lttb_buckets(xs, ys, bucket)
+            self.chunks.append((self.next, hi, xs[index], ys[index]))
+            self.next = hi
+            
+            # Unir bloques pequeños para que concatenar siga siendo barato
+            if len(self.chunks) > 32:
+                self.chunks = [(self.chunks[0][0], hi,
+                                np.concatenate([c[2] for c in self.chunks]),
+                                np.concatenate([c[3] for c in self.chunks]))]
+        
+        head = self.first * bucket - start
+        tail = self.next * bucket - start
+        return (np.concatenate([x[:head]] + [c[2] for c in self.chunks] + [x[tail:]]),
+                np.concatenate([y[:head]] + [c[3] for c in self.chunks] + [y[tail:]]))
@@ -2,9 +2,46 @@
 Cliente HTTP para ESP32 - ACTUALIZADO con soporte Vernier
 """
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from urllib3.connectionpool import HTTPConnectionPool
+import random
+import threading
 import time
 import json
 import config
+from metrics import TransportMetrics
+from sensor_record import SensorDecoder
+
+# Estados de la máquina de reconexión
+STATE_DISCONNECTED = "disconnected"  # Sin conexión y sin reintentos programados
+STATE_CONNECTED = "connected"        # Operación normal
+STATE_BACKOFF = "backoff"            # Esperando el próximo reintento
+STATE_HALF_OPEN = "half_open"        # Sondeando /ping antes de reanudar
+
+# Duración del último DNS + connect TCP, por thread
+_connect_timing = threading.local()
+
+class _TimedHTTPConnection(HTTPConnection):
+    """Conexión urllib3 que mide el tiempo de DNS + connect"""
+    
+    def _new_conn(self):
+        start = time.perf_counter()
+        try:
+            return super()._new_conn()
+        finally:
+            _connect_timing.seconds = time.perf_counter() - start
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+class _TimedHTTPAdapter(HTTPAdapter):
+    """Adapter de requests que usa conexiones instrumentadas"""
+    
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = dict(
+            self.poolmanager.pool_classes_by_scheme, http=_TimedHTTPConnectionPool)
 
 class ESP32Client:
     def __init__(self):
@@ -13,6 +50,26 @@ class ESP32Client:
         self.last_successful_request = None
         self.consecutive_errors = 0
         
+        # Reconexión con backoff exponencial
+        self.state = STATE_DISCONNECTED
+        self.reconnect_attempts = 0
+        self.next_reconnect_at = None
+        self.disconnected_since = None
+        
+        # Cache de status Vernier (evita ir a la red en cada refresco de UI)
+        self.vernier_status_cache = None
+        self.vernier_status_cached_at = None
+        
+        # Sesión HTTP instrumentada y métricas por endpoint
+        self.metrics = TransportMetrics()
+        self.session = requests.Session()
+        self.session.mount("http://", _TimedHTTPAdapter())
+        # El servidor del ESP32 cierra el socket tras cada respuesta
+        self.session.headers['Connection'] = 'close'
+        
+        # Decodificador rápido de /sensors (layouts de canales cacheados)
+        self.decoder = SensorDecoder()
+        
         print("🌐 ESP32 Client inicializado con soporte Vernier")
     
     def connect(self, ip_address, port=8080):
@@ -22,15 +79,10 @@ class ESP32Client:
         try:
             print(f"🔗 Conectando a {self.base_url}...")
             
-            response = requests.get(
-                f"{self.base_url}/ping", 
-                timeout=config.CONNECTION_TIMEOUT
-            )
+            response = self._get("/ping", timeout=config.CONNECTION_TIMEOUT)
             
             if response.status_code == 200:
-                self.is_connected = True
-                self.consecutive_errors = 0
-                self.last_successful_request = time.time()
+                self._mark_connected()
                 
                 print(f"✅ Conectado a ESP32")
                 
@@ -55,21 +107,27 @@ class ESP32Client:
             print(f"❌ Error: {e}")
         
         self.is_connected = False
+        self.state = STATE_DISCONNECTED
         return False
     
     def get_sensor_data(self):
-        """Obtener datos de sensores (actualizado para Vernier)"""
+        """Obtener datos de sensores como dict anidado (formato original)"""
+        return self._fetch_sensors(self._json)
+    
+    def get_sensor_record(self):
+        """Obtener datos de sensores como SensorRecord plano (camino rápido)"""
+        return self._fetch_sensors(self._decode_record)
+    
+    def _fetch_sensors(self, parse):
+        """GET /sensors con manejo de errores y backoff común"""
         if not self.is_connected:
             return None
         
         try:
-            response = requests.get(
-                f"{self.base_url}/sensors",
-                timeout=config.HTTP_TIMEOUT
-            )
+            response = self._get("/sensors", timeout=config.HTTP_TIMEOUT)
             
             if response.status_code == 200:
-                data = response.json()
+                data = parse(response)
                 self.last_successful_request = time.time()
                 self.consecutive_errors = 0
                 return data
@@ -83,7 +141,8 @@ class ESP32Client:
         except requests.exceptions.ConnectionError:
             print("🔌 Error conexión datos")
             self.consecutive_errors += 1
-            self.is_connected = False
+            self._enter_backoff()
+            return None
         except json.JSONDecodeError:
             print("📄 Error JSON")
             self.consecutive_errors += 1
@@ -92,26 +151,150 @@ class ESP32Client:
             self.consecutive_errors += 1
         
         if self.consecutive_errors >= config.RETRY_ATTEMPTS:
-            self.is_connected = False
             print(f"🔴 Muchos errores ({self.consecutive_errors})")
+            self._enter_backoff()
         
         return None
     
+    # ========== TRANSPORTE INSTRUMENTADO ==========
+    
+    def _get(self, path, timeout):
+        """GET con tiempos monotónicos de connect, TTFB y transferencia"""
+        endpoint = "/vernier/command" if path.startswith("/vernier/command/") else path
+        _connect_timing.seconds = 0.0
+        start = time.perf_counter()
+        
+        try:
+            response = self.session.get(f"{self.base_url}{path}", timeout=timeout, stream=True)
+            headers_at = time.perf_counter()
+            body = response.content  # descargar body completo
+            body_at = time.perf_counter()
+        except requests.exceptions.RequestException:
+            self.metrics.record_error(endpoint)
+            raise
+        
+        connect = _connect_timing.seconds
+        self.metrics.record(
+            endpoint,
+            connect=connect,
+            ttfb=headers_at - start - connect,
+            transfer=body_at - headers_at,
+            total=body_at - start
+        )
+        self.metrics.record_request(endpoint, len(body))
+        response.wally_endpoint = endpoint
+        return response
+    
+    def _json(self, response):
+        """Decodificar JSON registrando su duración"""
+        start = time.perf_counter()
+        data = response.json()
+        self.metrics.record(response.wally_endpoint, decode=time.perf_counter() - start)
+        return data
+    
+    def _decode_record(self, response):
+        """Decodificar /sensors directamente a SensorRecord registrando su duración"""
+        start = time.perf_counter()
+        record = self.decoder.decode(response.content)
+        self.metrics.record(response.wally_endpoint, decode=time.perf_counter() - start)
+        return record
+    
+    def get_latency_stats(self):
+        """Percentiles p50/p95/p99 (ms) por endpoint y fase"""
+        return self.metrics.summary()
+    
+    # ========== RECONEXIÓN (BACKOFF + HALF-OPEN) ==========
+    
+    def _mark_connected(self):
+        """Pasar a estado conectado y reiniciar contadores de reconexión"""
+        self.is_connected = True
+        self.state = STATE_CONNECTED
+        self.consecutive_errors = 0
+        self.reconnect_attempts = 0
+        self.next_reconnect_at = None
+        self.disconnected_since = None
+        self.last_successful_request = time.time()
+    
+    def _enter_backoff(self):
+        """Marcar conexión caída y programar el próximo reintento"""
+        self.is_connected = False
+        
+        if self.state in (STATE_BACKOFF, STATE_HALF_OPEN):
+            return
+        
+        self.state = STATE_BACKOFF
+        self.reconnect_attempts = 0
+        self.disconnected_since = time.monotonic()
+        self._schedule_reconnect()
+        print("🔄 Conexión perdida - reintentando con backoff")
+    
+    def _schedule_reconnect(self):
+        """Calcular próximo reintento: exponencial con jitter"""
+        ceiling = min(
+            config.RECONNECT_MAX_DELAY,
+            config.RECONNECT_BASE_DELAY * (2 ** self.reconnect_attempts)
+        )
+        # Jitter aleatorio para que 30 estaciones no reintenten a la vez
+        delay = random.uniform(config.RECONNECT_BASE_DELAY, max(ceiling, config.RECONNECT_BASE_DELAY))
+        self.next_reconnect_at = time.monotonic() + delay
+        return delay
+    
+    def try_reconnect(self):
+        """Intentar reconexión si ya venció el backoff (sonda half-open /ping)"""
+        if self.is_connected:
+            return True
+        
+        if self.state != STATE_BACKOFF or not self.base_url:
+            return False
+        
+        if time.monotonic() < self.next_reconnect_at:
+            return False
+        
+        # Half-open: una única sonda ligera decide si se reanuda
+        self.state = STATE_HALF_OPEN
+        if self.ping(timeout=config.PING_TIMEOUT):
+            downtime = time.monotonic() - self.disconnected_since
+            self._mark_connected()
+            print(f"✅ Reconectado tras {downtime:.1f}s")
+            return True
+        
+        self.reconnect_attempts += 1
+        self.state = STATE_BACKOFF
+        delay = self._schedule_reconnect()
+        print(f"⏳ Reintento {self.reconnect_attempts} fallido - próximo en {delay:.1f}s")
+        return False
+    
+    def time_until_reconnect(self):
+        """Segundos hasta el próximo reintento programado"""
+        if self.next_reconnect_at is None:
+            return 0.0
+        return max(0.0, self.next_reconnect_at - time.monotonic())
+    
+    def get_disconnected_duration(self):
+        """Segundos transcurridos desde que se perdió la conexión"""
+        if self.disconnected_since is None:
+            return 0.0
+        return time.monotonic() - self.disconnected_since
+    
     # ========== NUEVOS MÉTODOS VERNIER ==========
     
-    def get_vernier_status(self):
-        """NUEVO: Obtener status específico Vernier"""
+    def get_vernier_status(self, max_age=None):
+        """Obtener status Vernier; con `max_age` reutiliza el cache si es reciente"""
+        if max_age is not None and self.vernier_status_cached_at is not None:
+            if time.monotonic() - self.vernier_status_cached_at < max_age:
+                return self.vernier_status_cache
+        
         if not self.is_connected:
             return None
         
         try:
-            response = requests.get(
-                f"{self.base_url}/vernier/status",
-                timeout=config.HTTP_TIMEOUT
-            )
+            response = self._get("/vernier/status", timeout=config.HTTP_TIMEOUT)
             
             if response.status_code == 200:
-                return response.json()
+                status = self._json(response)
+                self.vernier_status_cache = status
+                self.vernier_status_cached_at = time.monotonic()
+                return status
             else:
                 print(f"⚠️ Vernier status HTTP {response.status_code}")
                 
@@ -120,19 +303,31 @@ class ESP32Client:
         
         return None
     
+    def get_cached_vernier_status(self):
+        """Último status Vernier conocido, sin acceder a la red"""
+        return self.vernier_status_cache
+    
+    def _update_status_cache(self, command_result):
+        """Reflejar en el cache el estado devuelto por un comando"""
+        if not self.vernier_status_cache:
+            return
+        
+        manager = self.vernier_status_cache.setdefault('vernier_manager', {})
+        if 'active_sensor' in command_result:
+            manager['active_sensor'] = command_result['active_sensor']
+        if 'reading_active' in command_result:
+            manager['reading_active'] = command_result['reading_active']
+    
     def get_vernier_active_sensor(self):
         """NUEVO: Obtener solo sensor Vernier activo"""
         if not self.is_connected:
             return None
         
         try:
-            response = requests.get(
-                f"{self.base_url}/vernier/active",
-                timeout=config.HTTP_TIMEOUT
-            )
+            response = self._get("/vernier/active", timeout=config.HTTP_TIMEOUT)
             
             if response.status_code == 200:
-                return response.json()
+                return self._json(response)
             else:
                 print(f"⚠️ Vernier active HTTP {response.status_code}")
                 
@@ -147,14 +342,12 @@ class ESP32Client:
             return None
         
         try:
-            response = requests.get(
-                f"{self.base_url}/vernier/command/{command}",
-                timeout=config.HTTP_TIMEOUT
-            )
+            response = self._get(f"/vernier/command/{command}", timeout=config.HTTP_TIMEOUT)
             
             if response.status_code == 200:
-                result = response.json()
+                result = self._json(response)
                 print(f"✅ Comando '{command}': {result.get('result', 'OK')}")
+                self._update_status_cache(result)
                 return result
             else:
                 print(f"⚠️ Comando HTTP {response.status_code}")
@@ -196,13 +389,10 @@ class ESP32Client:
             return None
         
         try:
-            response = requests.get(
-                f"{self.base_url}/status",
-                timeout=config.HTTP_TIMEOUT
-            )
+            response = self._get("/status", timeout=config.HTTP_TIMEOUT)
             
             if response.status_code == 200:
-                return response.json()
+                return self._json(response)
             else:
                 print(f"⚠️ Status HTTP {response.status_code}")
                 
@@ -211,13 +401,13 @@ class ESP32Client:
         
         return None
     
-    def ping(self):
-        """Test conectividad (sin cambios)"""
+    def ping(self, timeout=2):
+        """Test conectividad"""
         if not self.base_url:
             return False
         
         try:
-            response = requests.get(f"{self.base_url}/ping", timeout=2)
+            response = self._get("/ping", timeout=timeout)
             return response.status_code == 200
         except:
             return False
@@ -240,11 +430,15 @@ class ESP32Client:
             return False
     
     def get_connection_info(self):
-        """Info de conexión (sin cambios)"""
+        """Info de conexión"""
         return {
             'base_url': self.base_url,
             'is_connected': self.is_connected,
+            'state': self.state,
             'last_successful_request': self.last_successful_request,
             'consecutive_errors': self.consecutive_errors,
-            'connection_age': time.time() - self.last_successful_request if self.last_successful_request else None
-        }
\ No newline at end of file
+            'reconnect_attempts': self.reconnect_attempts,
+            'disconnected_for': self.get_disconnected_duration(),
+            'connection_age': time.time() - self.last_successful_request if self.last_successful_request else None,
+            'latency': self.get_latency_stats()
+        }
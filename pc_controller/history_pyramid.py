@@ -0,0 +1,225 @@
+"""
+Pirámide multi-resolución para Wally
+Agregados min/max/media por canal en buckets de 2^k muestras, actualizados en cada lectura
+"""
+import threading
+import numpy as np
+import config
+from sensor_record import STATUS_ACTIVE
+
+class PyramidLevel:
+    """Buckets de un nivel: arrays NumPy que crecen duplicando capacidad"""
+    __slots__ = ('t0', 't1', 'min', 'max', 'sum', 'count', 'length')
+    
+    def __init__(self, capacity=64):
+        self.t0 = np.empty(capacity)
+        self.t1 = np.empty(capacity)
+        self.min = np.empty(capacity)
+        self.max = np.empty(capacity)
+        self.sum = np.empty(capacity)
+        self.count = np.empty(capacity, dtype=np.int64)
+        self.length = 0
+    
+    def append(self, t0, t1, low, high, total, count):
+        i = self.length
+        if i == len(self.t0):
+            for name in PyramidLevel.__slots__[:-1]:
+                array = getattr(self, name)
+                grown = np.empty(2 * len(array), dtype=array.dtype)
+                grown[:i] = array
+                setattr(self, name, grown)
+        self.t0[i] = t0
+        self.t1[i] = t1
+        self.min[i] = low
+        self.max[i] = high
+        self.sum[i] = total
+        self.count[i] = count
+        self.length = i + 1
+    
+    def bucket(self, i):
+        """Bucket i como tupla (t0, t1, min, max, suma, n)"""
+        return (self.t0[i], self.t1[i], self.min[i], self.max[i], self.sum[i], self.count[i])
+    
+    def range(self, t0=None, t1=None):
+        """Índices [start, stop) de los buckets que solapan [t0, t1]"""
+        n = self.length
+        start = 0 if t0 is None else int(np.searchsorted(self.t1[:n], t0, 'left'))
+        stop = n if t1 is None else int(np.searchsorted(self.t0[:n], t1, 'right'))
+        return start, max(start, stop)
+    
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in PyramidLevel.__slots__[:-1])
+
+class ChannelPyramid:
+    """Pirámide de un canal: nivel k agrega base·2^k muestras válidas
+    
+    Cada lectura entra en el bucket parcial; al llenarse sube al nivel 0 y
+    cada par de buckets de un nivel se combina en el siguiente, así el
+    coste amortizado por lectura es O(1). Cada nivel puede tener un bucket
+    'huérfano' (número impar) que aún no subió: es la cola de los niveles
+    superiores.
+    """
+    
+    def __init__(self, base=None):
+        self.base = base or config.PYRAMID_BASE
+        self.levels = []
+        self.partial = None  # [t0, t1, min, max, suma, n] del bucket en curso
+    
+    def update(self, timestamp, value):
+        partial = self.partial
+        if partial is None:
+            self.partial = [timestamp, timestamp, value, value, value, 1]
+            partial = self.partial
+        else:
+            partial[1] = timestamp
+            if value < partial[2]:
+                partial[2] = value
+            if value > partial[3]:
+                partial[3] = value
+            partial[4] += value
+            partial[5] += 1
+        
+        if partial[5] == self.base:
+            self._push(0, *partial)
+            self.partial = None
+    
+    def _push(self, k, t0, t1, low, high, total, count):
+        """Agregar un bucket al nivel k y combinar hacia arriba mientras haya pares"""
+        while True:
+            if k == len(self.levels):
+                self.levels.append(PyramidLevel())
+            level = self.levels[k]
+            level.append(t0, t1, low, high, total, count)
+            if level.length % 2:
+                return
+            
+            a0, _, a_low, a_high, a_total, a_count = level.bucket(level.length - 2)
+            t0 = a0
+            low = min(low, a_low)
+            high = max(high, a_high)
+            total += a_total
+            count += a_count
+            k += 1
+    
+    def _tail(self, k):
+        """Buckets posteriores al último del nivel k: huérfanos de niveles inferiores + parcial"""
+        tail = []
+        for j in range(min(k, len(self.levels)) - 1, -1, -1):
+            level = self.levels[j]
+            if level.length % 2:
+                tail.append(level.bucket(level.length - 1))
+        if self.partial is not None:
+            tail.append(tuple(self.partial))
+        return tail
+    
+    def view(self, t0=None, t1=None, max_points=None):
+        """Nivel más fino con ≤ max_points buckets en [t0, t1]
+        
+        Devuelve (muestras por bucket, t0, t1, min, max, media) como arrays.
+        """
+        max_points = max_points or config.CHART_MAX_DRAWN_POINTS
+        k = 0
+        for k, level in enumerate(self.levels):
+            start, stop = level.range(t0, t1)
+            if stop - start + k + 1 <= max_points:
+                break
+        else:
+            k = len(self.levels)
+        
+        if k < len(self.levels):
+            level = self.levels[k]
+            start, stop = level.range(t0, t1)
+            s = slice(start, stop)
+            columns = [level.t0[s], level.t1[s], level.min[s], level.max[s], level.sum[s], level.count[s]]
+        else:
+            columns = [np.empty(0)] * 6
+        
+        tail = [b for b in self._tail(k) if (t0 is None or b[1] >= t0) and (t1 is None or b[0] <= t1)]
+        if tail:
+            extra = np.array(tail, dtype=float).T
+            columns = [np.concatenate([column, values]) for column, values in zip(columns, extra)]
+        
+        starts, ends, low, high, total, count = columns
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = total / count
+        return self.base << k, starts, ends, low, high, mean
+    
+    def span(self):
+        """(primer, último) timestamp con datos, o None"""
+        if not self.levels:
+            return (self.partial[0], self.partial[1]) if self.partial is not None else None
+        level = self.levels[0]
+        end = self.partial[1] if self.partial is not None else level.t1[level.length - 1]
+        return level.t0[0], end
+    
+    def apply_linear(self, a, b):
+        """Reexpresar los agregados para x' = a*x + b (recalibración)"""
+        for level in self.levels:
+            n = level.length
+            low, high = level.min[:n] * a + b, level.max[:n] * a + b
+            if a < 0:
+                low, high = high, low
+            level.min[:n], level.max[:n] = low, high
+            level.sum[:n] = level.sum[:n] * a + level.count[:n] * b
+        
+        partial = self.partial
+        if partial is not None:
+            low, high = partial[2] * a + b, partial[3] * a + b
+            partial[2], partial[3] = (high, low) if a < 0 else (low, high)
+            partial[4] = partial[4] * a + partial[5] * b
+    
+    def nbytes(self):
+        return sum(level.nbytes() for level in self.levels)
+
+class HistoryPyramid:
+    """Pirámides de todos los canales, actualizadas en cada lectura (thread-safe)"""
+    
+    def __init__(self, base=None):
+        self.base = base or config.PYRAMID_BASE
+        self.channels = {}
+        self.layout_channels = {}  # ChannelLayout → [ChannelPyramid] en orden del layout
+        self.lock = threading.Lock()
+    
+    def update(self, record):
+        timestamp, values, status = record.timestamp, record.values, record.status
+        with self.lock:
+            pyramids = self.layout_channels.get(record.layout)
+            if pyramids is None:
+                pyramids = [self.channels.setdefault(name, ChannelPyramid(self.base))
+                            for name in record.layout.names]
+                self.layout_channels[record.layout] = pyramids
+            
+            for i, pyramid in enumerate(pyramids):
+                value = values[i]
+                if status[i] == STATUS_ACTIVE and value == value:
+                    pyramid.update(timestamp, value)
+    
+    def view(self, channel, t0=None, t1=None, max_points=None):
+        """Ver ChannelPyramid.view; None si el canal no tiene datos"""
+        with self.lock:
+            pyramid = self.channels.get(channel)
+            return pyramid.view(t0, t1, max_points) if pyramid is not None else None
+    
+    def span(self, channel):
+        with self.lock:
+            pyramid = self.channels.get(channel)
+            return pyramid.span() if pyramid is not None else None
+    
+    def channel_names(self):
+        with self.lock:
+            return list(self.channels)
+    
+    def apply_linear(self, channel, a, b):
+        with self.lock:
+            pyramid = self.channels.get(channel)
+            if pyramid is not None:
+                pyramid.apply_linear(a, b)
+    
+    def nbytes(self):
+        with self.lock:
+            return sum(pyramid.nbytes() for pyramid in self.channels.values())
+    
+    def reset(self):
+        with self.lock:
+            self.channels.clear()
+            self.layout_channels.clear()
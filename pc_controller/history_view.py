@@ -0,0 +1,167 @@
+"""
+Vista de historial para Wally
+Ventana con zoom (rueda) y desplazamiento (arrastrar) sobre toda la sesión
+"""
+import time
+import tkinter as tk
+from tkinter import ttk
+import matplotlib.dates as mdates
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from channel_registry import registry
+from utils import epoch_to_datenum
+
+ZOOM_STEP = 1.25  # factor de zoom por paso de rueda
+
+class HistoryView:
+    """Historial de un canal desde la pirámide multi-resolución del DataManager
+    
+    Cada redibujado pide como mucho ~2 puntos por píxel del nivel que
+    corresponde al rango visible: el coste no depende de la duración de la
+    sesión, así que el zoom y el desplazamiento responden igual con 8 horas
+    de datos que con 8 minutos.
+    """
+    
+    def __init__(self, root, data_manager):
+        self.data_manager = data_manager
+        self.t0 = None  # Rango visible en timestamps epoch (None = toda la sesión)
+        self.t1 = None
+        self.drag_start = None
+        self.envelope = None
+        
+        self.window = tk.Toplevel(root)
+        self.window.title("🔍 Historial de sesión")
+        self.window.geometry("1000x500")
+        
+        # Barra superior: canal, rango completo e info del nivel
+        toolbar = ttk.Frame(self.window, padding="5")
+        toolbar.pack(fill=tk.X)
+        
+        ttk.Label(toolbar, text="Canal:").pack(side=tk.LEFT)
+        self.channel_var = tk.StringVar()
+        self.channel_box = ttk.Combobox(toolbar, textvariable=self.channel_var,
+                                        state="readonly", width=28)
+        self.channel_box.pack(side=tk.LEFT, padx=5)
+        self.channel_box.bind("<<ComboboxSelected>>", lambda event: self.show_all())
+        
+        ttk.Button(toolbar, text="↔️ Todo", command=self.show_all).pack(side=tk.LEFT, padx=5)
+        ttk.Button(toolbar, text="🔄 Actualizar", command=self.refresh_channels).pack(side=tk.LEFT)
+        
+        self.info_label = ttk.Label(toolbar, text="", font=("Courier", 9))
+        self.info_label.pack(side=tk.RIGHT)
+        
+        # Gráfico
+        self.fig = Figure(figsize=(10, 4))
+        self.ax = self.fig.add_subplot(111)
+        self.ax.grid(True, alpha=0.3)
+        self.ax.xaxis.set_major_locator(mdates.AutoDateLocator())
+        self.ax.xaxis.set_major_formatter(mdates.DateFormatter('%H:%M:%S'))
+        self.mean_line, = self.ax.plot([], [], linewidth=1.5)
+        
+        self.canvas = FigureCanvasTkAgg(self.fig, self.window)
+        self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        self.canvas.mpl_connect('scroll_event', self.on_scroll)
+        self.canvas.mpl_connect('button_press_event', self.on_press)
+        self.canvas.mpl_connect('motion_notify_event', self.on_drag)
+        self.canvas.mpl_connect('button_release_event', self.on_release)
+        self.canvas.mpl_connect('resize_event', lambda event: self.redraw())
+        
+        self.refresh_channels()
+    
+    def refresh_channels(self):
+        """Recargar la lista de canales y redibujar el rango actual"""
+        names = self.data_manager.history_pyramid.channel_names()
+        self.channel_box['values'] = names
+        if names and self.channel_var.get() not in names:
+            self.channel_var.set(names[0])
+        self.redraw()
+    
+    def show_all(self):
+        self.t0 = self.t1 = None
+        self.redraw()
+    
+    def redraw(self):
+        """Pedir al DataManager el nivel adecuado para el rango visible y dibujarlo"""
+        channel = self.channel_var.get()
+        if not channel:
+            return
+        
+        started = time.perf_counter()
+        width = max(int(self.ax.bbox.width), 100)
+        data = self.data_manager.history(channel, self.t0, self.t1, 2 * width)
+        if data is None or not len(data['timestamp']):
+            return
+        
+        x = epoch_to_datenum(data['timestamp'])
+        info = registry.get(channel)
+        color = info.color if info is not None else None
+        self.mean_line.set_data(x, data['mean'])
+        self.mean_line.set_color(color)
+        
+        # Envolvente min/max (solo con buckets agregados)
+        if self.envelope is not None:
+            self.envelope.remove()
+            self.envelope = None
+        if data['bucket'] > 1:
+            self.envelope = self.ax.fill_between(x, data['min'], data['max'],
+                                                 color=color, alpha=0.25, linewidth=0)
+        
+        t0, t1 = self.visible_range(data)
+        self.ax.set_xlim(epoch_to_datenum([t0, t1]))
+        low, high = data['min'], data['max']
+        finite = low[low == low]
+        if len(finite):
+            y0, y1 = finite.min(), high[high == high].max()
+            margin = (y1 - y0) * 0.1 if y1 != y0 else 1
+            self.ax.set_ylim(y0 - margin, y1 + margin)
+        
+        unit = info.unit if info is not None and info.unit else ""
+        self.ax.set_title(info.label if info is not None else channel, fontsize=12, fontweight='bold')
+        self.ax.set_ylabel(f"Valor ({unit})" if unit else "Valor")
+        self.canvas.draw_idle()
+        
+        elapsed = (time.perf_counter() - started) * 1000
+        self.info_label.config(
+            text=f"{len(x)} puntos · {data['bucket']} muestras/punto · {elapsed:.1f} ms")
+    
+    def visible_range(self, data=None):
+        """Rango visible en timestamps epoch"""
+        if self.t0 is not None and self.t1 is not None:
+            return self.t0, self.t1
+        span = self.data_manager.history_pyramid.span(self.channel_var.get())
+        if span is None:
+            return (data['timestamp'][0], data['timestamp'][-1]) if data else (0, 1)
+        return span
+    
+    def _event_time(self, event):
+        """Timestamp epoch bajo el cursor (interpolado en el rango visible)"""
+        t0, t1 = self.visible_range()
+        x0, x1 = self.ax.get_xlim()
+        return t0 + (event.xdata - x0) / (x1 - x0) * (t1 - t0)
+    
+    def on_scroll(self, event):
+        """Zoom centrado en el cursor"""
+        if event.inaxes is not self.ax or event.xdata is None:
+            return
+        t0, t1 = self.visible_range()
+        center = self._event_time(event)
+        factor = 1 / ZOOM_STEP if event.button == 'up' else ZOOM_STEP
+        self.t0 = center - (center - t0) * factor
+        self.t1 = center + (t1 - center) * factor
+        self.redraw()
+    
+    def on_press(self, event):
+        if event.inaxes is self.ax and event.button == 1 and event.x is not None:
+            self.drag_start = (event.x, self.visible_range())
+    
+    def on_drag(self, event):
+        """Desplazar el rango arrastrando con el botón izquierdo"""
+        if self.drag_start is None or event.x is None:
+            return
+        x, (t0, t1) = self.drag_start
+        shift = (x - event.x) / max(self.ax.bbox.width, 1) * (t1 - t0)
+        self.t0, self.t1 = t0 + shift, t1 + shift
+        self.redraw()
+    
+    def on_release(self, event):
+        self.drag_start = None
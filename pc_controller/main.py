@@ -2,9 +2,6 @@
 Wally Data Acquisition System - Main Controller
 Sistema principal de adquisición de datos con interfaz Tkinter
 """
-import tkinter as tk
-from tkinter import messagebox
-import threading
 import time
 import sys
 import os
@@ -12,34 +9,58 @@ import os
 # Agregar directorio actual al path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from ui_dashboard import WallyDashboard
-from data_manager import DataManager
-from esp32_client import ESP32Client
-import config
+# Reloj de arranque primero, para que el perfil incluya todos los imports
+from startup import startup
+
+# matplotlib no se importa aquí: el gráfico lo carga en segundo plano
+with startup.phase("import tkinter + dashboard"):
+    import tkinter as tk
+    from tkinter import messagebox
+    from ui_dashboard import WallyDashboard
+
+with startup.phase("import adquisición + almacenamiento"):
+    from data_manager import DataManager
+    from command_queue import CommandQueue
+    from background_export import ExportJob
+    from render_loop import RenderLoop
+    from acquisition import AcquisitionEngine, STATUS_CONNECTED, STATUS_RECONNECTING
+    import config
+
+with startup.phase("import red (requests)"):
+    from esp32_client import ESP32Client
+    from discovery import DeviceRegistry
 
 class WallyController:
     """Controlador principal del sistema Wally"""
     
     def __init__(self):
         # Crear ventana principal
-        self.root = tk.Tk()
-        self.root.title(config.WINDOW_TITLE)
-        self.root.geometry(config.WINDOW_SIZE)
-        self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
+        with startup.phase("ventana Tk"):
+            self.root = tk.Tk()
+            self.root.title(config.WINDOW_TITLE)
+            self.root.geometry(config.WINDOW_SIZE)
+            self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
+            self.root.bind('<Map>', self.on_window_mapped, add='+')
         
         # Inicializar componentes
-        self.data_manager = DataManager()
-        self.esp32_client = ESP32Client()
-        self.dashboard = WallyDashboard(self.root, self)
+        with startup.phase("componentes"):
+            self.data_manager = DataManager()
+            self.esp32_client = ESP32Client()
+            self.command_queue = CommandQueue()
+            self.device_registry = DeviceRegistry()
+            self.dashboard = WallyDashboard(self.root, self)
+            self.render_loop = RenderLoop(self.root, self.render_frame)
+            
+            # Núcleo de adquisición (sin UI): sus avisos pasan al thread de Tk
+            self.acquisition = AcquisitionEngine(
+                self.data_manager, self.esp32_client, self.device_registry,
+                on_record=self.render_loop.post,
+                on_status=self.on_connection_status,
+                on_lost=lambda: self.root.after(0, self.handle_connection_lost))
         
         # Estado del sistema
-        self.is_running = False
-        self.current_data = {}
-        self.connection_status = "disconnected"
-        
-        # Threading
-        self.data_thread = None
-        self.stop_event = threading.Event()
+        self.last_metrics_update = 0
+        self.export_job = None
         
         print("🔬 Wally Controller inicializado")
     
@@ -49,31 +70,41 @@ class WallyController:
             messagebox.showwarning("Advertencia", "El sistema ya está ejecutándose")
             return
         
-        # Intentar conectar al ESP32
+        # Intentar conectar al ESP32 (en segundo plano, la UI no se bloquea)
         self.dashboard.update_status("🔄 Conectando...")
+        self.command_queue.submit(
+            self.acquisition.connect, callback=self.on_connect_result, name="connect")
+    
+    @property
+    def is_running(self):
+        """Adquisición en marcha (estado del núcleo)"""
+        return self.acquisition.is_running
+    
+    def on_connect_result(self, connected, error):
+        """Continuar el arranque cuando termina el intento de conexión"""
+        if self.is_running:
+            return
         
-        if self.esp32_client.connect(config.ESP32_IP, config.ESP32_PORT):
-            self.is_running = True
-            self.stop_event.clear()
-            
+        if connected:
             # Iniciar thread de adquisición
-            self.data_thread = threading.Thread(target=self.data_acquisition_loop, daemon=True)
-            self.data_thread.start()
+            self.acquisition.start()
             
             # Actualizar UI
             self.dashboard.update_status("🟢 Adquisición activa")
             self.dashboard.set_controls_state("running")
             
-            messagebox.showinfo("Éxito", f"Conectado a ESP32: {config.ESP32_IP}")
-            print(f"✅ Adquisición iniciada - ESP32: {config.ESP32_IP}")
+            ip, port = self.acquisition.target_device
+            messagebox.showinfo("Éxito", f"Conectado a ESP32: {ip}")
+            print(f"✅ Adquisición iniciada - ESP32: {ip}")
             
         else:
+            ip, port = self.acquisition.target_device
             self.dashboard.update_status("🔴 Error de conexión")
             messagebox.showerror("Error", 
-                f"No se pudo conectar al ESP32 en {config.ESP32_IP}:{config.ESP32_PORT}\n\n"
+                f"No se pudo conectar al ESP32 en {ip}:{port}\n\n"
                 "Verificar:\n"
                 "• ESP32 encendido y conectado a WiFi\n"
-                "• IP correcta en config.py\n"
+                "• IP correcta en config.py (o ejecutar discovery.py)\n"
                 "• Mismo network que el PC")
     
     def stop_acquisition(self):
@@ -81,12 +112,8 @@ class WallyController:
         if not self.is_running:
             return
         
-        self.is_running = False
-        self.stop_event.set()
-        
         # Esperar que termine el thread
-        if self.data_thread and self.data_thread.is_alive():
-            self.data_thread.join(timeout=2)
+        self.acquisition.stop()
         
         # Actualizar UI
         self.dashboard.update_status("🔴 Detenido")
@@ -94,69 +121,49 @@ class WallyController:
         
         print("🛑 Adquisición detenida")
     
-    def data_acquisition_loop(self):
-        """Bucle principal de adquisición de datos (ejecuta en thread separado)"""
-        consecutive_errors = 0
-        max_consecutive_errors = 5
+    def on_connection_status(self, status):
+        """Reflejar en la UI los cambios de conexión (llega desde el thread de adquisición)"""
+        if status == STATUS_RECONNECTING:
+            self.root.after(0, self.dashboard.update_status, "🔄 Reconectando...")
+        elif status == STATUS_CONNECTED:
+            self.root.after(0, self.dashboard.update_status, "🟢 Adquisición activa")
+    
+    def on_window_mapped(self, event):
+        """Primer mapeo de la ventana: el repintado inicial corre como tarea idle a continuación
         
-        while self.is_running and not self.stop_event.is_set():
-            try:
-                # Obtener datos del ESP32
-                data = self.esp32_client.get_sensor_data()
-                
-                if data:
-                    # Datos recibidos correctamente
-                    consecutive_errors = 0
-                    self.current_data = data
-                    
-                    # Guardar en buffer
-                    self.data_manager.add_reading(data)
-                    
-                    # Actualizar UI de forma thread-safe
-                    self.root.after(0, self.update_ui_callback, data)
-                    
-                    # Log cada 10 lecturas
-                    if self.data_manager.get_reading_count() % 10 == 0:
-                        sensor_count = data.get('sensor_count', 0)
-                        print(f"📊 Datos: {self.data_manager.get_reading_count()} | Sensores activos: {sensor_count}")
-                        
-                else:
-                    # Error obteniendo datos
-                    consecutive_errors += 1
-                    print(f"⚠️ Error obteniendo datos ({consecutive_errors}/{max_consecutive_errors})")
-                    
-                    if consecutive_errors >= max_consecutive_errors:
-                        # Demasiados errores consecutivos - detener
-                        self.root.after(0, self.handle_connection_lost)
-                        break
-                
-                # Esperar antes de la siguiente lectura
-                self.stop_event.wait(config.SAMPLE_INTERVAL)
-                
-            except Exception as e:
-                consecutive_errors += 1
-                print(f"❌ Error en data_acquisition_loop: {e}")
-                
-                if consecutive_errors >= max_consecutive_errors:
-                    self.root.after(0, self.handle_connection_lost)
-                    break
-                
-                self.stop_event.wait(1)  # Esperar 1 segundo antes de reintentar
+        Pueden llegar varios <Map> antes de esa tarea: se agenda una sola vez.
+        """
+        if event.widget is self.root and "ventana mapeada" not in startup.marks:
+            startup.mark("ventana mapeada")
+            self.root.after_idle(self.on_first_frame)
+    
+    def on_first_frame(self):
+        """Ventana y controles ya pintados: registrar el tiempo hasta el primer frame"""
+        startup.mark("primer frame")
+        if config.STARTUP_REPORT:
+            print(startup.report())
     
-    def update_ui_callback(self, data):
-        """Callback para actualizar UI (ACTUALIZAR)"""
-        self.dashboard.update_sensors(data.get('readings', {}))
-        self.dashboard.update_chart(data)
+    def render_frame(self, records):
+        """Frame de UI con las lecturas llegadas desde el anterior (thread UI)"""
+        self.dashboard.update_sensors(records[-1])
+        self.dashboard.update_chart(records)
         self.dashboard.update_stats(self.data_manager.get_stats())
         
-        # NUEVO: Actualizar status Vernier periódicamente
-        if hasattr(self, 'last_vernier_update'):
-            if time.time() - self.last_vernier_update > 5:  # Cada 5 segundos
-                self.update_vernier_status()
-                self.last_vernier_update = time.time()
-        else:
-            self.last_vernier_update = time.time()
-            self.update_vernier_status()
+        # Status Vernier: el worker solo va a la red cuando vence el TTL del cache
+        self.update_vernier_status()
+        
+        # Paneles de latencia y estadísticas por canal
+        now = time.monotonic()
+        if now - self.last_metrics_update >= config.METRICS_UI_INTERVAL:
+            self.last_metrics_update = now
+            self.dashboard.update_latency(self.esp32_client.get_latency_stats())
+            self.dashboard.update_channel_stats(self.data_manager.get_channel_stats())
+            self.dashboard.update_render_stats(self.render_loop.get_stats())
+    
+    def process_command_results(self):
+        """Aplicar en el thread UI los resultados del canal de comandos"""
+        self.command_queue.process_results()
+        self.root.after(config.COMMAND_POLL_INTERVAL, self.process_command_results)
 
     def handle_connection_lost(self):
         """Manejar pérdida de conexión con ESP32"""
@@ -164,33 +171,60 @@ class WallyController:
         self.dashboard.update_status("🔴 Conexión perdida")
         
         messagebox.showerror("Conexión Perdida", 
-            "Se perdió la conexión con el ESP32.\n\n"
+            f"No se pudo recuperar la conexión con el ESP32 tras {config.RECONNECT_GIVE_UP} s.\n"
+            "Los datos adquiridos se conservan en el buffer.\n\n"
             "Verificar:\n"
             "• ESP32 sigue encendido\n"
             "• Conexión WiFi estable\n"
             "• No hay interferencias de red")
     
     def export_data(self):
-        """Exportar datos a archivo CSV"""
+        """Exportar datos en segundo plano (formato según la extensión: CSV, Parquet, Feather o JSON)"""
+        if self.export_job is not None and self.export_job.is_running():
+            messagebox.showwarning("Advertencia", "Ya hay una exportación en curso")
+            return
+        
         try:
             filename = self.dashboard.get_export_filename()
             if filename:
-                if self.data_manager.export_to_csv(filename):
-                    count = self.data_manager.get_reading_count()
-                    messagebox.showinfo("Éxito", 
-                        f"Datos exportados exitosamente:\n"
-                        f"Archivo: {filename}\n"
-                        f"Registros: {count}")
-                    print(f"📁 Datos exportados: {filename}")
-                else:
-                    messagebox.showerror("Error", "Error exportando datos")
+                self.export_job = ExportJob(
+                    self.data_manager, self.command_queue, filename,
+                    on_progress=self.on_export_progress, on_done=self.on_export_done)
+                self.export_job.start()
+                self.dashboard.set_export_state(True)
+                print(f"📁 Exportando en segundo plano: {filename} (~{self.export_job.rows_total} registros)")
                     
         except Exception as e:
             messagebox.showerror("Error", f"Error en exportación: {str(e)}")
     
+    def cancel_export(self):
+        """Cancelar la exportación en curso"""
+        if self.export_job is not None and self.export_job.is_running():
+            self.export_job.cancel()
+    
+    def on_export_progress(self, done, total):
+        """Avance de la exportación (thread UI)"""
+        self.dashboard.update_export_progress(done, total)
+    
+    def on_export_done(self, success, job):
+        """Fin de la exportación en segundo plano (thread UI)"""
+        self.dashboard.set_export_state(False)
+        
+        if success:
+            messagebox.showinfo("Éxito", 
+                f"Datos exportados exitosamente:\n"
+                f"Archivo: {job.filename}\n"
+                f"Registros: {job.rows_done}\n"
+                f"Tiempo: {job.elapsed:.1f} s")
+            print(f"📁 Datos exportados: {job.filename}")
+        elif job.cancel_event.is_set():
+            messagebox.showinfo("Exportación", "Exportación cancelada")
+        else:
+            messagebox.showerror("Error", "Error exportando datos")
+    
     def get_current_data(self):
         """Obtener datos actuales del sistema"""
-        return self.current_data
+        return self.acquisition.current_data
     
     def get_data_manager(self):
         """Obtener instancia del data manager"""
@@ -204,8 +238,15 @@ class WallyController:
             if not result:
                 return
         
-        # Detener adquisición
+        # Detener adquisición (y cancelar una exportación a medias)
         self.stop_acquisition()
+        self.render_loop.stop()
+        self.dashboard.close_chart()
+        if self.export_job is not None and self.export_job.is_running():
+            self.export_job.cancel()
+            self.export_job.wait()
+        self.command_queue.shutdown()
+        self.data_manager.close_session()
         
         # Guardar datos finales
         if self.data_manager.get_reading_count() > 0:
@@ -217,15 +258,31 @@ class WallyController:
         self.root.destroy()
         print("👋 Wally Controller cerrado")
     
+    def on_sessions_recovered(self, recovered, error):
+        """Avisar de sesiones recuperadas tras un cierre inesperado"""
+        if recovered:
+            messagebox.showinfo("Sesión recuperada",
+                "Se recuperaron datos de una sesión interrumpida:\n" + "\n".join(recovered))
+    
     def run(self):
         """Ejecutar aplicación principal"""
         try:
-            # Configurar UI
-            self.dashboard.setup_ui()
+            # Configurar UI (el gráfico se completa al terminar de cargar su backend)
+            with startup.phase("construir UI"):
+                self.dashboard.setup_ui()
+            self.root.after(config.COMMAND_POLL_INTERVAL, self.process_command_results)
+            self.render_loop.start()
+            
+            # Recuperar sesiones interrumpidas (en segundo plano)
+            self.command_queue.submit(
+                self.data_manager.recover_sessions, callback=self.on_sessions_recovered, name="recover")
             
             # Mostrar información inicial
             print(f"🚀 Wally DAQ System v{config.VERSION}")
-            print(f"📡 ESP32 esperado en: {config.ESP32_IP}:{config.ESP32_PORT}")
+            if config.ESP32_IP:
+                print(f"📡 ESP32 esperado en: {config.ESP32_IP}:{config.ESP32_PORT}")
+            else:
+                print(f"📡 ESP32 desde registro: {len(self.device_registry.devices)} placa(s) conocidas")
             print(f"💾 Directorio de datos: {config.DATA_DIRECTORY}")
             
             # Iniciar loop de Tkinter
@@ -241,88 +298,78 @@ class WallyController:
     
     def change_to_temperature(self):
         """Cambiar a sensor temperatura"""
-        try:
-            result = self.esp32_client.change_to_temperature()
-            if result:
-                print("🌡️ Cambiado a sensor temperatura")
-                messagebox.showinfo("Sensor Cambiado", "Ahora leyendo sensor de temperatura")
-                self.update_vernier_status()
-            else:
-                messagebox.showerror("Error", "No se pudo cambiar a sensor temperatura")
-        except Exception as e:
-            messagebox.showerror("Error", f"Error cambiando sensor: {str(e)}")
+        self.run_vernier_command(
+            self.esp32_client.change_to_temperature,
+            "🌡️ Cambiado a sensor temperatura",
+            "Ahora leyendo sensor de temperatura",
+            "No se pudo cambiar a sensor temperatura")
     
     def change_to_force(self):
         """Cambiar a sensor fuerza"""
-        try:
-            result = self.esp32_client.change_to_force()
-            if result:
-                print("⚡ Cambiado a sensor fuerza")
-                messagebox.showinfo("Sensor Cambiado", "Ahora leyendo sensor de fuerza")
-                self.update_vernier_status()
-            else:
-                messagebox.showerror("Error", "No se pudo cambiar a sensor fuerza")
-        except Exception as e:
-            messagebox.showerror("Error", f"Error cambiando sensor: {str(e)}")
+        self.run_vernier_command(
+            self.esp32_client.change_to_force,
+            "⚡ Cambiado a sensor fuerza",
+            "Ahora leyendo sensor de fuerza",
+            "No se pudo cambiar a sensor fuerza")
     
     def change_to_photogate(self):
         """Cambiar a fotopuerta"""
-        try:
-            result = self.esp32_client.change_to_photogate()
-            if result:
-                print("📷 Cambiado a fotopuerta")
-                messagebox.showinfo("Sensor Cambiado", "Ahora leyendo fotopuerta")
-                self.update_vernier_status()
-            else:
-                messagebox.showerror("Error", "No se pudo cambiar a fotopuerta")
-        except Exception as e:
-            messagebox.showerror("Error", f"Error cambiando sensor: {str(e)}")
+        self.run_vernier_command(
+            self.esp32_client.change_to_photogate,
+            "📷 Cambiado a fotopuerta",
+            "Ahora leyendo fotopuerta",
+            "No se pudo cambiar a fotopuerta")
     
     def change_to_motion(self):
         """Cambiar a sensor movimiento"""
-        try:
-            result = self.esp32_client.change_to_motion()
-            if result:
-                print("📐 Cambiado a sensor movimiento")
-                messagebox.showinfo("Sensor Cambiado", "Ahora leyendo sensor de movimiento")
-                self.update_vernier_status()
-            else:
-                messagebox.showerror("Error", "No se pudo cambiar a sensor movimiento")
-        except Exception as e:
-            messagebox.showerror("Error", f"Error cambiando sensor: {str(e)}")
+        self.run_vernier_command(
+            self.esp32_client.change_to_motion,
+            "📐 Cambiado a sensor movimiento",
+            "Ahora leyendo sensor de movimiento",
+            "No se pudo cambiar a sensor movimiento")
     
     def stop_vernier_readings(self):
         """Pausar lecturas Vernier"""
-        try:
-            result = self.esp32_client.stop_readings()
-            if result:
-                print("⏸️ Lecturas Vernier pausadas")
-                self.update_vernier_status()
-            else:
-                messagebox.showerror("Error", "No se pudieron pausar las lecturas")
-        except Exception as e:
-            messagebox.showerror("Error", f"Error pausando lecturas: {str(e)}")
+        self.run_vernier_command(
+            self.esp32_client.stop_readings,
+            "⏸️ Lecturas Vernier pausadas",
+            None,
+            "No se pudieron pausar las lecturas")
     
     def continue_vernier_readings(self):
         """Continuar lecturas Vernier"""
-        try:
-            result = self.esp32_client.continue_readings()
-            if result:
-                print("▶️ Lecturas Vernier continuadas")
-                self.update_vernier_status()
+        self.run_vernier_command(
+            self.esp32_client.continue_readings,
+            "▶️ Lecturas Vernier continuadas",
+            None,
+            "No se pudieron continuar las lecturas")
+    
+    def run_vernier_command(self, command, log_message, success_message, error_message):
+        """Ejecutar comando Vernier en segundo plano y notificar en el thread UI"""
+        def on_result(result, error):
+            if error:
+                messagebox.showerror("Error", f"Error enviando comando: {str(error)}")
+            elif result:
+                print(log_message)
+                # El cliente ya actualizó el cache con la respuesta del comando
+                self.dashboard.update_vernier_status(self.esp32_client.get_cached_vernier_status())
+                if success_message:
+                    messagebox.showinfo("Sensor Cambiado", success_message)
             else:
-                messagebox.showerror("Error", "No se pudieron continuar las lecturas")
-        except Exception as e:
-            messagebox.showerror("Error", f"Error continuando lecturas: {str(e)}")
+                messagebox.showerror("Error", error_message)
+        
+        self.command_queue.submit(command, callback=on_result)
     
     def update_vernier_status(self):
-        """Actualizar status Vernier en UI"""
-        try:
-            vernier_status = self.esp32_client.get_vernier_status()
-            if vernier_status:
-                self.dashboard.update_vernier_status(vernier_status)
-        except Exception as e:
-            print(f"Error actualizando status Vernier: {e}")
+        """Actualizar status Vernier en UI (fetch en segundo plano con cache TTL)"""
+        self.command_queue.submit(
+            self.esp32_client.get_vernier_status, config.VERNIER_STATUS_TTL,
+            callback=self.on_vernier_status, name="vernier_status")
+    
+    def on_vernier_status(self, vernier_status, error):
+        """Aplicar status Vernier recibido del worker"""
+        if vernier_status:
+            self.dashboard.update_vernier_status(vernier_status)
             
 def main():
     """Función principal"""
@@ -0,0 +1,184 @@
+"""
+Métricas de transporte para Wally
+Histogramas de latencia estilo HDR por endpoint del ESP32
+"""
+import math
+import threading
+import time
+import config
+
+# Fases medidas en cada petición HTTP
+PHASES = ('connect', 'ttfb', 'transfer', 'decode', 'total')
+
+class LatencyHistogram:
+    """Histograma logarítmico de latencias (segundos), estilo HDR
+    
+    Cada potencia de 2 se divide en SUB_BUCKETS buckets (~4% de error
+    relativo) entre 1 µs y ~16 s. Registrar es O(1) y los percentiles
+    se obtienen sin guardar las muestras.
+    """
+    SUB_BUCKETS = 16
+    MAGNITUDES = 24
+    MIN_VALUE = 1e-6
+    
+    def __init__(self):
+        self.counts = [0] * (self.SUB_BUCKETS * self.MAGNITUDES + 1)
+        self.count = 0
+        self.max_value = 0.0
+    
+    def _index(self, value):
+        """Bucket correspondiente a un valor"""
+        if value <= self.MIN_VALUE:
+            return 0
+        index = int(math.log2(value / self.MIN_VALUE) * self.SUB_BUCKETS) + 1
+        return min(index, len(self.counts) - 1)
+    
+    def _bucket_value(self, index):
+        """Límite superior del bucket (segundos)"""
+        return self.MIN_VALUE * 2 ** (index / self.SUB_BUCKETS)
+    
+    def record(self, value):
+        """Registrar una latencia"""
+        self.counts[self._index(value)] += 1
+        self.count += 1
+        if value > self.max_value:
+            self.max_value = value
+    
+    def merge(self, other):
+        """Acumular otro histograma en este"""
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.max_value = max(self.max_value, other.max_value)
+    
+    def percentile(self, percent):
+        """Latencia del percentil indicado (0-100)"""
+        if self.count == 0:
+            return None
+        
+        target = max(1, math.ceil(self.count * percent / 100))
+        cumulative = 0
+        for index, bucket_count in enumerate(self.counts):
+            cumulative += bucket_count
+            if cumulative >= target:
+                return min(self._bucket_value(index), self.max_value)
+        
+        return self.max_value
+    
+    def reset(self):
+        """Vaciar histograma"""
+        self.counts = [0] * len(self.counts)
+        self.count = 0
+        self.max_value = 0.0
+
+
+class RollingHistogram:
+    """Histograma sobre una ventana deslizante de `window` segundos
+    
+    La ventana se divide en `slots` histogramas que rotan: al avanzar el
+    tiempo se vacía el más antiguo, así los percentiles reflejan solo
+    el comportamiento reciente de la red.
+    """
+    
+    def __init__(self, window=None, slots=None):
+        self.slots = [LatencyHistogram() for _ in range(slots or config.METRICS_SLOTS)]
+        self.slot_duration = (window or config.METRICS_WINDOW) / len(self.slots)
+        self.current_slot = self._slot_number(time.monotonic())
+    
+    def _slot_number(self, now):
+        return int(now // self.slot_duration)
+    
+    def _rotate(self):
+        """Vaciar slots que salieron de la ventana"""
+        slot_number = self._slot_number(time.monotonic())
+        elapsed = slot_number - self.current_slot
+        if elapsed <= 0:
+            return
+        
+        for step in range(1, min(elapsed, len(self.slots)) + 1):
+            self.slots[(self.current_slot + step) % len(self.slots)].reset()
+        self.current_slot = slot_number
+    
+    def record(self, value):
+        """Registrar una latencia en el slot actual"""
+        self._rotate()
+        self.slots[self.current_slot % len(self.slots)].record(value)
+    
+    def snapshot(self):
+        """Histograma combinado de toda la ventana"""
+        self._rotate()
+        merged = LatencyHistogram()
+        for slot in self.slots:
+            if slot.count:
+                merged.merge(slot)
+        return merged
+
+
+class TransportMetrics:
+    """Métricas de transporte por endpoint (thread-safe)"""
+    
+    def __init__(self):
+        self.endpoints = {}
+        self.lock = threading.Lock()
+    
+    def _endpoint(self, endpoint):
+        """Estado de un endpoint, creado en el primer uso"""
+        stats = self.endpoints.get(endpoint)
+        if stats is None:
+            stats = {
+                'requests': 0,
+                'errors': 0,
+                'bytes': 0,
+                'phases': {phase: RollingHistogram() for phase in PHASES}
+            }
+            self.endpoints[endpoint] = stats
+        return stats
+    
+    def record(self, endpoint, **phases):
+        """Registrar duraciones (segundos) de una o varias fases"""
+        with self.lock:
+            histograms = self._endpoint(endpoint)['phases']
+            for phase, seconds in phases.items():
+                histograms[phase].record(seconds)
+    
+    def record_request(self, endpoint, size):
+        """Contar una petición completada y sus bytes"""
+        with self.lock:
+            stats = self._endpoint(endpoint)
+            stats['requests'] += 1
+            stats['bytes'] += size
+    
+    def record_error(self, endpoint):
+        """Contar una petición fallida"""
+        with self.lock:
+            self._endpoint(endpoint)['errors'] += 1
+    
+    def summary(self):
+        """Percentiles por endpoint y fase, en milisegundos"""
+        result = {}
+        with self.lock:
+            for endpoint, stats in self.endpoints.items():
+                phases = {}
+                for phase, rolling in stats['phases'].items():
+                    histogram = rolling.snapshot()
+                    if histogram.count == 0:
+                        continue
+                    phases[phase] = {
+                        'count': histogram.count,
+                        'p50': histogram.percentile(50) * 1000,
+                        'p95': histogram.percentile(95) * 1000,
+                        'p99': histogram.percentile(99) * 1000,
+                        'max': histogram.max_value * 1000
+                    }
+                
+                result[endpoint] = {
+                    'requests': stats['requests'],
+                    'errors': stats['errors'],
+                    'bytes': stats['bytes'],
+                    'phases': phases
+                }
+        return result
+    
+    def reset(self):
+        """Borrar todas las métricas"""
+        with self.lock:
+            self.endpoints.clear()
@@ -0,0 +1,186 @@
+"""
+Gráfico matplotlib para Wally
+Backend en vivo (blit o render worker) y exportación estática del gráfico a imagen
+"""
+import tkinter as tk
+import numpy as np
+import matplotlib.dates as mdates
+from matplotlib import style
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+import config
+from chart_backends import ChartBackend, fit_limits, initial_ylim
+from downsampling import downsample
+from render_worker import RenderWorker
+
+def build_chart_figure(series, animated=False, layout=True):
+    """Figura 2x2 con una línea persistente por serie; devuelve (figura, {serie: Line2D})
+    
+    layout=False omite tight_layout (lo más caro): el gráfico en vivo lo
+    aplica igual en su primer evento de resize.
+    """
+    style.use('default')
+    fig = Figure(figsize=(10, 8))
+    axes = fig.subplots(2, 2)
+    fig.suptitle("Sensores Wally - Datos Históricos", fontsize=14, fontweight='bold')
+    
+    lines = {}
+    for i, sensor_key in enumerate(series):
+        ax = axes[i // 2, i % 2]
+        
+        ax.set_title(config.SENSOR_LABELS[sensor_key], fontsize=12, fontweight='bold')
+        ax.set_ylabel(f"Valor ({config.SENSOR_UNITS[sensor_key]})")
+        ax.grid(True, alpha=0.3)
+        ax.tick_params(axis='x', rotation=45, labelsize=8)
+        
+        ax.xaxis.set_major_locator(mdates.AutoDateLocator(minticks=3, maxticks=6))
+        ax.xaxis.set_major_formatter(mdates.DateFormatter('%H:%M:%S'))
+        
+        # Límites iniciales
+        ax.set_ylim(*initial_ylim(sensor_key))
+        
+        # Línea persistente: cada frame solo cambia sus datos
+        line, = ax.plot([], [], color=config.CHART_COLORS[sensor_key], linewidth=2,
+                        marker='o', markersize=3, animated=animated)
+        lines[sensor_key] = line
+    
+    if layout:
+        fig.tight_layout()
+    return fig, lines
+
+class MatplotlibChart(ChartBackend):
+    """Gráfico matplotlib en vivo
+    
+    Por defecto las líneas se pintan con blit sobre el fondo cacheado y el
+    redibujado completo solo ocurre al cambiar los ejes. Con
+    CHART_RENDER_WORKER la figura se rasteriza en un thread aparte y Tk
+    solo pega el último frame terminado en un PhotoImage.
+    """
+    
+    def __init__(self, root, series, on_width=None):
+        super().__init__(root, series, on_width)
+        self.fig = None
+        self.lines = {}          # serie → Line2D persistente
+        self.canvas = None
+        self.background = None   # Fondo estático cacheado tras cada redibujado completo
+        self.worker = None       # RenderWorker si se dibuja fuera del thread UI
+        self.image = None        # PhotoImage donde se pegan sus frames
+    
+    def build(self, parent):
+        use_worker = config.CHART_RENDER_WORKER
+        self.fig, self.lines = build_chart_figure(self.series, animated=not use_worker, layout=False)
+        
+        if use_worker:
+            # Render fuera del thread UI: Tk solo pega el último frame terminado
+            self.image = tk.PhotoImage(master=parent, width=1, height=1)
+            image_canvas = tk.Canvas(parent, width=1000, height=800, highlightthickness=0)
+            image_canvas.create_image(0, 0, anchor=tk.NW, image=self.image)
+            image_canvas.pack(fill=tk.BOTH, expand=True)
+            
+            self.worker = RenderWorker(self.fig, self.apply_frame, self.on_resize)
+            image_canvas.bind('<Configure>', lambda event: self.worker.resize(event.width, event.height))
+            self.worker.start()
+            self.root.after(config.CHART_UPDATE_INTERVAL, self.poll_worker)
+            return
+        
+        # Integrar con Tkinter
+        self.canvas = FigureCanvasTkAgg(self.fig, parent)
+        self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        self.canvas.mpl_connect('draw_event', self.on_draw)
+        self.canvas.mpl_connect('resize_event', self.on_resize)
+    
+    def on_draw(self, event):
+        """Tras un redibujado completo: cachear el fondo y pintar las líneas encima"""
+        self.background = self.canvas.copy_from_bbox(self.fig.bbox)
+        for line in self.lines.values():
+            line.axes.draw_artist(line)
+    
+    def on_resize(self, event=None):
+        """El layout solo se recalcula al cambiar el tamaño (el canvas redibuja después)"""
+        self.fig.tight_layout()
+        if self.on_width is not None:
+            for sensor_key, line in self.lines.items():
+                self.on_width(sensor_key, int(line.axes.bbox.width))
+    
+    def apply_frame(self, frame):
+        """Aplicar un frame a las líneas y los ejes; True si cambian los ejes"""
+        redraw = False
+        for sensor_key, (shown_times, shown_values, first, last, min_val, max_val) in frame.items():
+            line = self.lines[sensor_key]
+            line.set_data(shown_times, shown_values)
+            marker = 'o' if len(shown_times) <= config.CHART_MARKER_POINTS else ''
+            if line.get_marker() != marker:
+                line.set_marker(marker)
+            
+            ax = line.axes
+            limits = fit_limits(ax.get_xlim(), ax.get_ylim(), first, last, min_val, max_val)
+            if limits is not None:
+                ax.set_xlim(*limits[0])
+                ax.set_ylim(*limits[1])
+                redraw = True
+        return redraw
+    
+    def render(self, frame):
+        if self.worker is not None:
+            # El worker lee los datos desde su thread: copiar lo que aún apunta al anillo
+            self.worker.submit({
+                sensor_key: (np.array(series[0]), np.array(series[1])) + series[2:]
+                for sensor_key, series in frame.items()})
+            return
+        
+        if self.apply_frame(frame) or self.background is None:
+            # Redibujado completo: on_draw cachea el fondo y pinta las líneas
+            self.canvas.draw()
+            return
+        
+        self.canvas.restore_region(self.background)
+        for line in self.lines.values():
+            line.axes.draw_artist(line)
+        self.canvas.blit(self.fig.bbox)
+    
+    def poll_worker(self):
+        """Pegar en el PhotoImage el último frame que terminó el render worker"""
+        if self.worker is None or not self.worker.running:
+            return
+        try:
+            self.worker.paste(self.image)
+        except Exception as e:
+            print(f"❌ Error mostrando frame del gráfico: {e}")
+        self.root.after(config.CHART_UPDATE_INTERVAL, self.poll_worker)
+    
+    def get_stats(self):
+        if self.worker is None:
+            return None
+        stats = self.worker.get_stats()
+        stats['backend'] = 'matplotlib (worker)'
+        return stats
+    
+    def close(self):
+        if self.worker is not None:
+            self.worker.stop()
+
+def export_chart_image(filename, chart_buffer, series, max_points=None):
+    """Guardar la ventana actual del gráfico como imagen estática (PNG, SVG o PDF según la extensión)
+    
+    Independiente del backend en vivo: siempre se dibuja con matplotlib.
+    """
+    max_points = max_points or config.CHART_MAX_DRAWN_POINTS
+    try:
+        fig, lines = build_chart_figure(series)
+        times = chart_buffer.window_x()
+        for sensor_key, line in lines.items():
+            values = chart_buffer.window(sensor_key)
+            x, y = downsample(times, values, max_points, config.CHART_DOWNSAMPLING or 'lttb')
+            line.set_data(x, y)
+            line.set_marker('o' if len(x) <= config.CHART_MARKER_POINTS else '')
+            if len(times) > 1:
+                line.axes.set_xlim(times[0], times[-1])
+                low, high = np.fmin.reduce(values), np.fmax.reduce(values)
+                if low == low:
+                    margin = (high - low) * 0.1 if high != low else 1
+                    line.axes.set_ylim(low - margin, high + margin)
+        fig.savefig(filename, dpi=150)
+        return True
+    except Exception as e:
+        print(f"❌ Error exportando gráfico: {e}")
+        return False
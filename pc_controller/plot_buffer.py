@@ -0,0 +1,86 @@
+"""
+Buffers de gráfico para Wally
+Ventana deslizante de las últimas N muestras en arrays NumPy preasignados
+"""
+import numpy as np
+from utils import epoch_to_datenum
+
+class PlotRingBuffer:
+    """Últimas `capacity` muestras del gráfico: timestamps y una columna por serie
+    
+    Cada muestra se escribe dos veces (posición i e i + capacity), así la
+    ventana completa es siempre una vista contigua del array: dibujar no
+    copia ni reordena nada. Los huecos se guardan como NaN (matplotlib corta
+    la línea) en vez de repetir el último valor.
+    """
+    
+    def __init__(self, capacity, columns):
+        self.capacity = capacity
+        self.timestamps = np.full(2 * capacity, np.nan)  # Epoch en segundos
+        self.x = np.full(2 * capacity, np.nan)           # Números de fecha de matplotlib
+        self.columns = {name: np.full(2 * capacity, np.nan) for name in columns}
+        self.total = 0  # Muestras agregadas en total (índice absoluto de la siguiente)
+    
+    def __len__(self):
+        return min(self.total, self.capacity)
+    
+    def _write(self, array, data, position):
+        """Copiar data en el anillo desde `position`, en ambas mitades"""
+        capacity = self.capacity
+        first = min(len(data), capacity - position)
+        array[position:position + first] = data[:first]
+        array[position + capacity:position + capacity + first] = data[:first]
+        rest = len(data) - first
+        if rest:
+            array[:rest] = data[first:]
+            array[capacity:capacity + rest] = data[first:]
+    
+    def extend(self, timestamps, columns):
+        """Agregar un lote: timestamps epoch y {columna: valores} alineados (NaN = hueco)
+        
+        La conversión a números de fecha se hace una sola vez por lote.
+        """
+        count = len(timestamps)
+        if not count:
+            return
+        skip = max(0, count - self.capacity)  # Del lote solo cabe la cola
+        position = (self.total + skip) % self.capacity
+        
+        timestamps = np.asarray(timestamps, dtype=float)[skip:]
+        self._write(self.timestamps, timestamps, position)
+        self._write(self.x, epoch_to_datenum(timestamps), position)
+        for name, array in self.columns.items():
+            values = columns.get(name)
+            if values is None:
+                self._write(array, np.full(count - skip, np.nan), position)
+            else:
+                self._write(array, values[skip:], position)
+        self.total += count
+    
+    def _window(self):
+        length = len(self)
+        start = (self.total - length) % self.capacity
+        return slice(start, start + length)
+    
+    def start(self):
+        """Índice absoluto de la primera muestra de la ventana"""
+        return self.total - len(self)
+    
+    def window_x(self):
+        """Vista de los números de fecha de la ventana (sin copia)"""
+        return self.x[self._window()]
+    
+    def window_timestamps(self):
+        """Vista de los timestamps epoch de la ventana (sin copia)"""
+        return self.timestamps[self._window()]
+    
+    def window(self, name):
+        """Vista de los valores de una columna en la ventana (sin copia)"""
+        return self.columns[name][self._window()]
+    
+    def clear(self):
+        self.timestamps.fill(np.nan)
+        self.x.fill(np.nan)
+        for array in self.columns.values():
+            array.fill(np.nan)
+        self.total = 0
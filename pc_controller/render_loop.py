@@ -0,0 +1,97 @@
+"""
+Bucle de render para Wally
+Tick de dibujo a cadencia fija, desacoplado de la tasa de adquisición
+"""
+import threading
+import time
+from collections import deque
+import config
+
+class RenderLoop:
+    """Cola de lecturas pendientes de dibujar + tick periódico en el thread de Tkinter
+    
+    La adquisición publica cada lectura con post() desde su hilo; cada
+    CHART_UPDATE_INTERVAL ms el tick drena todo lo acumulado y dibuja una
+    sola vez. Si la UI se atrasa no se encolan frames: las lecturas se
+    agrupan en el siguiente, y solo se conservan las últimas MAX_CHART_POINTS
+    (las anteriores no llegarían a verse en el gráfico).
+    """
+    
+    def __init__(self, root, draw, interval=None, limit=None):
+        self.root = root
+        self.draw = draw  # draw(records) en el thread UI, con las lecturas nuevas en orden
+        self.interval = interval or config.CHART_UPDATE_INTERVAL
+        self.limit = limit or config.MAX_CHART_POINTS
+        
+        self.pending = deque()
+        self.lock = threading.Lock()
+        self.running = False
+        
+        # Métricas del render
+        self.frames = 0
+        self.dropped = 0     # Lecturas descartadas por ir atrasados
+        self.late = 0        # Frames que tardaron más que el intervalo
+        self.last_batch = 0  # Lecturas dibujadas en el último frame
+        self.max_batch = 0
+        self.frame_ms = 0.0
+        self.frame_times = deque(maxlen=30)
+    
+    def post(self, record):
+        """Publicar una lectura para el próximo frame (desde cualquier thread)"""
+        with self.lock:
+            self.pending.append(record)
+            if len(self.pending) > self.limit:
+                self.pending.popleft()
+                self.dropped += 1
+    
+    def start(self):
+        if not self.running:
+            self.running = True
+            self.root.after(self.interval, self._tick)
+    
+    def stop(self):
+        self.running = False
+    
+    def _tick(self):
+        if not self.running:
+            return
+        
+        started = time.perf_counter()
+        with self.lock:
+            records = list(self.pending)
+            self.pending.clear()
+        
+        if records:
+            try:
+                self.draw(records)
+            except Exception as e:
+                print(f"❌ Error dibujando frame: {e}")
+            
+            self.frames += 1
+            self.last_batch = len(records)
+            self.max_batch = max(self.max_batch, len(records))
+            self.frame_ms = (time.perf_counter() - started) * 1000
+            self.frame_times.append(time.monotonic())
+            if self.frame_ms > self.interval:
+                self.late += 1
+        
+        # Descontar lo que tardó el frame para mantener la cadencia
+        elapsed = (time.perf_counter() - started) * 1000
+        self.root.after(max(1, int(self.interval - elapsed)), self._tick)
+    
+    def get_stats(self):
+        """Métricas del render: FPS, coste por frame y profundidad de la cola"""
+        times = self.frame_times
+        fps = (len(times) - 1) / (times[-1] - times[0]) if len(times) > 1 and times[-1] > times[0] else 0.0
+        with self.lock:
+            depth = len(self.pending)
+        return {
+            'fps': fps,
+            'frame_ms': self.frame_ms,
+            'queue_depth': depth,
+            'last_batch': self.last_batch,
+            'max_batch': self.max_batch,
+            'frames': self.frames,
+            'dropped': self.dropped,
+            'late': self.late
+        }
@@ -0,0 +1,132 @@
+"""
+Render worker para Wally
+Rasterizado de la figura con Agg fuera del thread de Tkinter
+"""
+import threading
+import time
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+class RenderWorker:
+    """Dibuja una figura con Agg en un thread aparte y entrega frames PPM a Tk
+    
+    El thread UI publica trabajos con submit() (gana el último: si el worker
+    va atrasado, los intermedios se descartan) y pega con paste() el último
+    frame terminado en un PhotoImage, que es lo único que hace Tk. El worker
+    ya deja cada frame como PPM binario (API pública de PhotoImage, sin el
+    blit privado de matplotlib). Los frames rotan entre 'dibujando', 'listo'
+    y 'mostrado', así un frame lento no bloquea la UI.
+    """
+    
+    def __init__(self, figure, prepare, resized=None):
+        self.figure = figure  # Solo la toca el worker mientras está en marcha
+        self.canvas = FigureCanvasAgg(figure)
+        self.prepare = prepare  # prepare(job) en el worker: actualizar artistas antes de dibujar
+        self.resized = resized  # resized() en el worker tras cambiar el tamaño de la figura
+        
+        self.pending = None
+        self.size = None
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.running = False
+        self.thread = None
+        
+        # Frames (ancho, alto, bytes PPM): índices de cada rol (siempre una permutación de 0, 1, 2)
+        self.buffers = [None, None, None]
+        self.drawing, self.ready, self.shown = 0, 1, 2
+        self.fresh = False
+        
+        # Métricas
+        self.frames = 0
+        self.skipped = 0  # Trabajos reemplazados antes de dibujarse
+        self.render_ms = 0.0
+    
+    def start(self):
+        if not self.running:
+            self.running = True
+            self.thread = threading.Thread(target=self._run, name="chart-render", daemon=True)
+            self.thread.start()
+    
+    def stop(self):
+        self.running = False
+        self.wakeup.set()
+        if self.thread is not None:
+            self.thread.join(timeout=2)
+            self.thread = None
+    
+    def submit(self, job):
+        """Publicar el estado a dibujar (desde el thread UI)"""
+        with self.lock:
+            if self.pending is not None:
+                self.skipped += 1
+            self.pending = job
+        self.wakeup.set()
+    
+    def resize(self, width, height):
+        """Nuevo tamaño del widget en píxeles"""
+        if width > 1 and height > 1:
+            with self.lock:
+                self.size = (width, height)
+            self.wakeup.set()
+    
+    def _run(self):
+        while self.running:
+            self.wakeup.wait()
+            self.wakeup.clear()
+            with self.lock:
+                job, self.pending = self.pending, None
+                size, self.size = self.size, None
+            if not self.running:
+                break
+            if job is None and size is None:
+                continue
+            
+            started = time.perf_counter()
+            try:
+                if size is not None:
+                    dpi = self.figure.dpi
+                    self.figure.set_size_inches(size[0] / dpi, size[1] / dpi)
+                    if self.resized is not None:
+                        self.resized()
+                if job is not None:
+                    self.prepare(job)
+                self.canvas.draw()
+                
+                rgba = np.asarray(self.canvas.buffer_rgba())
+                height, width = rgba.shape[:2]
+                rgb = np.ascontiguousarray(rgba[:, :, :3])
+                self.buffers[self.drawing] = (width, height,
+                                              b"P6 %d %d 255\n" % (width, height) + rgb.tobytes())
+            except Exception as e:
+                print(f"❌ Error en el render worker: {e}")
+                continue
+            
+            with self.lock:
+                self.drawing, self.ready = self.ready, self.drawing
+                self.fresh = True
+                self.frames += 1
+                self.render_ms = (time.perf_counter() - started) * 1000
+    
+    def take(self):
+        """Último frame terminado (ancho, alto, bytes PPM), o None si no hay uno nuevo (thread UI)"""
+        with self.lock:
+            if not self.fresh:
+                return None
+            self.shown, self.ready = self.ready, self.shown
+            self.fresh = False
+            return self.buffers[self.shown]
+    
+    def paste(self, photo):
+        """Pegar el último frame terminado en un PhotoImage; True si había uno nuevo"""
+        frame = self.take()
+        if frame is None:
+            return False
+        width, height, ppm = frame
+        if photo.width() != width or photo.height() != height:
+            photo.configure(width=width, height=height)
+        photo.tk.call(photo.name, 'put', ppm, '-format', 'PPM')
+        return True
+    
+    def get_stats(self):
+        with self.lock:
+            return {'frames': self.frames, 'skipped': self.skipped, 'render_ms': self.render_ms}
@@ -0,0 +1,184 @@
+"""
+Almacén de segmentos en disco para Wally
+Bloques columnares inmutables (.npz comprimido) + índice de rangos de tiempo
+"""
+import json
+import os
+import queue
+import threading
+import numpy as np
+import config
+from columnar_buffer import ChannelChunk, ColumnChunk
+from utils import load_config, save_config
+
+INDEX_FILE = "index.json"
+
+_STOP = object()
+
+def write_segment(chunk, filename):
+    """Guardar un ColumnChunk como .npz comprimido (escritura atómica)"""
+    arrays = {
+        'timestamp': chunk.timestamps,
+        'entry_id': chunk.entry_ids,
+        'sensor_count': chunk.sensor_counts,
+        'memory_free': chunk.memory_free,
+        'device_code': chunk.device_codes
+    }
+    meta = {'devices': chunk.devices, 'channels': []}
+    
+    for i, channel in enumerate(chunk.channels):
+        meta['channels'].append({'name': channel.name, 'units': channel.units})
+        arrays[f"c{i}_status"] = channel.status
+        arrays[f"c{i}_unit"] = channel.unit_codes
+        if channel.counts is not None:
+            # Solo cuentas: la calibración se aplica al leer
+            arrays[f"c{i}_count"] = channel.counts
+            if channel.fallback is not None:
+                arrays[f"c{i}_fallback"] = channel.fallback
+            continue
+        arrays[f"c{i}_value"] = channel.values
+        if channel.voltages is not None:
+            arrays[f"c{i}_voltage"] = channel.voltages
+        if channel.raws is not None:
+            arrays[f"c{i}_raw"] = channel.raws
+    arrays['meta'] = np.array(json.dumps(meta))
+    
+    temp_filename = filename + ".tmp"
+    with open(temp_filename, 'wb') as f:
+        np.savez_compressed(f, **arrays)
+    os.replace(temp_filename, filename)
+
+def read_segment(filename, channels=None, calibration=None):
+    """Cargar un segmento como ColumnChunk (solo los canales pedidos)
+    
+    Los canales guardados en cuentas toman la calibración vigente de la tabla.
+    """
+    with np.load(filename) as data:
+        meta = json.loads(str(data['meta']))
+        chunk_channels = []
+        for i, info in enumerate(meta['channels']):
+            if channels is not None and info['name'] not in channels:
+                continue
+            if f"c{i}_count" in data.files:
+                chunk_channels.append(ChannelChunk(
+                    info['name'], None, data[f"c{i}_status"], data[f"c{i}_unit"], info['units'],
+                    counts=data[f"c{i}_count"],
+                    calibration=calibration.current(info['name']) if calibration is not None else None,
+                    fallback=data[f"c{i}_fallback"] if f"c{i}_fallback" in data.files else None
+                ))
+                continue
+            chunk_channels.append(ChannelChunk(
+                info['name'],
+                data[f"c{i}_value"],
+                data[f"c{i}_status"],
+                data[f"c{i}_unit"],
+                info['units'],
+                data[f"c{i}_voltage"] if f"c{i}_voltage" in data.files else None,
+                data[f"c{i}_raw"] if f"c{i}_raw" in data.files else None
+            ))
+        
+        return ColumnChunk(data['timestamp'], data['entry_id'], data['sensor_count'],
+                           data['memory_free'], data['device_code'], meta['devices'],
+                           chunk_channels)
+
+def _overlaps(t0, t1, start, end):
+    return (t0 is None or end >= t0) and (t1 is None or start <= t1)
+
+class SegmentStore:
+    """Segmentos de una sesión en data/sessions/<id>/
+    
+    add() recibe una copia de filas ya sacadas del ring y la deja pendiente
+    en memoria; el hilo escritor la comprime a disco y la pasa al índice.
+    Las consultas ven siempre segmentos en disco + pendientes.
+    """
+    
+    def __init__(self, session_id, directory=None, calibration=None):
+        self.calibration = calibration
+        self.directory = os.path.join(directory or config.SESSION_DIRECTORY, session_id)
+        self.index_filename = os.path.join(self.directory, INDEX_FILE)
+        os.makedirs(self.directory, exist_ok=True)
+        
+        self.index = load_config(self.index_filename) if os.path.exists(self.index_filename) else None
+        self.index = self.index or []
+        self.pending = []
+        self.lock = threading.Lock()
+        
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self._writer_loop, daemon=True)
+        self.thread.start()
+    
+    def add(self, chunk):
+        """Encolar un bloque de filas para escribir (no bloquea)"""
+        with self.lock:
+            self.pending.append(chunk)
+        self.queue.put(chunk)
+    
+    def close(self):
+        """Esperar a que se escriban los segmentos pendientes"""
+        if self.thread is None:
+            return
+        self.queue.put(_STOP)
+        self.thread.join()
+        self.thread = None
+    
+    def _writer_loop(self):
+        while True:
+            chunk = self.queue.get()
+            if chunk is _STOP:
+                break
+            
+            number = len(self.index)
+            filename = f"seg_{number:05d}.npz"
+            try:
+                write_segment(chunk, os.path.join(self.directory, filename))
+            except OSError as e:
+                # Se queda en pendientes: sigue disponible en memoria
+                print(f"❌ Error escribiendo segmento {filename}: {e}")
+                continue
+            
+            entry = {
+                'file': filename,
+                't0': float(chunk.timestamps[0]),
+                't1': float(chunk.timestamps[-1]),
+                'first_entry': int(chunk.entry_ids[0]),
+                'last_entry': int(chunk.entry_ids[-1]),
+                'rows': len(chunk)
+            }
+            with self.lock:
+                self.index.append(entry)
+                self.pending.remove(chunk)
+                index = list(self.index)
+            save_config(index, self.index_filename)
+    
+    def snapshot(self, t0=None, t1=None):
+        """(entradas del índice, bloques pendientes) que solapan [t0, t1]"""
+        with self.lock:
+            entries = [e for e in self.index if _overlaps(t0, t1, e['t0'], e['t1'])]
+            pending = [c for c in self.pending
+                       if _overlaps(t0, t1, c.timestamps[0], c.timestamps[-1])]
+        return entries, pending
+    
+    def iter_chunks(self, snapshot, channels=None):
+        """Bloques de un snapshot, en orden temporal; solo lee los segmentos necesarios
+        
+        Un bloque cuya escritura falló sigue en pendientes mientras los
+        siguientes ya pasaron al índice: se intercalan por (t0, primera entrada).
+        Los pendientes toman la calibración vigente al leer, igual que los
+        segmentos en disco (pudo cambiar desde que se crearon).
+        """
+        entries, pending = snapshot
+        blocks = [(entry['t0'], entry['first_entry'], entry) for entry in entries]
+        blocks += [(float(chunk.timestamps[0]), int(chunk.entry_ids[0]), chunk) for chunk in pending]
+        blocks.sort(key=lambda block: block[:2])
+        
+        for _, _, block in blocks:
+            if isinstance(block, dict):
+                yield read_segment(os.path.join(self.directory, block['file']), channels,
+                                   self.calibration)
+            else:
+                yield block.with_calibration(self.calibration)
+    
+    def get_row_count(self):
+        """Filas guardadas en segmentos (en disco + pendientes)"""
+        with self.lock:
+            return sum(e['rows'] for e in self.index) + sum(len(c) for c in self.pending)
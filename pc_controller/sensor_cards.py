@@ -0,0 +1,149 @@
+"""
+Tarjetas de sensores para Wally
+Una tarjeta por canal del dispositivo, con actualización solo de lo que cambió
+"""
+import time
+import tkinter as tk
+from tkinter import ttk
+import config
+from channel_registry import registry
+
+# Estados de una tarjeta: (texto de status, color del status)
+STATE_ACTIVE = ("🟢 Activo", "green")
+STATE_OUT_OF_RANGE = ("⚠️ Fuera de rango", "orange")
+STATE_ERROR = ("🔴 Error", "red")
+STATE_UNAVAILABLE = ("🔘 No disponible", "gray")
+
+class SensorCard:
+    """View-model de una tarjeta: labels Tk + último (texto, color) aplicado a cada uno"""
+    __slots__ = ('labels', 'shown')
+    
+    def __init__(self, labels):
+        self.labels = labels  # 'value', 'unit', 'status', 'time' → Label
+        self.shown = {}
+    
+    def show(self, part, text, foreground=""):
+        """Aplicar texto y color a un label solo si difieren de lo ya mostrado; 1 si se aplicó"""
+        state = (text, foreground)
+        if self.shown.get(part) == state:
+            return 0
+        self.shown[part] = state
+        self.labels[part].config(text=text, foreground=foreground)
+        return 1
+
+class SensorCardPanel:
+    """Tarjetas creadas según los canales que reporta el dispositivo (vía el registro)
+    
+    Cada frame recibe la última lectura y aplica de una vez solo las
+    diferencias: con valores estables no se toca ningún widget, así Tk no
+    recalcula el layout y el panel sigue fluido con decenas de canales.
+    """
+    
+    def __init__(self, parent, columns=None):
+        self.parent = parent
+        self.columns = columns or config.SENSOR_CARD_COLUMNS
+        self.cards = {}         # ID de canal → SensorCard
+        self.layout_cards = {}  # ChannelLayout → [SensorCard] en orden del layout
+        self.placeholder = None
+        self.clock = (None, "")  # (segundo, "HH:MM:SS") del último timestamp formateado
+        self.applied = 0         # Cambios aplicados a widgets (métrica)
+        
+        if parent is not None:
+            self.placeholder = ttk.Label(parent, text="Esperando canales del dispositivo...",
+                                         foreground="gray")
+            self.placeholder.grid(row=0, column=0, sticky=tk.W)
+    
+    def _create_card(self, info):
+        """Crear los widgets de la tarjeta de un canal"""
+        if self.placeholder is not None:
+            self.placeholder.destroy()
+            self.placeholder = None
+        
+        position = len(self.cards)
+        card_frame = ttk.LabelFrame(self.parent, text=info.label, padding="10")
+        card_frame.grid(row=position // self.columns, column=position % self.columns,
+                        sticky=(tk.W, tk.E), padx=4, pady=4)
+        
+        # Valor principal
+        value_label = ttk.Label(card_frame, text="--", font=("Arial", 20, "bold"),
+                                foreground=info.color or "")
+        value_label.pack()
+        
+        # Unidad
+        unit_label = ttk.Label(card_frame, text=info.unit or "--", font=("Arial", 11))
+        unit_label.pack()
+        
+        # Status y último update
+        status_frame = ttk.Frame(card_frame)
+        status_frame.pack(fill=tk.X, pady=(5, 0))
+        
+        status_label = ttk.Label(status_frame, text="🔴 Desconectado", font=("Arial", 9))
+        status_label.pack(side=tk.LEFT)
+        
+        time_label = ttk.Label(status_frame, text="", font=("Arial", 9), foreground="gray")
+        time_label.pack(side=tk.RIGHT)
+        
+        return SensorCard({'value': value_label, 'unit': unit_label,
+                           'status': status_label, 'time': time_label})
+    
+    def _cards_for(self, layout):
+        """Tarjetas de los canales de un layout, creando las que falten (cacheado)"""
+        cards = self.layout_cards.get(layout)
+        if cards is None:
+            cards = []
+            for channel_id in layout.ids:
+                card = self.cards.get(channel_id)
+                if card is None:
+                    card = self._create_card(registry.info(channel_id))
+                    self.cards[channel_id] = card
+                cards.append(card)
+            self.layout_cards[layout] = cards
+        return cards
+    
+    def _clock(self, timestamp):
+        """Hora de la lectura, formateada una sola vez por segundo"""
+        second = int(timestamp)
+        if self.clock[0] != second:
+            self.clock = (second, time.strftime("%H:%M:%S", time.localtime(second)))
+        return self.clock[1]
+    
+    def update(self, record):
+        """Aplicar la última lectura del frame a todas las tarjetas"""
+        cards = self._cards_for(record.layout)
+        clock = self._clock(record.timestamp)
+        applied = 0
+        
+        for i, card in enumerate(cards):
+            info = registry.info(record.layout.ids[i])
+            value = record.value_at(i)
+            
+            if value is not None:
+                # Sensor activo (rojo y aviso si se sale del rango del tipo)
+                sensor_range = info.range
+                if sensor_range is not None and not (sensor_range[0] <= value <= sensor_range[1]):
+                    color, state = "red", STATE_OUT_OF_RANGE
+                else:
+                    color, state = info.color or "", STATE_ACTIVE
+                applied += card.show('value', f"{value:.2f}", color)
+                applied += card.show('unit', record.units[i] or info.unit or "--")
+            else:
+                # Sensor con error
+                state = STATE_ERROR
+                applied += card.show('value', "ERROR", "red")
+                applied += card.show('unit', "--")
+            
+            applied += card.show('status', *state)
+            applied += card.show('time', clock, "gray")
+        
+        # Canales que ya no vienen en la lectura
+        if len(cards) < len(self.cards):
+            current = set(record.layout.ids)
+            for channel_id, card in self.cards.items():
+                if channel_id not in current:
+                    applied += card.show('value', "--", "gray")
+                    applied += card.show('unit', "--")
+                    applied += card.show('status', *STATE_UNAVAILABLE)
+                    applied += card.show('time', "", "gray")
+        
+        self.applied += applied
+        return applied
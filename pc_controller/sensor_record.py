@@ -0,0 +1,178 @@
+"""
+Registros planos de lectura para Wally
+Decodifica el payload de /sensors una sola vez en arrays indexados por canal
+"""
+import json
+import math
+import time
+from array import array
+from channel_registry import registry
+
+# Backend JSON rápido si está instalado
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Estado de cada canal dentro de un registro
+STATUS_MISSING = 0
+STATUS_ACTIVE = 1
+STATUS_ERROR = 2
+STATUS_NAMES = {STATUS_MISSING: None, STATUS_ACTIVE: 'active', STATUS_ERROR: 'error'}
+
+NAN = float('nan')
+
+def loads(payload):
+    """Parsear JSON con orjson si está disponible"""
+    if orjson is not None:
+        return orjson.loads(payload)
+    return json.loads(payload)
+
+def dumps(obj):
+    """Serializar a JSON compacto (bytes) con orjson si está disponible"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+class ChannelLayout:
+    """Orden de canales de un payload: nombre → índice (compartido entre registros)"""
+    __slots__ = ('names', 'ids', 'index', 'units')
+    
+    def __init__(self, names, ids=None):
+        self.names = tuple(names)
+        # IDs enteros del ChannelRegistry, en el mismo orden que names
+        self.ids = tuple(ids) if ids is not None else registry.ids_for(self.names)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.units = None
+
+class SensorRecord:
+    """Lectura plana: arrays paralelos indexados por canal"""
+    __slots__ = ('timestamp', 'device_id', 'sensor_count', 'memory_free',
+                 'entry_id', 'layout', 'values', 'status', 'units', 'voltages', 'raws')
+    
+    def __init__(self, timestamp, device_id, sensor_count, memory_free, layout,
+                 values, status, units, voltages, raws):
+        self.timestamp = timestamp
+        self.device_id = device_id
+        self.sensor_count = sensor_count
+        self.memory_free = memory_free
+        self.entry_id = None
+        self.layout = layout
+        self.values = values      # array('d'), NaN si no hay valor
+        self.status = status      # bytes, un STATUS_* por canal
+        self.units = units        # tuple compartida con el layout si no cambia
+        self.voltages = voltages  # array('d'), NaN si no hay dato
+        self.raws = raws          # array('d'), NaN si no hay dato
+    
+    @property
+    def channels(self):
+        """Nombres de canal en el orden de los arrays"""
+        return self.layout.names
+    
+    def value(self, channel):
+        """Valor de un canal por nombre (None si falta o es inválido)"""
+        i = self.layout.index.get(channel)
+        if i is None or self.status[i] != STATUS_ACTIVE:
+            return None
+        value = self.values[i]
+        return None if math.isnan(value) else value
+    
+    def value_at(self, i):
+        """Valor por posición en el layout (sin buscar el nombre)"""
+        if self.status[i] != STATUS_ACTIVE:
+            return None
+        value = self.values[i]
+        return None if math.isnan(value) else value
+    
+    def to_dict(self):
+        """Reconstruir el formato anidado original de /sensors"""
+        readings = {}
+        for i, name in enumerate(self.layout.names):
+            readings[name] = {
+                'value': _optional(self.values[i]),
+                'unit': self.units[i],
+                'voltage': _optional(self.voltages[i]),
+                'raw': _optional_int(self.raws[i]),
+                'status': STATUS_NAMES[self.status[i]]
+            }
+        
+        return {
+            'timestamp': self.timestamp,
+            'device_id': self.device_id,
+            'readings': readings,
+            'sensor_count': self.sensor_count,
+            'memory_free': self.memory_free,
+            'entry_id': self.entry_id
+        }
+
+def _optional(value):
+    return None if math.isnan(value) else value
+
+def _optional_int(value):
+    return None if math.isnan(value) else int(value)
+
+def _number(value):
+    """Convertir a float; NaN si falta o no es numérico"""
+    if value is None:
+        return NAN
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return NAN
+
+class SensorDecoder:
+    """Decodificador de payloads /sensors con cache de layouts"""
+    
+    def __init__(self, channel_registry=None):
+        self.layouts = {}
+        self.registry = channel_registry or registry
+    
+    def layout_for(self, names):
+        """Layout cacheado para una secuencia de canales"""
+        key = tuple(names)
+        layout = self.layouts.get(key)
+        if layout is None:
+            layout = ChannelLayout(key, self.registry.ids_for(key))
+            self.layouts[key] = layout
+        return layout
+    
+    def decode(self, payload):
+        """Bytes JSON → SensorRecord"""
+        return self.from_dict(loads(payload))
+    
+    def from_dict(self, data):
+        """Dict /sensors (ya parseado) → SensorRecord"""
+        readings = data.get('readings') or {}
+        layout = self.layout_for(readings)
+        
+        values = array('d')
+        voltages = array('d')
+        raws = array('d')
+        status = bytearray()
+        units = []
+        
+        for reading in readings.values():
+            values.append(_number(reading.get('value')))
+            voltages.append(_number(reading.get('voltage')))
+            raws.append(_number(reading.get('raw')))
+            status.append(STATUS_ACTIVE if reading.get('status') == 'active' else STATUS_ERROR)
+            units.append(reading.get('unit'))
+        
+        # Reutilizar la tupla de unidades del layout mientras no cambie
+        units = tuple(units)
+        if layout.units != units:
+            layout.units = units
+            self.registry.observe_units(layout.ids, units)
+        
+        return SensorRecord(
+            data.get('timestamp', time.time()),
+            data.get('device_id', 'unknown'),
+            data.get('sensor_count', 0),
+            data.get('memory_free', 0),
+            layout,
+            values,
+            bytes(status),
+            layout.units,
+            voltages,
+            raws
+        )
@@ -0,0 +1,247 @@
+"""
+Log de sesión write-ahead para Wally
+Cada lectura se añade a data/sessions/<id>.wal (NDJSON) desde un hilo escritor
+
+El mismo formato NDJSON (cabecera, una lectura por línea, cierre) sirve
+para exportar e importar sesiones, opcionalmente comprimidas con gzip o xz.
+"""
+import glob
+import gzip
+import lzma
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+import config
+from sensor_record import dumps, loads
+
+SESSION_FORMAT = 1
+SESSION_SUFFIX = ".wal"
+NDJSON_SUFFIXES = ('.ndjson', '.ndjson.gz', '.ndjson.xz', '.jsonl', '.jsonl.gz', '.jsonl.xz')
+
+_STOP = object()
+
+class SessionLog:
+    """Log append-only de una sesión de adquisición
+    
+    append() solo encola el registro: serializar, escribir y hacer fsync
+    ocurre en el hilo escritor, por lotes. La primera línea es una cabecera
+    y la última un cierre; un log sin cierre es una sesión interrumpida.
+    """
+    
+    def __init__(self, session_id=None, directory=None):
+        self.directory = directory or config.SESSION_DIRECTORY
+        self.session_id = session_id or _new_session_id(self.directory)
+        self.filename = os.path.join(self.directory, self.session_id + SESSION_SUFFIX)
+        
+        self.queue = queue.Queue()
+        self.thread = None
+        self.file = None
+        self.written = 0
+        self.last_fsync = 0
+        self.dirty = False  # Hay escrituras aún sin fsync
+    
+    def start(self, metadata=None):
+        """Abrir el log, escribir la cabecera e iniciar el hilo escritor"""
+        os.makedirs(self.directory, exist_ok=True)
+        self.file = open(self.filename, 'ab')
+        
+        self.queue.put(session_header(self.session_id, start_time=time.time(), **(metadata or {})))
+        
+        self.thread = threading.Thread(target=self._writer_loop, daemon=True)
+        self.thread.start()
+        print(f"📝 Log de sesión: {self.filename}")
+    
+    def append(self, record):
+        """Encolar un SensorRecord (no bloquea)"""
+        self.queue.put(record)
+    
+    def close(self):
+        """Vaciar la cola, escribir el cierre y esperar al hilo escritor"""
+        if self.thread is None:
+            return
+        self.queue.put(_STOP)
+        self.thread.join()
+        self.thread = None
+    
+    def _writer_loop(self):
+        """Hilo escritor: agrupa lo encolado en una sola escritura
+        
+        Con escrituras pendientes de fsync la espera tiene timeout: si la
+        adquisición se pausa (parada, reconexión) el último lote igual llega
+        al disco a más tardar SESSION_FSYNC_INTERVAL después.
+        """
+        running = True
+        while running:
+            try:
+                if self.dirty:
+                    wait = self.last_fsync + config.SESSION_FSYNC_INTERVAL - time.monotonic()
+                    batch = [self.queue.get(timeout=max(wait, 0.001))]
+                else:
+                    batch = [self.queue.get()]
+            except queue.Empty:
+                self._sync()
+                continue
+            while len(batch) < config.SESSION_BATCH_SIZE:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            
+            if _STOP in batch:
+                batch = batch[:batch.index(_STOP)]
+                running = False
+            
+            self._write(batch, force_sync=not running)
+            if not running:
+                self._write([{'end_time': time.time(), 'readings': self.written}], force_sync=True)
+        
+        self.file.close()
+    
+    def _write(self, batch, force_sync=False):
+        lines = [encode_line(item.to_dict() if hasattr(item, 'to_dict') else item) for item in batch]
+        
+        try:
+            self.file.write(b"".join(lines))
+            self.file.flush()
+            
+            self.dirty = True
+            if force_sync or time.monotonic() - self.last_fsync >= config.SESSION_FSYNC_INTERVAL:
+                self._sync()
+        except OSError as e:
+            print(f"❌ Error escribiendo log de sesión: {e}")
+            return
+        
+        self.written += sum(1 for item in batch if hasattr(item, 'to_dict'))
+    
+    def _sync(self):
+        """fsync de lo escrito desde el último"""
+        try:
+            os.fsync(self.file.fileno())
+        except OSError as e:
+            print(f"❌ Error sincronizando log de sesión: {e}")
+        self.last_fsync = time.monotonic()
+        self.dirty = False
+
+def _new_session_id(directory):
+    """ID por fecha/hora, con sufijo si ya existe un log en el mismo segundo"""
+    base = datetime.now().strftime('%Y%m%d_%H%M%S')
+    session_id, n = base, 1
+    while os.path.exists(os.path.join(directory, session_id + SESSION_SUFFIX)):
+        session_id = f"{base}_{n}"
+        n += 1
+    return session_id
+
+def session_header(session_id, **metadata):
+    """Primera línea de un log o exportación NDJSON"""
+    header = {
+        'wally_session': SESSION_FORMAT,
+        'session_id': session_id,
+        'wally_version': config.VERSION
+    }
+    header.update(metadata)
+    return header
+
+def encode_line(item):
+    """Un objeto → una línea NDJSON (bytes)"""
+    return dumps(item) + b"\n"
+
+def open_session_file(filename, mode='rb'):
+    """Abrir un archivo NDJSON, comprimido según la extensión (.gz / .xz)"""
+    if filename.endswith('.gz'):
+        return gzip.open(filename, mode)
+    if filename.endswith('.xz'):
+        return lzma.open(filename, mode)
+    return open(filename, mode)
+
+def is_ndjson_file(filename):
+    return filename.lower().endswith(NDJSON_SUFFIXES)
+
+class SessionReader:
+    """Lector perezoso de logs/exportaciones NDJSON
+    
+    La cabecera se lee al abrir; iterar devuelve las lecturas (dicts en el
+    formato de /sensors) de una en una, sin cargar el archivo en memoria.
+    El cierre queda en `footer` al terminar de iterar. Las líneas truncadas
+    por un corte brusco se ignoran.
+    """
+    
+    def __init__(self, filename):
+        self.filename = filename
+        self.file = open_session_file(filename, 'rb')
+        self.header = None
+        self.footer = None
+        self.first_reading = None
+        
+        first = self._next_item()
+        if first is not None and 'wally_session' in first:
+            self.header = first
+        else:
+            self.first_reading = first  # Archivo sin cabecera
+    
+    def _next_item(self):
+        for line in self.file:
+            try:
+                return loads(line)
+            except ValueError:
+                continue
+        return None
+    
+    def __iter__(self):
+        if self.first_reading is not None:
+            yield self.first_reading
+            self.first_reading = None
+        
+        for line in self.file:
+            try:
+                item = loads(line)
+            except ValueError:
+                continue
+            if 'end_time' in item:
+                self.footer = item
+            else:
+                yield item
+        self.close()
+    
+    def records(self, decoder):
+        """Lecturas como SensorRecord"""
+        for data in self:
+            yield decoder.from_dict(data)
+    
+    def close(self):
+        self.file.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+
+def read_session(filename):
+    """Leer un log completo: (cabecera, lecturas, cierre o None)"""
+    with SessionReader(filename) as reader:
+        readings = list(reader)
+        return reader.header, readings, reader.footer
+
+def find_unclosed_sessions(directory=None):
+    """Logs de sesiones que no se cerraron (la aplicación terminó de golpe)"""
+    directory = directory or config.SESSION_DIRECTORY
+    unclosed = []
+    for filename in sorted(glob.glob(os.path.join(directory, "*" + SESSION_SUFFIX))):
+        if _last_line(filename).find(b'"end_time"') == -1:
+            unclosed.append(filename)
+    return unclosed
+
+def mark_recovered(filename, readings):
+    """Cerrar un log interrumpido para no recuperarlo otra vez"""
+    with open(filename, 'ab') as f:
+        f.write(b"\n" + encode_line({'end_time': time.time(), 'readings': readings, 'recovered': True}))
+
+def _last_line(filename):
+    """Última línea no vacía de un archivo (lee solo el final)"""
+    with open(filename, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        f.seek(max(0, f.tell() - 4096))
+        lines = f.read().strip().splitlines()
+    return lines[-1] if lines else b""
@@ -0,0 +1,60 @@
+"""
+Perfil de arranque para Wally
+Tiempo de imports y de construcción de la UI hasta el primer frame
+"""
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# Librerías pesadas cuyo estado (cargada o no) se informa en el reporte
+HEAVY_MODULES = ('numpy', 'requests', 'matplotlib', 'pandas', 'pyarrow')
+
+class StartupReport:
+    """Fases del arranque (duración) y eventos (ms desde el inicio del proceso)"""
+    
+    def __init__(self, started=None):
+        self.started = started if started is not None else time.perf_counter()
+        self.phases = []  # (nombre, ms) en orden de finalización
+        self.marks = {}   # evento → ms desde el inicio
+        self.lock = threading.Lock()
+    
+    def elapsed(self):
+        return (time.perf_counter() - self.started) * 1000
+    
+    @contextmanager
+    def phase(self, name):
+        """Medir un bloque (imports, construcción de la UI...)"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.phases.append((name, (time.perf_counter() - started) * 1000))
+    
+    def mark(self, event):
+        """Registrar un evento la primera vez que ocurre; ms desde el inicio"""
+        with self.lock:
+            if event not in self.marks:
+                self.marks[event] = self.elapsed()
+            return self.marks[event]
+    
+    def loaded_modules(self):
+        """Librerías pesadas ya importadas en este momento"""
+        return [name for name in HEAVY_MODULES if name in sys.modules]
+    
+    def report(self):
+        """Reporte legible: perfil de fases y eventos"""
+        with self.lock:
+            phases = list(self.phases)
+            marks = sorted(self.marks.items(), key=lambda item: item[1])
+        lines = ["⏱️ Arranque:"]
+        for name, ms in phases:
+            lines.append(f"   {name:<38}{ms:>8.0f} ms")
+        for event, ms in marks:
+            lines.append(f"   → {event:<36}{ms:>8.0f} ms")
+        lines.append(f"   Cargadas: {', '.join(self.loaded_modules()) or '-'}")
+        return "\n".join(lines)
+
+# Reloj compartido: empieza al importar este módulo (lo primero que hace main.py)
+startup = StartupReport()
@@ -4,12 +4,15 @@ Interfaz gráfica completa con Tkinter y matplotlib
 """
 import tkinter as tk
 from tkinter import ttk, filedialog
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkinter
 import numpy as np
-from collections import deque
 from datetime import datetime
 import config
+from channel_registry import registry
+from chart_backends import create_chart_backend, preload_chart_backend
+from downsampling import IncrementalDownsampler
+from plot_buffer import PlotRingBuffer
+from sensor_cards import SensorCardPanel
+from startup import startup
 
 class WallyDashboard:
     """Dashboard principal del sistema Wally"""
@@ -18,19 +21,26 @@ class WallyDashboard:
         self.root = root
         self.controller = controller
         
-        # Datos para gráficos
-        self.plot_data = {
-            sensor: deque(maxlen=config.MAX_CHART_POINTS) 
+        # Datos para gráficos: anillo NumPy preasignado (timestamps + una columna por tarjeta)
+        self.chart_buffer = PlotRingBuffer(config.MAX_CHART_POINTS, config.SENSOR_LABELS.keys())
+        self.downsamplers = {
+            sensor: IncrementalDownsampler(config.CHART_MAX_DRAWN_POINTS, config.CHART_DOWNSAMPLING)
             for sensor in config.SENSOR_LABELS.keys()
         }
-        self.time_data = deque(maxlen=config.MAX_CHART_POINTS)
         
         # Referencias a widgets
         self.status_label = None
-        self.sensor_frames = {}
-        self.chart_canvas = None
+        self.sensor_cards = None
+        self.chart = None  # ChartBackend del gráfico en vivo (config.CHART_BACKEND)
+        self.chart_frame = None
+        self.chart_placeholder = None
+        self.chart_ready = None  # Event: módulo del backend importado
         self.stats_labels = {}
         self.control_buttons = {}
+        self.latency_label = None
+        self.channel_stats_label = None
+        self.history_view = None
+        self.layout_series = {}  # ChannelLayout → {serie del gráfico: [posiciones de sus canales]}
         
         # Estado
         self.last_update = None
@@ -81,82 +91,48 @@ class WallyDashboard:
         sensors_frame = ttk.LabelFrame(parent, text="📊 Sensores en Tiempo Real", padding="10")
         sensors_frame.grid(row=1, column=0, sticky=(tk.W, tk.E, tk.N, tk.S), padx=(0, 10))
         
-        # Crear tarjetas para cada sensor
-        for i, (sensor_key, sensor_label) in enumerate(config.SENSOR_LABELS.items()):
-            # Frame individual
-            card_frame = ttk.LabelFrame(sensors_frame, text=sensor_label, padding="15")
-            card_frame.pack(fill=tk.X, pady=8)
-            
-            # Valor principal
-            value_label = ttk.Label(card_frame, text="--", 
-                                   font=("Arial", 28, "bold"), 
-                                   foreground=config.CHART_COLORS[sensor_key])
-            value_label.pack()
-            
-            # Unidad
-            unit_label = ttk.Label(card_frame, text="--", 
-                                  font=("Arial", 12))
-            unit_label.pack()
-            
-            # Status y último update
-            status_frame = ttk.Frame(card_frame)
-            status_frame.pack(fill=tk.X, pady=(5, 0))
-            
-            status_label = ttk.Label(status_frame, text="🔴 Desconectado", 
-                                    font=("Arial", 10))
-            status_label.pack(side=tk.LEFT)
-            
-            time_label = ttk.Label(status_frame, text="", 
-                                  font=("Arial", 9), foreground="gray")
-            time_label.pack(side=tk.RIGHT)
-            
-            # Guardar referencias
-            self.sensor_frames[sensor_key] = {
-                'value': value_label,
-                'unit': unit_label,
-                'status': status_label,
-                'time': time_label,
-                'frame': card_frame
-            }
+        # Tarjetas creadas al llegar los canales del dispositivo (una por canal)
+        for column in range(config.SENSOR_CARD_COLUMNS):
+            sensors_frame.columnconfigure(column, weight=1)
+        self.sensor_cards = SensorCardPanel(sensors_frame)
     
     def setup_chart_panel(self, parent):
         """Panel de gráficos históricos"""
         chart_frame = ttk.LabelFrame(parent, text="📈 Gráficos en Tiempo Real", padding="10")
         chart_frame.grid(row=1, column=1, sticky=(tk.W, tk.E, tk.N, tk.S))
         
-        # Crear figura matplotlib
-        plt.style.use('default')
-        self.fig, self.axes = plt.subplots(2, 2, figsize=(10, 8))
-        self.fig.suptitle("Sensores Wally - Datos Históricos", fontsize=14, fontweight='bold')
-        
-        # Configurar cada subplot
-        sensors = list(config.SENSOR_LABELS.keys())
-        for i, sensor_key in enumerate(sensors):
-            row, col = i // 2, i % 2
-            ax = self.axes[row, col]
-            
-            sensor_label = config.SENSOR_LABELS[sensor_key]
-            sensor_unit = config.SENSOR_UNITS[sensor_key]
-            color = config.CHART_COLORS[sensor_key]
-            
-            ax.set_title(f"{sensor_label}", fontsize=12, fontweight='bold')
-            ax.set_ylabel(f"Valor ({sensor_unit})")
-            ax.grid(True, alpha=0.3)
-            ax.tick_params(axis='x', rotation=45, labelsize=8)
-            
-            # Configurar límites iniciales
-            sensor_range = config.SENSOR_RANGES.get(sensor_key, (0, 100))
-            ax.set_ylim(sensor_range[0] * 0.9, sensor_range[1] * 1.1)
-        
-        plt.tight_layout()
+        self.chart_frame = chart_frame
         
-        # Integrar con Tkinter
-        self.chart_canvas = FigureCanvasTkinter(self.fig, chart_frame)
-        self.chart_canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
-        
-        # Toolbar de matplotlib (opcional)
-        # toolbar = NavigationToolbar2Tk(self.chart_canvas, chart_frame)
-        # toolbar.update()
+        # El gráfico se construye cuando su backend termina de importarse en
+        # segundo plano: la ventana y los controles se pintan antes
+        self.chart_placeholder = ttk.Label(chart_frame, text="⏳ Cargando gráfico...", foreground="gray")
+        self.chart_placeholder.pack(expand=True)
+        self.chart_ready = preload_chart_backend(config.CHART_BACKEND)
+        self.poll_chart_ready()
+    
+    def poll_chart_ready(self):
+        """Esperar (sin bloquear la UI) a que el backend esté importado y construir el gráfico"""
+        if not self.chart_ready.is_set():
+            self.root.after(config.CHART_UPDATE_INTERVAL, self.poll_chart_ready)
+            return
+        self.build_chart()
+    
+    def build_chart(self):
+        """Construir el backend del gráfico en vivo: matplotlib o canvas nativo de Tk"""
+        with startup.phase("construir gráfico"):
+            if self.chart_placeholder is not None:
+                self.chart_placeholder.destroy()
+                self.chart_placeholder = None
+            self.chart = create_chart_backend(config.CHART_BACKEND, self.root,
+                                              config.SENSOR_LABELS.keys(), self.set_chart_width)
+            self.chart.build(self.chart_frame)
+        
+        ms = startup.mark("gráfico listo")
+        if config.STARTUP_REPORT:
+            print(f"📈 Gráfico listo ({config.CHART_BACKEND}) a los {ms:.0f} ms del arranque")
+        
+        # Dibujar lo acumulado mientras cargaba
+        self.update_chart([])
     
     def setup_controls_panel(self, parent):
         """Panel de controles principales"""
@@ -179,10 +155,20 @@ class WallyDashboard:
         self.control_buttons['stop'].pack(side=tk.LEFT, padx=5)
         
         self.control_buttons['export'] = ttk.Button(
-            buttons_frame, text="📥 Exportar CSV", 
+            buttons_frame, text="📥 Exportar", 
             command=self.controller.export_data)
         self.control_buttons['export'].pack(side=tk.LEFT, padx=5)
         
+        self.control_buttons['history'] = ttk.Button(
+            buttons_frame, text="🔍 Historial", 
+            command=self.open_history_view)
+        self.control_buttons['history'].pack(side=tk.LEFT, padx=5)
+        
+        self.control_buttons['chart_image'] = ttk.Button(
+            buttons_frame, text="🖼️ Guardar gráfico", 
+            command=self.save_chart_image)
+        self.control_buttons['chart_image'].pack(side=tk.LEFT, padx=5)
+        
         # Separador vertical
         ttk.Separator(controls_frame, orient=tk.VERTICAL).pack(
             side=tk.LEFT, fill=tk.Y, padx=15)
@@ -202,115 +188,124 @@ class WallyDashboard:
         
         self.stats_labels['rate'] = ttk.Label(info_frame, text="Tasa: 0.0 Hz")
         self.stats_labels['rate'].pack(anchor=tk.W)
+        
+        self.stats_labels['render'] = ttk.Label(info_frame, text="Render: --")
+        self.stats_labels['render'].pack(anchor=tk.W)
     
     def setup_stats_panel(self, parent):
-        """Panel de estadísticas (si es necesario más detalle)"""
-        pass  # Expandir en futuras versiones
+        """Panel de latencia de red por endpoint (p50/p95/p99)"""
+        stats_frame = ttk.LabelFrame(parent, text="⏱️ Latencia de Red", padding="10")
+        stats_frame.grid(row=4, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(10, 0))
+        
+        self.latency_label = ttk.Label(stats_frame, text="Sin peticiones todavía",
+                                       font=("Courier", 9), justify=tk.LEFT)
+        self.latency_label.pack(anchor=tk.W)
+        
+        # Estadísticas incrementales por canal
+        channel_frame = ttk.LabelFrame(parent, text="📈 Estadísticas por Canal", padding="10")
+        channel_frame.grid(row=5, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(10, 0))
+        
+        self.channel_stats_label = ttk.Label(channel_frame, text="Sin lecturas todavía",
+                                             font=("Courier", 9), justify=tk.LEFT)
+        self.channel_stats_label.pack(anchor=tk.W)
     
-    def update_sensors(self, readings):
-        """Actualizar displays de sensores"""
-        current_time = datetime.now().strftime("%H:%M:%S")
-        
-        for sensor_key, frames in self.sensor_frames.items():
-            if sensor_key in readings:
-                reading = readings[sensor_key]
-                
-                if reading['status'] == 'active' and reading['value'] is not None:
-                    # Sensor activo
-                    value = reading['value']
-                    unit = reading['unit']
-                    
-                    frames['value'].config(text=f"{value:.2f}", 
-                                         foreground=config.CHART_COLORS[sensor_key])
-                    frames['unit'].config(text=unit)
-                    frames['status'].config(text="🟢 Activo", foreground="green")
-                    frames['time'].config(text=current_time)
-                    
-                    # Validar rango
-                    sensor_range = config.SENSOR_RANGES.get(sensor_key, (float('-inf'), float('inf')))
-                    if not (sensor_range[0] <= value <= sensor_range[1]):
-                        frames['value'].config(foreground="red")
-                        frames['status'].config(text="⚠️ Fuera de rango", foreground="orange")
-                
-                else:
-                    # Sensor con error
-                    frames['value'].config(text="ERROR", foreground="red")
-                    frames['unit'].config(text="--")
-                    frames['status'].config(text="🔴 Error", foreground="red")
-                    frames['time'].config(text=current_time)
-            
-            else:
-                # Sensor no disponible
-                frames['value'].config(text="--", foreground="gray")
-                frames['unit'].config(text="--")
-                frames['status'].config(text="🔘 No disponible", foreground="gray")
-                frames['time'].config(text="")
+    def _layout_series(self, layout):
+        """Canales de un layout que alimentan cada serie del gráfico, según su tipo en el registro (cacheado)"""
+        series = self.layout_series.get(layout)
+        if series is None:
+            series = {}
+            for i, channel_id in enumerate(layout.ids):
+                kind = registry.info(channel_id).kind
+                if kind in config.SENSOR_LABELS:
+                    series.setdefault(kind, []).append(i)
+            self.layout_series[layout] = series
+        return series
+    
+    def _series_value(self, record, positions):
+        """(posición, valor) del primer canal activo de una serie"""
+        for i in positions:
+            value = record.value_at(i)
+            if value is not None:
+                return i, value
+        return positions[0], None
+    
+    def update_sensors(self, record):
+        """Actualizar tarjetas de sensores con la última lectura del frame (solo lo que cambió)"""
+        if self.sensor_cards is not None and record:
+            self.sensor_cards.update(record)
     
-    def update_chart(self, data):
-        """Actualizar gráficos en tiempo real"""
-        if not data or 'readings' not in data:
+    def set_chart_width(self, sensor_key, width):
+        """Objetivo del downsampler: unas 2 muestras por píxel de ancho del panel"""
+        if width > 0 and config.CHART_DOWNSAMPLING:
+            self.downsamplers[sensor_key].target = min(2 * width, config.CHART_MAX_DRAWN_POINTS)
+    
+    def append_chart(self, records):
+        """Agregar un lote de SensorRecord a los buffers del gráfico (sin dibujar)"""
+        records = [record for record in records if record]
+        if not records:
             return
         
-        # Agregar timestamp
-        current_time = datetime.fromtimestamp(data['timestamp'])
-        self.time_data.append(current_time)
-        
-        # Agregar datos de sensores
-        readings = data['readings']
-        for sensor_key in config.SENSOR_LABELS.keys():
-            if sensor_key in readings and readings[sensor_key]['value'] is not None:
-                value = readings[sensor_key]['value']
-                self.plot_data[sensor_key].append(value)
-            else:
-                # Usar último valor conocido o None
-                if len(self.plot_data[sensor_key]) > 0:
-                    self.plot_data[sensor_key].append(self.plot_data[sensor_key][-1])
-                else:
-                    self.plot_data[sensor_key].append(0)
-        
-        # Actualizar gráficos solo si hay suficientes datos
-        if len(self.time_data) < 2:
+        # Una fila por serie; sin valor (error o no disponible) queda NaN y la línea se corta
+        sensors = list(self.chart_buffer.columns)
+        rows = np.full((len(sensors), len(records)), np.nan)
+        for j, record in enumerate(records):
+            series = self._layout_series(record.layout)
+            for s, sensor_key in enumerate(sensors):
+                positions = series.get(sensor_key)
+                if positions:
+                    value = self._series_value(record, positions)[1]
+                    if value is not None:
+                        rows[s, j] = value
+        
+        self.chart_buffer.extend([record.timestamp for record in records], dict(zip(sensors, rows)))
+    
+    def update_chart(self, records):
+        """Actualizar gráficos con un lote de SensorRecord y dibujar una sola vez
+        
+        Aquí se preparan los datos (anillo + downsampling); el backend del
+        gráfico solo dibuja el frame resultante.
+        """
+        self.append_chart(records)
+        
+        # Actualizar gráficos solo si ya están construidos y hay suficientes datos
+        if self.chart is None or len(self.chart_buffer) < 2:
             return
         
-        # Redraw charts
-        sensors = list(config.SENSOR_LABELS.keys())
-        for i, sensor_key in enumerate(sensors):
-            row, col = i // 2, i % 2
-            ax = self.axes[row, col]
-            ax.clear()
-            
-            # Configurar ejes
-            sensor_label = config.SENSOR_LABELS[sensor_key]
-            sensor_unit = config.SENSOR_UNITS[sensor_key]
-            color = config.CHART_COLORS[sensor_key]
+        # Vistas sin copia sobre el anillo
+        times = self.chart_buffer.window_x()
+        start = self.chart_buffer.start()
+        frame = {}
+        for sensor_key in self.chart_buffer.columns:
+            values = self.chart_buffer.window(sensor_key)
             
-            ax.set_title(f"{sensor_label}", fontsize=12, fontweight='bold')
-            ax.set_ylabel(f"Valor ({sensor_unit})")
-            ax.grid(True, alpha=0.3)
-            
-            # Plot data si hay datos
-            if len(self.plot_data[sensor_key]) > 0:
-                times = list(self.time_data)
-                values = list(self.plot_data[sensor_key])
-                
-                ax.plot(times, values, color=color, linewidth=2, marker='o', markersize=3)
-                
-                # Formatear eje X
-                if len(times) > 10:
-                    # Mostrar solo algunas etiquetas para evitar solapamiento
-                    step = max(1, len(times) // 5)
-                    ax.set_xticks(times[::step])
-                
-                ax.tick_params(axis='x', rotation=45, labelsize=8)
-                
-                # Auto-scale Y con margen
-                if values:
-                    min_val, max_val = min(values), max(values)
-                    margin = (max_val - min_val) * 0.1 if max_val != min_val else 1
-                    ax.set_ylim(min_val - margin, max_val + margin)
-        
-        plt.tight_layout()
-        self.chart_canvas.draw()
+            # Reducir a ~2 puntos por píxel (LTTB incremental); límites con fmin/fmax,
+            # que ignoran los huecos NaN sin crear arrays intermedios
+            shown_times, shown_values = self.downsamplers[sensor_key].update(times, values, start)
+            frame[sensor_key] = (shown_times, shown_values, times[0], times[-1],
+                                 np.fmin.reduce(values), np.fmax.reduce(values))
+        
+        self.chart.render(frame)
+    
+    def close_chart(self):
+        if self.chart is not None:
+            self.chart.close()
+    
+    def save_chart_image(self):
+        """Exportar la ventana actual del gráfico como imagen (siempre con matplotlib)"""
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename = filedialog.asksaveasfilename(
+            title="Guardar gráfico",
+            defaultextension=".png",
+            filetypes=[("PNG", "*.png"), ("SVG", "*.svg"), ("PDF", "*.pdf")],
+            initialfile=f"wally_chart_{timestamp}.png",
+            initialdir=config.DATA_DIRECTORY
+        )
+        if not filename:
+            return
+        
+        from mpl_chart import export_chart_image
+        if export_chart_image(filename, self.chart_buffer, config.SENSOR_LABELS.keys()):
+            print(f"🖼️ Gráfico guardado: {filename}")
     
     def update_stats(self, stats):
         """Actualizar estadísticas del sistema"""
@@ -329,6 +324,71 @@ class WallyDashboard:
         rate = stats.get('sample_rate', 0)
         self.stats_labels['rate'].config(text=f"Tasa: {rate:.1f} Hz")
     
+    def open_history_view(self):
+        """Abrir (o traer al frente) la vista de historial con zoom de toda la sesión"""
+        if self.history_view is not None and self.history_view.window.winfo_exists():
+            self.history_view.window.lift()
+            self.history_view.refresh_channels()
+            return
+        from history_view import HistoryView  # matplotlib solo al abrir el historial
+        self.history_view = HistoryView(self.root, self.controller.get_data_manager())
+    
+    def update_render_stats(self, render):
+        """Actualizar métricas del bucle de render (FPS, coste y cola)"""
+        if not render or 'render' not in self.stats_labels:
+            return
+        text = (f"Render: {render['fps']:.1f} FPS · {render['frame_ms']:.1f} ms/frame · "
+                f"cola {render['queue_depth']} (máx {render['max_batch']}) · "
+                f"descartadas {render['dropped']}")
+        chart = self.chart.get_stats() if self.chart is not None else None
+        if chart:
+            text += f" · {chart['backend']} {chart['render_ms']:.1f} ms"
+            if 'skipped' in chart:
+                text += f" (saltados {chart['skipped']})"
+        self.stats_labels['render'].config(text=text)
+    
+    def update_channel_stats(self, channel_stats):
+        """Actualizar tabla de estadísticas por canal (sesión y ventana)"""
+        if not channel_stats or self.channel_stats_label is None:
+            return
+        
+        lines = [f"{'Canal':<22}{'n':>7}{'media':>10}{'σ':>9}{'mín':>9}{'máx':>9}{'Δ/s':>9}"
+                 f"{'media ' + str(config.STATS_WINDOW) + 's':>12}"]
+        for name, stats in channel_stats.items():
+            # La tasa es None hasta la segunda lectura: texto primero, después el ancho
+            rate = stats['rate']
+            rate_text = '—' if rate is None else f'{rate:.2f}'
+            lines.append(
+                f"{name[:21]:<22}{stats['count']:>7}{stats['mean']:>10.2f}{stats['std']:>9.2f}"
+                f"{stats['min']:>9.2f}{stats['max']:>9.2f}{rate_text:>9}"
+                f"{stats['window_mean']:>12.2f}")
+        
+        self.channel_stats_label.config(text="\n".join(lines))
+    
+    def update_latency(self, latency):
+        """Actualizar panel de latencia con los percentiles del cliente"""
+        if not latency or self.latency_label is None:
+            return
+        
+        lines = [f"{'Endpoint':<18}{'n':>6}{'err':>5}{'p50':>9}{'p95':>9}{'p99':>9}  (ms)"]
+        for endpoint, stats in sorted(latency.items()):
+            total = stats['phases'].get('total')
+            if not total:
+                continue
+            lines.append(
+                f"{endpoint:<18}{stats['requests']:>6}{stats['errors']:>5}"
+                f"{total['p50']:>9.1f}{total['p95']:>9.1f}{total['p99']:>9.1f}")
+        
+        # Desglose por fase del endpoint principal
+        sensors = latency.get('/sensors', {}).get('phases', {})
+        if sensors:
+            breakdown = "  ".join(
+                f"{phase} {sensors[phase]['p50']:.1f}/{sensors[phase]['p95']:.1f}"
+                for phase in ('connect', 'ttfb', 'transfer', 'decode') if phase in sensors)
+            lines.append(f"/sensors p50/p95 → {breakdown}")
+        
+        self.latency_label.config(text="\n".join(lines))
+    
     def update_status(self, status):
         """Actualizar status del sistema"""
         self.status_label.config(text=status)
@@ -352,6 +412,22 @@ class WallyDashboard:
             self.control_buttons['start'].config(state=tk.NORMAL)
             self.control_buttons['stop'].config(state=tk.DISABLED)
     
+    def set_export_state(self, running):
+        """Botón de exportar: cancela mientras hay una exportación en curso"""
+        button = self.control_buttons.get('export')
+        if button is None:
+            return
+        if running:
+            button.config(text="⏹️ Cancelar exportación", command=self.controller.cancel_export)
+        else:
+            button.config(text="📥 Exportar", command=self.controller.export_data)
+    
+    def update_export_progress(self, done, total):
+        """Mostrar avance de la exportación en el botón"""
+        button = self.control_buttons.get('export')
+        if button is not None and total:
+            button.config(text=f"⏹️ Cancelar exportación ({min(100, done * 100 // total)}%)")
+    
     def get_export_filename(self):
         """Obtener nombre de archivo para exportación"""
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -362,9 +438,13 @@ class WallyDashboard:
             defaultextension=".csv",
             filetypes=[
                 ("Archivos CSV", "*.csv"),
+                ("Parquet (columnar, comprimido)", "*.parquet"),
+                ("Feather / Arrow IPC", "*.feather"),
+                ("NDJSON comprimido (sesión)", "*.ndjson.gz"),
+                ("JSON", "*.json"),
                 ("Todos los archivos", "*.*")
             ],
-            initialname=default_name,
+            initialfile=default_name,
             initialdir=config.DATA_DIRECTORY
         )
         
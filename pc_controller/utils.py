@@ -5,11 +5,30 @@ import time
 import os
 import json
 from datetime import datetime
+import numpy as np
 
 def format_timestamp(timestamp):
     """Formatear timestamp a string legible"""
     return datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S')
 
+def epoch_to_datenum(timestamps):
+    """Timestamps epoch (s) → números de fecha de matplotlib en hora local, vectorizado"""
+    timestamps = np.asarray(timestamps, dtype=float)
+    if not len(timestamps):
+        return timestamps
+    finite = np.isfinite(timestamps)
+    if not finite.any():
+        return timestamps / 86400.0
+    # Offset de zona horaria en ambos extremos: si coincide vale para todo el array
+    first = time.localtime(timestamps[finite].min()).tm_gmtoff
+    last = time.localtime(timestamps[finite].max()).tm_gmtoff
+    if first == last:
+        return (timestamps + first) / 86400.0
+    # El rango cruza un cambio de horario: offset por elemento (como datetime.fromtimestamp)
+    utc_offsets = np.zeros(len(timestamps))
+    utc_offsets[finite] = [time.localtime(t).tm_gmtoff for t in timestamps[finite]]
+    return (timestamps + utc_offsets) / 86400.0
+
 def ensure_directory(path):
     """Asegurar que un directorio existe"""
     os.makedirs(path, exist_ok=True)
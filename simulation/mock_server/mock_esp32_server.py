@@ -5,10 +5,13 @@ import threading
 import time
 import random
 import math
+import socket
 from http.server import HTTPServer, BaseHTTPRequestHandler
 import json
 from datetime import datetime
 
+DISCOVERY_PORT = 8081  # Igual que esp32/config.py
+
 class MockESP32VernierSystem:
     """Emulador completo del sistema Vernier"""
     
@@ -157,6 +160,19 @@ class MockRequestHandler(BaseHTTPRequestHandler):
                     'platform': 'Python Emulator'
                 })
             
+            elif self.path == '/status':
+                system = self.server.esp32_system
+                self.send_json_response({
+                    'device_id': 'mock_esp32_wally_system',
+                    'status': 'running',
+                    'uptime': time.time() - system.start_time,
+                    'vernier_sensors': 4,
+                    'ip_address': self.server.server_address[0],
+                    'vernier_integration': True,
+                    'arduino_compatible': True,
+                    'platform': 'Python Mock Server'
+                })
+            
             elif self.path == '/sensors':
                 response = self.server.esp32_system.get_full_response()
                 self.send_json_response(response)
@@ -190,17 +206,46 @@ class MockRequestHandler(BaseHTTPRequestHandler):
         self.end_headers()
         self.wfile.write(json_str.encode('utf-8'))
 
+def start_discovery_responder(host, port, discovery_port=DISCOVERY_PORT):
+    """Responder sondas UDP WALLY_DISCOVER igual que el ESP32"""
+    def responder():
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            sock.bind(('', discovery_port))
+        except OSError as e:
+            print(f"⚠️ Descubrimiento UDP no disponible: {e}")
+            return
+        
+        info = {
+            'wally': 1,
+            'device_id': 'mock_esp32_wally_system',
+            'device_name': 'mock',
+            'ip': host,
+            'port': port,
+            'vernier_integration': True
+        }
+        while True:
+            data, addr = sock.recvfrom(64)
+            if data.strip() == b"WALLY_DISCOVER":
+                sock.sendto(json.dumps(info).encode('utf-8'), addr)
+    
+    threading.Thread(target=responder, daemon=True).start()
+
 def start_mock_server(host='localhost', port=8080):
     """Iniciar servidor mock"""
     esp32_system = MockESP32VernierSystem()
     
     server = HTTPServer((host, port), MockRequestHandler)
     server.esp32_system = esp32_system
+    start_discovery_responder(host, port)
     
     print(f"🌐 Mock ESP32 Server iniciado en http://{host}:{port}")
     print(f"📡 Endpoints disponibles:")
     print(f"   http://{host}:{port}/sensors")
     print(f"   http://{host}:{port}/ping")
+    print(f"   http://{host}:{port}/status")
+    print(f"   udp://{host}:{DISCOVERY_PORT} (descubrimiento)")
     print(f"   http://{host}:{port}/vernier/command/[t|f|p|m|d|c]")
     print(f"🔄 Generando datos realistas...")
     print(f"🛑 Presionar Ctrl+C para detener")
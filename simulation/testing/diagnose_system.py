@@ -65,6 +65,7 @@ def diagnose_wally_system():
     print("1. Si usas Wokwi: verificar IoT Gateway ejecutándose")
     print("2. Si usas Mock: verificar python mock_esp32_server.py") 
     print("3. Cliente PC: verificar ESP32_IP en config.py")
+    print("4. Placas en la LAN: python pc_controller/discovery.py --subnet 192.168.1.0/24")
 
 if __name__ == "__main__":
     diagnose_wally_system()
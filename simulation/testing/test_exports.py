@@ -0,0 +1,94 @@
+"""
+Tests de exportación del DataManager (sin servidor ni hardware)
+"""
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+
+# Módulos de pc_controller (planos, como los importa main.py)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "pc_controller"))
+
+import config
+from data_manager import DataManager
+
+READINGS = [
+    {'timestamp': 1700000000.0 + i, 'device_id': 'wally_test', 'readings': {
+        'generic_ph': {'value': 7.0 + i / 10, 'unit': 'pH', 'status': 'active'},
+        'generic_temperature': {'value': 20.0 + i, 'unit': '°C', 'status': 'active'}}}
+    for i in range(5)
+]
+
+@contextmanager
+def temporary_data_directory(**overrides):
+    """Directorio temporal con config apuntando a él (más overrides); restaura config al salir"""
+    with tempfile.TemporaryDirectory() as directory:
+        settings = {
+            'DATA_DIRECTORY': directory,
+            'SESSION_DIRECTORY': os.path.join(directory, "sessions"),
+            'CALIBRATION_FILE': os.path.join(directory, "calibration.json")
+        }
+        settings.update(overrides)
+        previous = {name: getattr(config, name) for name in settings}
+        for name, value in settings.items():
+            setattr(config, name, value)
+        try:
+            yield directory
+        finally:
+            for name, value in previous.items():
+                setattr(config, name, value)
+
+def make_data_manager(readings=READINGS, capacity=100):
+    """DataManager sin log de sesión con algunas lecturas"""
+    data_manager = DataManager(capacity=capacity, log_session=False)
+    for reading in readings:
+        data_manager.add_reading(reading)
+    return data_manager
+
+class TestWallyExports:
+    """Ida y vuelta de las exportaciones en un directorio temporal"""
+    
+    def test_feather_roundtrip(self):
+        """Exportar a Feather y releer con pyarrow"""
+        from pyarrow import feather
+        
+        with temporary_data_directory() as directory:
+            data_manager = make_data_manager()
+            filename = os.path.join(directory, "export.feather")
+            
+            assert data_manager.export_to_feather(filename)
+            table = feather.read_table(filename)
+            
+            assert table.num_rows == 2 * len(READINGS)
+            rows = table.to_pylist()
+            assert [row['timestamp'] for row in rows if row['sensor_type'] == 'generic_ph'] == \
+                [reading['timestamp'] for reading in READINGS]
+            assert {row['device_id'] for row in rows} == {'wally_test'}
+            ph = [row['value'] for row in rows if row['sensor_type'] == 'generic_ph']
+            assert ph == [reading['readings']['generic_ph']['value'] for reading in READINGS]
+        print("✅ Exportación Feather OK")
+    
+    def test_raw_counts_without_raw(self):
+        """Con STORE_RAW_COUNTS, un canal calibrado sin raw conserva el valor de la placa"""
+        with temporary_data_directory(STORE_RAW_COUNTS=True):
+            data_manager = make_data_manager()
+            
+            recent = data_manager.get_recent_data(len(READINGS))
+            assert [reading['readings']['generic_ph']['value'] for reading in recent] == \
+                [reading['readings']['generic_ph']['value'] for reading in READINGS]
+            
+            values = data_manager.query(channels=['generic_temperature'])['generic_temperature']
+            assert list(values) == [reading['readings']['generic_temperature']['value']
+                                    for reading in READINGS]
+        print("✅ Cuentas ADC sin raw OK")
+
+if __name__ == "__main__":
+    tester = TestWallyExports()
+    failed = 0
+    for test in (tester.test_feather_roundtrip, tester.test_raw_counts_without_raw):
+        try:
+            test()
+        except Exception as e:
+            print(f"❌ {test.__doc__} falló: {e!r}")
+            failed += 1
+    sys.exit(1 if failed else 0)
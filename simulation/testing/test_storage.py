@@ -0,0 +1,203 @@
+"""
+Tests de almacenamiento y reducción (segmentos, sesiones NDJSON, recalibración, pirámide)
+"""
+import os
+import sys
+
+import numpy as np
+
+from test_exports import make_data_manager, temporary_data_directory
+
+import config
+import segment_store
+from data_manager import DataManager
+from downsampling import IncrementalDownsampler
+from history_pyramid import ChannelPyramid
+
+def raw_readings(count, start=1000):
+    """Lecturas de generic_temperature con cuentas ADC (valor de la placa = 0)"""
+    return [{'timestamp': 1700000000.0 + i, 'device_id': 'wally_test', 'readings': {
+        'generic_temperature': {'value': 0.0, 'raw': start + i, 'unit': '°C', 'status': 'active'}}}
+        for i in range(count)]
+
+def session_files(directory):
+    """Logs de sesión (.wal) en el directorio de sesiones"""
+    if not os.path.isdir(directory):
+        return []
+    return [name for name in os.listdir(directory) if name.endswith(".wal")]
+
+class TestWallyStorage:
+    """Segment store, import/export de sesiones y vistas reducidas frente a fuerza bruta"""
+    
+    def test_segment_order_after_failed_write(self):
+        """Un bloque cuya escritura falló sigue en orden entre los que sí se escribieron"""
+        write_segment = segment_store.write_segment
+        failures = []
+        
+        def failing_once(chunk, filename):
+            if not failures:
+                failures.append(filename)
+                raise OSError("disco lleno")
+            write_segment(chunk, filename)
+        
+        readings = [{'timestamp': 1700000000.0 + i, 'device_id': 'wally_test', 'readings': {
+            'generic_ph': {'value': 7.0 + i / 100, 'unit': 'pH', 'status': 'active'}}}
+            for i in range(30)]
+        
+        with temporary_data_directory(SEGMENT_SIZE=4):
+            segment_store.write_segment = failing_once
+            try:
+                data_manager = DataManager(capacity=8, log_session=False)
+                data_manager.start_session('wally_test')
+                for reading in readings:
+                    data_manager.add_reading(reading)
+                data_manager.close_session()
+            finally:
+                segment_store.write_segment = write_segment
+            
+            assert len(failures) == 1
+            assert len(data_manager.segment_store.pending) == 1
+            assert len(data_manager.segment_store.index) > 1
+            
+            result = data_manager.query(channels=['generic_ph'])
+            assert list(result['timestamp']) == [reading['timestamp'] for reading in readings]
+            assert list(result['generic_ph']) == [reading['readings']['generic_ph']['value']
+                                                  for reading in readings]
+        print("✅ Orden de segmentos tras escritura fallida OK")
+    
+    def test_ndjson_roundtrip(self):
+        """Exportar NDJSON e importarlo sin abrir un log de sesión ni tocar start_time"""
+        readings = [{'timestamp': 1700000000.0 + i, 'device_id': 'wally_test', 'readings': {
+            'generic_ph': {'value': 7.0 + i / 100, 'unit': 'pH', 'status': 'active'}}}
+            for i in range(30)]
+        
+        with temporary_data_directory() as directory:
+            source = make_data_manager(readings)
+            filename = os.path.join(directory, "export.ndjson.gz")
+            assert source.export_to_ndjson(filename)
+            
+            # Capacidad menor que la sesión: lo que sale del ring va a segmentos
+            target = DataManager(capacity=10, log_session=False)
+            header = target.import_session(filename)
+            target.close_session()
+            
+            assert header is not None
+            assert header['total_readings'] == len(readings)
+            assert target.start_time is None
+            assert session_files(config.SESSION_DIRECTORY) == []
+            assert target.segment_store is not None
+            
+            expected = source.query()
+            imported = target.query()
+            assert list(imported['timestamp']) == list(expected['timestamp'])
+            assert list(imported['generic_ph']) == list(expected['generic_ph'])
+        print("✅ Ida y vuelta NDJSON OK")
+    
+    def test_recalibrate(self):
+        """Recalibrar cambia los valores de toda la sesión: ring, segmentos pendientes y exportación"""
+        from pyarrow import feather
+        
+        write_segment = segment_store.write_segment
+        
+        def failing(chunk, filename):
+            raise OSError("disco lleno")
+        
+        readings = raw_readings(12)
+        with temporary_data_directory(STORE_RAW_COUNTS=True, SEGMENT_SIZE=4) as directory:
+            segment_store.write_segment = failing
+            try:
+                data_manager = DataManager(capacity=8, log_session=False)
+                data_manager.start_session('wally_test')
+                for reading in readings:
+                    data_manager.add_reading(reading)
+                
+                # Las cuentas se leen antes de recalibrar (cachea valores de los pendientes)
+                before = data_manager.query(channels=['generic_temperature'])['generic_temperature']
+                calibration = data_manager.recalibrate('generic_temperature', 2.0, 1.0)
+                data_manager.close_session()
+            finally:
+                segment_store.write_segment = write_segment
+            
+            assert data_manager.segment_store.pending
+            raw = np.array([reading['readings']['generic_temperature']['raw'] for reading in readings])
+            expected = raw * calibration.scale + calibration.offset
+            assert not np.allclose(before, expected)
+            
+            values = data_manager.query(channels=['generic_temperature'])['generic_temperature']
+            assert np.allclose(values, expected)
+            
+            filename = os.path.join(directory, "export.feather")
+            assert data_manager.export_to_feather(filename)
+            rows = feather.read_table(filename).to_pylist()
+            assert np.allclose([row['value'] for row in rows], expected)
+            
+            stats = data_manager.get_channel_stats()['generic_temperature']
+            assert np.isclose(stats['min'], expected.min())
+            assert np.isclose(stats['max'], expected.max())
+        print("✅ Recalibración OK")
+    
+    def test_incremental_downsampler(self):
+        """La cache incremental da lo mismo que reducir cada ventana desde cero"""
+        rng = np.random.default_rng(7)
+        x = np.arange(3000, dtype=float)
+        y = np.cumsum(rng.normal(size=len(x)))
+        y[500:540] = np.nan
+        window = 1000
+        
+        for method in ('lttb', 'minmax'):
+            incremental = IncrementalDownsampler(100, method)
+            for end in range(window, len(x), 37):
+                start = end - window
+                xs, ys = x[start:end], y[start:end]
+                got = incremental.update(xs, ys, start)
+                expected = IncrementalDownsampler(100, method).update(xs, ys, start)
+                assert np.array_equal(got[0], expected[0])
+                assert np.array_equal(got[1], expected[1], equal_nan=True)
+                assert len(got[0]) < len(xs)
+                assert np.all(np.diff(got[0]) >= 0)
+                if method == 'minmax':
+                    assert np.nanmin(got[1]) == np.nanmin(ys)
+                    assert np.nanmax(got[1]) == np.nanmax(ys)
+        print("✅ Reducción incremental OK")
+    
+    def test_pyramid_view(self):
+        """Cada bucket de la vista coincide con min/max/media de sus muestras"""
+        rng = np.random.default_rng(11)
+        timestamps = np.arange(1000, dtype=float)
+        values = rng.normal(size=len(timestamps))
+        
+        pyramid = ChannelPyramid(base=4)
+        for timestamp, value in zip(timestamps, values):
+            pyramid.update(timestamp, value)
+        
+        for t0, t1 in ((None, None), (100.0, 700.0), (950.0, None)):
+            for max_points in (20, 64, 500):
+                size, starts, ends, low, high, mean = pyramid.view(t0, t1, max_points)
+                assert len(starts) <= max_points
+                assert np.all(ends[:-1] < starts[1:])
+                
+                lo = 0 if t0 is None else t0
+                hi = timestamps[-1] if t1 is None else t1
+                assert starts[0] <= lo and ends[-1] >= hi
+                for i in range(len(starts)):
+                    inside = values[(timestamps >= starts[i]) & (timestamps <= ends[i])]
+                    assert len(inside) <= size
+                    assert low[i] == inside.min()
+                    assert high[i] == inside.max()
+                    assert np.isclose(mean[i], inside.mean())
+                    if i + 1 < len(starts):
+                        assert ends[i] + 1 == starts[i + 1]
+        print("✅ Vista de pirámide OK")
+
+if __name__ == "__main__":
+    tester = TestWallyStorage()
+    failed = 0
+    for test in (tester.test_segment_order_after_failed_write, tester.test_ndjson_roundtrip,
+                 tester.test_recalibrate, tester.test_incremental_downsampler,
+                 tester.test_pyramid_view):
+        try:
+            test()
+        except Exception as e:
+            print(f"❌ {test.__doc__} falló: {e!r}")
+            failed += 1
+    sys.exit(1 if failed else 0)